@@ -0,0 +1,412 @@
+'''
+Benchmarks for the analytics scripts. Each workload imports its module (which does no work at import time),
+builds synthetic inputs or a local stub server, and times the hot path at several sizes. Runs are saved as
+JSON so that two runs can be compared for regressions.
+
+    python Benchmark_Suite.py run [--scale small|full] [--only NAME ...] [--repeats N] [--output FILE]
+    python Benchmark_Suite.py compare [BASELINE.json CURRENT.json] [--threshold 0.10]
+    python Benchmark_Suite.py list
+'''
+import argparse
+import datetime
+import glob
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # not on Windows; peak RSS is then left out of the results
+    resource = None
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmark_results")
+DEFAULT_REPEATS = 3
+TIME_THRESHOLD = 0.10  # slower by more than 10% is a regression
+MEMORY_THRESHOLD = 0.20  # peak RSS is noisier than time, so it gets more slack
+
+# setup(module, size) -> state is untimed; run(module, state) -> items processed is timed;
+# teardown(state) always runs. sizes maps a scale name to the sizes run at that scale.
+Workload = namedtuple("Workload", ["name", "module", "unit", "sizes", "setup", "run", "teardown", "description"],
+                      defaults=[None, ""])
+
+
+# SQL column extraction
+def _setup_sql_query(module, size):
+    return module.generate_synthetic_query(size)
+
+
+def _run_sql_query(module, query):
+    module.extract_select_columns(query)
+    return len(query)
+
+
+def _setup_sql_log(module, size):
+    # A few dozen query shapes with varying literals, like a real query log
+    rng = np.random.default_rng(0)
+    shapes = [module.generate_synthetic_query(int(n)) for n in rng.integers(200, 1_000, 40)]
+    return [f"{shapes[i % len(shapes)]} WHERE id = {i} AND region = 'r{i % 97}'" for i in range(size)]
+
+
+def _run_sql_log(module, queries):
+    module._extract_fingerprint_columns.cache_clear()  # every repeat starts cold
+    for _ in module.extract_columns_many(queries):
+        pass
+    return len(queries)
+
+
+# DataCleaner chains
+def _run_cleaner(module, frame, **kwargs):
+    (module.DataCleaner(frame, **kwargs)
+     .clean_all_text_columns()
+     .fill_missing_values(0)
+     .drop_duplicates()
+     .clean_column_names()
+     .apply_text_cleaning('full_name')
+     .apply_special_character_removal('full_name')
+     .get_dataframe())
+    return len(frame)
+
+
+def _run_cleaner_lazy(module, frame):
+    return _run_cleaner(module, frame, vectorized=True, lazy=True)
+
+
+def _setup_people(module, size):
+    return module._synthetic_people(size)
+
+
+# Forecast filtering
+def _setup_forecast(module, size):
+    payload = module._mock_forecast_payload({"forecast_days": [str(module.MAX_FORECAST_DAYS)]})
+    frame = module.build_hourly_frame(payload["hourly"])
+    rng = np.random.default_rng(0)
+    # Lookups at whole hours inside the horizon, plus a few before it that find nothing
+    offsets = rng.integers(-24, len(frame), size)
+    whens = [frame.index[0] + pd.Timedelta(hours=int(h)) for h in offsets]
+    return payload["hourly"], whens
+
+
+def _run_forecast(module, state):
+    hourly, whens = state
+    frame = module.build_hourly_frame(hourly)
+    for when in whens:
+        module.forecast_at(frame, when)
+        module.forecast_next_hours(frame, when, 6)
+    return len(whens)
+
+
+def _setup_outfits(module, size):
+    server, url = module.start_mock_forecast_server()
+    rng = np.random.default_rng(0)
+    locations = max(size // 5, 1)
+    lats, lons = rng.uniform(25, 48, locations), rng.uniform(-123, -70, locations)
+    now = datetime.datetime.now(module.EASTERN).replace(tzinfo=None)
+    batch = [module.OutfitRequest(f"Store {i % locations}", lats[i % locations], lons[i % locations],
+                                  now + datetime.timedelta(hours=int(rng.integers(0, 96))))
+             for i in range(size)]
+    return server, url, batch
+
+
+def _run_outfits(module, state):
+    _, url, batch = state
+    # A fresh client per repeat, so every repeat fetches from the stub
+    client = module.ForecastClient(base_url=url, cache_dir=None)
+    module.suggest_outfits(batch, client=client, concurrency=16, rate_per_second=1e6)
+    return len(batch)
+
+
+def _stop_server(state):
+    state[0].shutdown()
+
+
+# PDF row parsing: the rows pdfplumber's extract_table would hand back
+def _setup_pdf_rows(module, size):
+    rng = np.random.default_rng(0)
+    performers = [f"Performer {i}" for i in range(max(size // 20, 1))]
+    formats = ["{p}: Summer Tour", "{p} – Live", "{p} - with Special Guests", "{p}"]
+    names = [formats[i % len(formats)].format(p=performers[k])
+             for i, k in enumerate(rng.integers(0, len(performers), size))]
+    days = pd.Timestamp("2025-05-01") + pd.to_timedelta(rng.integers(0, 180, size), unit="D")
+    hours = rng.integers(5, 11, size)
+    starts = [f"{d:%a}, {d:%b} {d.day}, {d.year}, {h:02d}:{m:02d} PM"
+              for d, h, m in zip(days, hours, rng.choice([0, 30], size))]
+    for i in range(0, size, 50):
+        starts[i] = "TBA"  # unparseable times are kept as they are
+    return names, starts
+
+
+def _run_pdf_rows(module, state):
+    names, starts = state
+    module.parse_start_time.cache_clear()
+    module.events_frame("Forest Hills Stadium", names, starts)
+    return len(names)
+
+
+# Superfund map rendering
+def _setup_sites(module, size):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'Latitude': rng.uniform(40.5, 45.0, size), 'Longitude': rng.uniform(-79.8, -71.8, size),
+        'Superfund Status': np.where(rng.random(size) < 0.5, 'Yes', 'No'),
+        'Site Name': [f"Site {i}" for i in range(size)], 'County': 'Somewhere',
+    })
+
+
+def _render_sites(mode):
+    def run(module, frame):
+        module.build_site_map(frame, mode=mode).get_root().render()
+        return len(frame)
+    return run
+
+
+WORKLOADS = {w.name: w for w in [
+    Workload("sql_extract", "SQL_Parser", "bytes",
+             {"small": (10_000, 100_000), "full": (10_000, 100_000, 1_000_000)},
+             _setup_sql_query, _run_sql_query, description="extract_select_columns on one large query"),
+    Workload("sql_query_log", "SQL_Parser", "queries",
+             {"small": (10_000,), "full": (10_000, 100_000)},
+             _setup_sql_log, _run_sql_log, description="extract_columns_many over a log of repeated shapes"),
+    Workload("datacleaner_eager", "Python_Data_Transformation", "rows",
+             {"small": (10_000,), "full": (10_000, 100_000, 1_000_000)},
+             _setup_people, _run_cleaner, description="the demo chain, step by step"),
+    Workload("datacleaner_lazy", "Python_Data_Transformation", "rows",
+             {"small": (100_000,), "full": (100_000, 1_000_000, 10_000_000)},
+             _setup_people, _run_cleaner_lazy,
+             description="the demo chain, planned and vectorized"),
+    Workload("forecast_filter", "WhatShouldIWear", "lookups",
+             {"small": (1_000,), "full": (1_000, 10_000, 100_000)},
+             _setup_forecast, _run_forecast, description="hourly frame build plus hour and next-6-hour lookups"),
+    Workload("outfit_service", "WhatShouldIWear", "requests",
+             {"small": (500,), "full": (500, 5_000)},
+             _setup_outfits, _run_outfits, _stop_server, description="suggest_outfits against a local stub"),
+    Workload("pdf_rows", "EventsAtForestHillsStadium", "rows",
+             {"small": (10_000,), "full": (10_000, 100_000, 1_000_000)},
+             _setup_pdf_rows, _run_pdf_rows, description="events_frame on extracted calendar rows"),
+    Workload("superfund_markers", "SuperfundSiteFinderNY", "sites",
+             {"small": (300,), "full": (1_000, 5_000)},
+             _setup_sites, _render_sites("markers"), description="build_site_map + render, one marker per site"),
+    Workload("superfund_cluster", "SuperfundSiteFinderNY", "sites",
+             {"small": (1_300,), "full": (1_300, 20_000)},
+             _setup_sites, _render_sites("cluster"), description="build_site_map + render, clustered"),
+]}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # macOS reports bytes
+
+
+def run_case(name, size, repeats=DEFAULT_REPEATS):
+    """Times one workload at one size; returns its result record."""
+    workload = WORKLOADS[name]
+    record = {"workload": name, "size": size, "unit": workload.unit}
+    try:
+        module = importlib.import_module(workload.module)
+    except ImportError as e:  # e.g. folium or pdfplumber's siblings missing on this machine
+        record["skipped"] = f"{type(e).__name__}: {e}"
+        return record
+
+    state = workload.setup(module, size)
+    setup_rss = peak_rss_mb()
+    try:
+        timings, items = [], 0
+        for _ in range(repeats):
+            start = time.perf_counter()
+            items = workload.run(module, state)
+            timings.append(time.perf_counter() - start)
+    finally:
+        if workload.teardown is not None:
+            workload.teardown(state)
+
+    best = min(timings)
+    record.update({
+        "items": items, "repeats": repeats, "best_s": best, "median_s": statistics.median(timings),
+        "throughput": items / best if best else None,
+        "setup_peak_rss_mb": setup_rss, "peak_rss_mb": peak_rss_mb(),
+    })
+    return record
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                             text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def environment():
+    return {
+        "python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine(),
+        "cpu_count": os.cpu_count(), "numpy": np.__version__, "pandas": pd.__version__,
+    }
+
+
+def run_suite(names=None, scale="small", repeats=DEFAULT_REPEATS, isolate=True, verbose=True):
+    """Runs the selected workloads at every size of `scale`; returns the run as a dict.
+
+    With isolate=True each case runs in a freshly spawned interpreter, so peak RSS belongs
+    to that case alone and one case's caches or heap growth cannot leak into the next.
+    """
+    names = list(names or WORKLOADS)
+    unknown = [n for n in names if n not in WORKLOADS]
+    if unknown:
+        raise ValueError(f"Unknown workloads: {', '.join(unknown)}")
+
+    results = []
+    for name in names:
+        for size in WORKLOADS[name].sizes[scale]:
+            if isolate:
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    record = pool.submit(run_case, name, size, repeats).result()
+            else:
+                record = run_case(name, size, repeats)
+            results.append(record)
+            if verbose:
+                print(_format_record(record), flush=True)
+
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(), "scale": scale, "isolated": isolate,
+        "environment": environment(), "results": results,
+    }
+
+
+def _format_record(record):
+    label = f"{record['workload']:>18} {record['size']:>10,}"
+    if "skipped" in record:
+        return f"{label}  skipped ({record['skipped']})"
+    rss = record["peak_rss_mb"]
+    return (f"{label} {record['best_s'] * 1000:>10.1f} ms {record['throughput']:>14,.0f} {record['unit']}/s"
+            f" {'' if rss is None else f'{rss:>8.0f} MB'}")
+
+
+def save_run(run, path=None):
+    """Writes a run as JSON, by default to benchmark_results/<timestamp>-<commit>.json; returns the path."""
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"{stamp}-{run['commit'] or 'nogit'}.json")
+    with open(path, "w") as f:
+        json.dump(run, f, indent=2)
+    return path
+
+
+def load_run(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def latest_runs(count=2, results_dir=RESULTS_DIR):
+    """Paths of the most recent saved runs, oldest first."""
+    return sorted(glob.glob(os.path.join(results_dir, "*.json")), key=os.path.getmtime)[-count:]
+
+
+def compare_runs(baseline, current, threshold=TIME_THRESHOLD, memory_threshold=MEMORY_THRESHOLD):
+    """Returns one row per (workload, size) with the time and peak-RSS ratios and a status.
+
+    status is "regression" when best time grew by more than `threshold` or peak RSS by more
+    than `memory_threshold`, "faster" when best time shrank by more than `threshold`, and
+    "ok", "new", "missing" or "skipped" otherwise.
+    """
+    def keyed(run):
+        return {(r["workload"], r["size"]): r for r in run["results"]}
+
+    before, after = keyed(baseline), keyed(current)
+    rows = []
+    for key in list(before) + [k for k in after if k not in before]:
+        old, new = before.get(key), after.get(key)
+        row = {"workload": key[0], "size": key[1], "time_ratio": None, "rss_ratio": None}
+        if new is None:
+            row["status"] = "missing"
+        elif old is None:
+            row["status"] = "new"
+        elif "skipped" in old or "skipped" in new:
+            row["status"] = "skipped"
+        else:
+            row["time_ratio"] = new["best_s"] / old["best_s"]
+            if old.get("peak_rss_mb") and new.get("peak_rss_mb"):
+                row["rss_ratio"] = new["peak_rss_mb"] / old["peak_rss_mb"]
+            if row["time_ratio"] > 1 + threshold or (row["rss_ratio"] or 0) > 1 + memory_threshold:
+                row["status"] = "regression"
+            elif row["time_ratio"] < 1 - threshold:
+                row["status"] = "faster"
+            else:
+                row["status"] = "ok"
+        rows.append(row)
+    return rows
+
+
+def print_comparison(baseline, current, rows):
+    print(f"baseline: {baseline['created']} ({baseline.get('commit')})")
+    print(f" current: {current['created']} ({current.get('commit')})")
+    if baseline.get("environment") != current.get("environment"):
+        print("   note: the runs come from different environments; compare with care")
+    print(f"{'workload':>18} {'size':>10} {'time':>8} {'peak RSS':>9}  status")
+    for row in rows:
+        time_change = "" if row["time_ratio"] is None else f"{row['time_ratio'] - 1:+.1%}"
+        rss_change = "" if row["rss_ratio"] is None else f"{row['rss_ratio'] - 1:+.1%}"
+        print(f"{row['workload']:>18} {row['size']:>10,} {time_change:>8} {rss_change:>9}  {row['status']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the analytics scripts.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run workloads and save the results as JSON")
+    run.add_argument("--scale", choices=["small", "full"], default="small")
+    run.add_argument("--only", nargs="+", metavar="NAME", help="workloads to run (default: all)")
+    run.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    run.add_argument("--output", help="results file (default: a new file in benchmark_results/)")
+    run.add_argument("--no-isolate", action="store_true", help="run every case in this process")
+
+    compare = commands.add_parser("compare", help="compare two saved runs and flag regressions")
+    compare.add_argument("runs", nargs="*", metavar="RUN",
+                         help="baseline and current results (default: the two latest in benchmark_results/)")
+    compare.add_argument("--threshold", type=float, default=TIME_THRESHOLD)
+    compare.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD)
+
+    commands.add_parser("list", help="list the workloads and their sizes")
+
+    args = parser.parse_args(argv)
+    if args.command == "list":
+        for w in WORKLOADS.values():
+            sizes = ", ".join(f"{scale}: {'/'.join(f'{s:,}' for s in sizes)}" for scale, sizes in w.sizes.items())
+            print(f"{w.name:>18}  {w.module}.py, {w.description} ({w.unit}; {sizes})")
+        return 0
+
+    if args.command == "run":
+        result = run_suite(args.only, args.scale, args.repeats, isolate=not args.no_isolate)
+        print(f"saved {save_run(result, args.output)}")
+        return 0
+
+    paths = args.runs or latest_runs()
+    if len(paths) != 2:
+        parser.error("compare needs a baseline and a current run")
+    baseline, current = load_run(paths[0]), load_run(paths[1])
+    rows = compare_runs(baseline, current, args.threshold, args.memory_threshold)
+    print_comparison(baseline, current, rows)
+    # A non-zero exit lets CI fail on regressions
+    return 1 if any(row["status"] == "regression" for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,66 +1,347 @@
 '''
 Find which events are happening at the Forest Hills Stadium this year
 '''
-!pip install pdfplumber requests
+# Requires: pip install pdfplumber requests
 
-import pdfplumber, requests, pandas as pd, urllib.parse, logging
+import requests, pandas as pd, numpy as np, urllib.parse, logging, sqlite3, time
+import hashlib, json, os, re, threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Instrumentation import add_bytes, instrumented
+
+try:
+    import pdfplumber
+except ImportError:  # only needed to read the calendar PDFs; row parsing works without it
+    pdfplumber = None
 
 logging.getLogger("pdfminer").setLevel(logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# Calendars to track; add a venue by adding its PDF here
+VENUE_CALENDARS = {
+    "Forest Hills Stadium": "https://www.livenation.com/api/calendar/KovZpZA777nA/forest-hills-stadium-upcoming-events.pdf",
+}
+PDF_DIR = "venue_pdfs"
+EVENTS_STORE = "venue_events.parquet"
+# (venue, event, datetime) -- date and time stand in for the datetime so that
+# start times the parser could not read still get a stable key
+EVENT_KEY = ["Venue", "Event Name", "Event Date", "Event Time"]
+EVENT_COLUMNS = ["Venue", "Event Name", "Performer", "Event Date", "Event Time"]
+
+# Download the PDFs
+def _load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_manifest(manifest, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
 
-# Download the PDF
-url = "https://www.livenation.com/api/calendar/KovZpZA777nA/forest-hills-stadium-upcoming-events.pdf"
-pdf_path = "forest_hills.pdf"
-with open(pdf_path, "wb") as f:
-    f.write(requests.get(url).content)
+@instrumented("http.calendar_pdf")
+def download_if_changed(venue, url, manifest, pdf_dir=PDF_DIR, session=requests):
+    """Returns (pdf_path, changed). Unchanged calendars are never re-parsed.
+
+    The server is asked first with the stored ETag/Last-Modified, so a 304 skips the
+    download entirely; otherwise the body's SHA-256 is compared with the last one seen.
+    """
+    entry = manifest.get(venue, {})
+    pdf_path = os.path.join(pdf_dir, re.sub(r"\W+", "_", venue).strip("_").lower() + ".pdf")
+    have_copy = os.path.exists(pdf_path) and entry.get("url") == url
+    headers = {}
+    if have_copy and entry.get("etag"): headers["If-None-Match"] = entry["etag"]
+    if have_copy and entry.get("last_modified"): headers["If-Modified-Since"] = entry["last_modified"]
+
+    r = session.get(url, headers=headers, timeout=60)
+    add_bytes(len(r.content))
+    if r.status_code == 304:
+        return pdf_path, False
+    r.raise_for_status()
+    digest = hashlib.sha256(r.content).hexdigest()
+    manifest[venue] = {"url": url, "sha256": digest, "etag": r.headers.get("ETag"),
+                       "last_modified": r.headers.get("Last-Modified")}
+    if have_copy and entry.get("sha256") == digest:
+        return pdf_path, False
+    with open(pdf_path, "wb") as f:
+        f.write(r.content)
+    return pdf_path, True
 
 # Extract data from PDF
-data = []
-with pdfplumber.open(pdf_path) as pdf:
-    for page in pdf.pages:
-        table = page.extract_table()
-        if not table: continue
-        for row in table[1:]:
-            name = row[0].strip() if row[0] else ""
-            time = row[1].strip() if len(row) > 1 and row[1] else ""
-
-            # Get performer name before any colon or dash
-            for sep in [":", "–", "-"]:
-                if sep in name:
-                    performer = name.split(sep)[0].strip()
-                    break
-            else:
-                performer = name
-
-            # Split Start Time into Date and Time
-            try:
-                dt = datetime.strptime(time, "%a, %b %d, %Y, %I:%M %p")
-                event_date = dt.strftime("%Y-%m-%d")
-                event_time = dt.strftime("%I:%M %p")
-            except:
-                event_date = ""
-                event_time = time
-
-            data.append(["Forest Hills Stadium", name, performer, event_date, event_time])
-
-# Create DataFrame with renamed columns
-df = pd.DataFrame(data, columns=["Venue", "Event Name", "Performer", "Event Date", "Event Time"])
+MONTHS = {m: i for i, m in enumerate(["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                                      "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], 1)}
+WEEKDAYS = {d: i for i, d in enumerate(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"])}
+START_TIME_PATTERN = re.compile(r"\s*(Mon|Tue|Wed|Thu|Fri|Sat|Sun),\s*([A-Za-z]{3})\s+(\d{1,2}),\s*(\d{4}),"
+                                r"\s*(\d{1,2}):(\d{2})\s*([AaPp][Mm])\s*$", re.IGNORECASE)
+
+@lru_cache(maxsize=4096)
+def parse_start_time(text):
+    """Parses "Sat, May 10, 2025, 07:00 PM" into a datetime, or None; calendars repeat times a lot."""
+    m = START_TIME_PATTERN.match(text)
+    if not m or m.group(2).title() not in MONTHS:
+        return None
+    month, day, year = MONTHS[m.group(2).title()], int(m.group(3)), int(m.group(4))
+    hour, minute = int(m.group(5)), int(m.group(6))
+    if not 1 <= hour <= 12:
+        return None
+    hour = hour % 12 + (12 if m.group(7).upper() == "PM" else 0)
+    try:
+        start = datetime(year, month, day, hour, minute)
+    except ValueError:
+        return None
+    if start.weekday() != WEEKDAYS[m.group(1).title()]:
+        # strptime ignores the weekday too; keep the event and trust the date
+        logger.warning("Weekday in %r does not match its date; using %s", text, start.date())
+    return start
+
+@instrumented("parse.pdf_pages", rows=lambda parts: len(parts[0]))
+def _parse_pages(pdf_path, page_numbers):
+    """Worker: returns the (name, start time) cells of each table row on the given pages."""
+    names, starts = [], []
+    with pdfplumber.open(pdf_path) as pdf:
+        for i in page_numbers:
+            table = pdf.pages[i].extract_table()
+            if not table: continue
+            for row in table[1:]:
+                names.append(row[0].strip() if row[0] else "")
+                starts.append(row[1].strip() if len(row) > 1 and row[1] else "")
+    return names, starts
+
+@instrumented("parse.calendar", rows=len)
+def parse_calendar(pdf_path, venue, workers=None):
+    """Parses every page of a calendar PDF, spreading page ranges over a process pool."""
+    if pdfplumber is None:
+        raise ImportError("pdfplumber is required to parse calendar PDFs")
+    with pdfplumber.open(pdf_path) as pdf:
+        page_count = len(pdf.pages)
+    workers = max(1, min(workers or os.cpu_count() or 1, page_count))
+    # Contiguous page ranges, so concatenating the results keeps the rows in page order
+    bounds = np.linspace(0, page_count, workers + 1).astype(int)
+    ranges = [range(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:])]
+    if workers == 1:
+        parts = [_parse_pages(pdf_path, ranges[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_parse_pages, [pdf_path] * workers, ranges))
+
+    names = [name for part in parts for name in part[0]]
+    starts = [start for part in parts for start in part[1]]
+    return events_frame(venue, names, starts)
+
+@instrumented("transform.events_frame", rows=len)
+def events_frame(venue, names, starts):
+    """Builds the event columns directly: performer split and start time parsing are per column."""
+    names = pd.Series(names, dtype=object)
+    starts = pd.Series(starts, dtype=object)
+
+    # Get performer name before any colon or dash, trying the separators in order
+    performer = names.copy()
+    remaining = pd.Series(True, index=names.index)
+    for sep in [":", "–", "-"]:
+        hit = remaining & names.str.contains(sep, regex=False)
+        performer[hit] = names[hit].str.split(sep, n=1).str[0].str.strip()
+        remaining &= ~hit
+
+    # Split Start Time into Date and Time; unparseable times are kept as they are
+    parsed = pd.Series([parse_start_time(s) for s in starts], index=starts.index, dtype=object)
+    ok = parsed.notna()
+    event_date = pd.Series("", index=names.index, dtype=object)
+    event_time = starts.copy()
+    stamps = pd.to_datetime(parsed[ok])
+    event_date[ok] = stamps.dt.strftime("%Y-%m-%d")
+    event_time[ok] = stamps.dt.strftime("%I:%M %p")
+
+    return pd.DataFrame({"Venue": venue, "Event Name": names, "Performer": performer,
+                         "Event Date": event_date, "Event Time": event_time}, columns=EVENT_COLUMNS)
+
+@instrumented("io.upsert_events", rows=lambda result: len(result[1]))
+def upsert_events(events, store_path=EVENTS_STORE, replace_venues=()):
+    """Merges events into the Parquet store by EVENT_KEY; returns (all events, newly added events).
+
+    Stored rows of the venues in `replace_venues` are dropped first, so events removed from or
+    rescheduled in a re-parsed calendar do not linger.
+    """
+    events = events.drop_duplicates(EVENT_KEY, keep="last")
+    if os.path.exists(store_path):
+        stored = pd.read_parquet(store_path)
+        known = pd.MultiIndex.from_frame(stored[EVENT_KEY])
+        new = events[~pd.MultiIndex.from_frame(events[EVENT_KEY]).isin(known)]
+        stored = stored[~stored["Venue"].isin(list(replace_venues))]
+        merged = pd.concat([stored, events], ignore_index=True).drop_duplicates(EVENT_KEY, keep="last")
+    else:
+        new = merged = events
+    merged = merged.reset_index(drop=True)
+    tmp = store_path + ".tmp"
+    merged.to_parquet(tmp, index=False)
+    os.replace(tmp, store_path)
+    return merged, new.reset_index(drop=True)
+
+def ingest_venues(calendars=VENUE_CALENDARS, store_path=EVENTS_STORE, pdf_dir=PDF_DIR, workers=None):
+    """Downloads changed calendars, parses only those, and upserts them into the event store."""
+    os.makedirs(pdf_dir, exist_ok=True)
+    manifest_path = os.path.join(pdf_dir, "manifest.json")
+    manifest = _load_manifest(manifest_path)
+    session = requests.Session()
+    parsed, venues = [], []
+    for venue, url in calendars.items():
+        pdf_path, changed = download_if_changed(venue, url, manifest, pdf_dir, session)
+        if changed or not os.path.exists(store_path):
+            parsed.append(parse_calendar(pdf_path, venue, workers))
+            venues.append(venue)
+
+    if parsed:
+        # A parsed calendar is the venue's whole schedule, so it replaces the venue's stored rows
+        result = upsert_events(pd.concat(parsed, ignore_index=True), store_path, replace_venues=venues)
+    else:
+        stored = pd.read_parquet(store_path) if os.path.exists(store_path) else pd.DataFrame(columns=EVENT_COLUMNS)
+        result = stored, stored.iloc[:0]
+    # Saved last, so a failed parse or upsert leaves the calendars marked as changed for the next run
+    _save_manifest(manifest, manifest_path)
+    return result
 
 # Get Wikipedia summaries
-def get_wiki_summary(name):
-    url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{urllib.parse.quote(name)}"
-    r = requests.get(url)
+WIKI_SUMMARY_URL = "https://en.wikipedia.org/api/rest_v1/page/summary/"
+WIKI_CACHE_PATH = "wiki_summaries.sqlite"
+WIKI_CACHE_TTL = 7 * 24 * 3600  # revalidate with the stored ETag after a week
+
+def summary_from_response(r):
     if r.status_code != 200: return "Not found"
     j = r.json()
     if j.get("type") == "disambiguation":
         return "Multiple meanings. Search manually."
     return j.get("extract", "No summary.")
 
-wiki_info = {p: get_wiki_summary(p) for p in df["Performer"].unique()}
-df["Performer Info"] = df["Performer"].map(wiki_info)
+@instrumented("http.wiki_summary")
+def get_wiki_summary(name, session=requests, base_url=WIKI_SUMMARY_URL):
+    url = f"{base_url}{urllib.parse.quote(name)}"
+    r = session.get(url)
+    add_bytes(len(r.content))
+    return summary_from_response(r)
+
+class WikiSummaryCache:
+    """Performer summaries in SQLite, with the ETag and fetch time needed to revalidate them."""
+
+    def __init__(self, path=WIKI_CACHE_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS summaries (
+            name TEXT PRIMARY KEY, summary TEXT, etag TEXT, fetched_at REAL)""")
+
+    def get_many(self, names):
+        rows = {}
+        names = list(names)
+        for i in range(0, len(names), 500):  # stay under SQLite's bound-parameter limit
+            batch = names[i:i + 500]
+            query = f"SELECT name, summary, etag, fetched_at FROM summaries WHERE name IN ({','.join('?' * len(batch))})"
+            rows.update({row[0]: row[1:] for row in self.conn.execute(query, batch)})
+        return rows
+
+    def put_many(self, entries):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)", entries)
+
+    def close(self):
+        self.conn.close()
+
+@instrumented("http.wiki_summary")
+def _fetch_summary(session, base_url, name, etag):
+    """Returns (summary, etag, cacheable); summary is None when a 304 confirms the cached copy."""
+    headers = {"If-None-Match": etag} if etag else {}
+    try:
+        r = session.get(f"{base_url}{urllib.parse.quote(name)}", headers=headers, timeout=30)
+    except requests.RequestException:
+        return "Not found", None, False
+    add_bytes(len(r.content))
+    if r.status_code == 304:
+        return None, etag, True
+    # Only definite answers are cached; throttling or server errors are retried next run
+    return summary_from_response(r), r.headers.get("ETag"), r.status_code in (200, 404)
+
+def enrich_performers(names, base_url=WIKI_SUMMARY_URL, cache_path=WIKI_CACHE_PATH, ttl=WIKI_CACHE_TTL,
+                      max_workers=8, session=None):
+    """Returns {performer: summary}, fetching only names missing from or stale in the cache.
+
+    Fetches run concurrently over one pooled session; stale entries are revalidated with
+    If-None-Match, so unchanged pages cost a 304 instead of a full download.
+    """
+    names = list(dict.fromkeys(names))
+    if session is None:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+    cache = WikiSummaryCache(cache_path)
+    try:
+        cached = cache.get_many(names)
+        now = time.time()
+        summaries = {n: cached[n][0] for n in names if n in cached and now - cached[n][2] < ttl}
+        todo = [n for n in names if n not in summaries]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(lambda n: _fetch_summary(session, base_url, n, cached.get(n, (None, None))[1]), todo)
+            updates = []
+            for name, (summary, etag, cacheable) in zip(todo, results):
+                if summary is None or (not cacheable and name in cached):
+                    summary = cached[name][0]  # a 304, or a failed fetch that should not replace a stale copy
+                summaries[name] = summary
+                if cacheable:
+                    updates.append((name, summary, etag, time.time()))
+        cache.put_many(updates)
+    finally:
+        cache.close()
+    return {n: summaries[n] for n in names}
+
+def start_mock_wiki_server(statuses=(200, 304, 503)):
+    """Starts a local summary API stand-in; returns (server, summary_url). Call server.shutdown() when done.
+
+    The k-th request for a name is answered with statuses[k] (the last one repeats): 200 sends a
+    summary with an ETag, 304 is sent only when If-None-Match carries that ETag. server.requests
+    records (name, If-None-Match) for every request.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            name = urllib.parse.unquote(self.path.rsplit("/", 1)[-1])
+            etag = f'"{hashlib.sha1(name.encode()).hexdigest()[:12]}"'
+            conditional = self.headers.get("If-None-Match")
+            with self.server.lock:
+                seen = sum(1 for n, _ in self.server.requests if n == name)
+                self.server.requests.append((name, conditional))
+            status = statuses[min(seen, len(statuses) - 1)]
+            if status == 304 and conditional != etag:
+                status = 200
+            body = json.dumps({"type": "standard", "extract": f"{name} is a performer."}).encode() if status == 200 else b""
+            self.send_response(status)
+            if status in (200, 304):
+                self.send_header("ETag", etag)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.requests = []
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/api/rest_v1/page/summary/"
+
+if __name__ == "__main__":
+    # Only calendars whose PDF changed are parsed; the store keeps every venue's events
+    df, new_events = ingest_venues()
+    print(f"{len(new_events)} new events")
+
+    wiki_info = enrich_performers(df["Performer"].unique())
+    df["Performer Info"] = df["Performer"].map(wiki_info)
 
-# Print DataFrame
-print(df)
+    # Print DataFrame
+    print(df)
 
-# Optional: Save as CSV
-# df.to_csv("forest_hills_events_cleaned.csv", index=False)
+    # Optional: Save as CSV
+    # df.to_csv("forest_hills_events_cleaned.csv", index=False)
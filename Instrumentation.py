@@ -0,0 +1,383 @@
+'''
+Lightweight instrumentation for the analytics scripts: spans that record wall time, call counts, bytes fetched
+and rows processed, exported as a Prometheus text file or a Chrome trace, plus an opt-in sampling profiler
+that writes folded stacks for flame graphs.
+
+Everything is off by default. Disabled, a decorated function costs one global check per call and span()
+returns a shared no-op object. Turn it on in code with enable(), or per run through the environment:
+
+    ANALYTICS_INSTRUMENT=1      record spans; write <dir>/<script>.prom at exit
+    ANALYTICS_TRACE=1           also keep every span; write <dir>/trace-<run>.json (chrome://tracing, Perfetto)
+    ANALYTICS_PROFILE=1         sample all threads' stacks; write <dir>/profile-<run>.folded
+    ANALYTICS_PROFILE_INTERVAL  seconds between samples, 0.005 by default
+    ANALYTICS_INSTRUMENT_DIR    output directory, "instrumentation" by default
+
+Spans are recorded per process. Work that runs in process-pool workers shows up as the parent's span
+around the pool, not as the workers' own spans.
+'''
+import atexit
+import collections
+import datetime
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+OUTPUT_DIR = "instrumentation"
+MAX_TRACE_EVENTS = 1_000_000  # about 200 MB of events; later spans still count in the metrics
+PROFILE_INTERVAL = 0.005
+METRIC_PREFIX = "analytics_span"
+
+# Leaf frames of threads that are parked rather than working; the profiler skips them by default
+IDLE_FRAMES = {
+    ("threading.py", "wait"), ("queue.py", "get"), ("thread.py", "_worker"),
+    ("selectors.py", "select"), ("socket.py", "accept"), ("connection.py", "_recv"),
+}
+
+_enabled = False
+_recorder = None
+_local = threading.local()
+
+
+class Recorder:
+    """Per-span totals, plus the individual spans as trace events when `trace` is set. Thread-safe."""
+
+    def __init__(self, trace=False, max_events=MAX_TRACE_EVENTS):
+        self.trace = trace
+        self.max_events = max_events
+        self.lock = threading.Lock()
+        self.epoch = time.perf_counter()
+        self.started = time.time()
+        self.stats = {}  # name -> [calls, seconds, max seconds, bytes, rows, errors]
+        self.events = []
+        self.dropped = 0
+        self.thread_names = {}
+
+    def record(self, name, start, seconds, nbytes, rows, error):
+        with self.lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = [0, 0.0, 0.0, 0, 0, 0]
+            stat[0] += 1
+            stat[1] += seconds
+            if seconds > stat[2]:
+                stat[2] = seconds
+            stat[3] += nbytes
+            stat[4] += rows
+            stat[5] += error
+            if not self.trace:
+                return
+            if len(self.events) >= self.max_events:
+                self.dropped += 1
+                return
+            tid = threading.get_ident()
+            if tid not in self.thread_names:
+                self.thread_names[tid] = threading.current_thread().name
+            args = {}
+            if nbytes:
+                args["bytes"] = nbytes
+            if rows:
+                args["rows"] = rows
+            if error:
+                args["error"] = True
+            self.events.append((name, start - self.epoch, seconds, tid, args))
+
+    def snapshot(self):
+        """Returns {span name: {calls, seconds, max_seconds, bytes, rows, errors}}."""
+        with self.lock:
+            return {name: dict(zip(("calls", "seconds", "max_seconds", "bytes", "rows", "errors"), stat))
+                    for name, stat in self.stats.items()}
+
+    def chrome_trace(self):
+        pid = os.getpid()
+        with self.lock:
+            events = [{"name": name, "cat": name.split(".", 1)[0], "ph": "X", "pid": pid, "tid": tid,
+                       "ts": round(offset * 1e6, 3), "dur": round(seconds * 1e6, 3), "args": args}
+                      for name, offset, seconds, tid, args in self.events]
+            events += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}}
+                       for tid, thread_name in self.thread_names.items()]
+            dropped = self.dropped
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"started": self.started, "dropped_events": dropped}}
+
+
+class Span:
+    """Times a block; add() attributes bytes and rows to it. Use via span() or @instrumented."""
+
+    __slots__ = ("name", "start", "bytes", "rows")
+
+    def __init__(self, name):
+        self.name = name
+        self.bytes = 0
+        self.rows = 0
+
+    def add(self, nbytes=0, rows=0):
+        self.bytes += nbytes
+        self.rows += rows
+        return self
+
+    def __enter__(self):
+        stack = _local.__dict__.setdefault("stack", [])
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        _local.stack.pop()
+        recorder = _recorder
+        if recorder is not None:
+            recorder.record(self.name, self.start, seconds, self.bytes, self.rows, exc_type is not None)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def add(self, nbytes=0, rows=0):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    """Context manager timing a block under `name`; a shared no-op when instrumentation is off."""
+    return Span(name) if _enabled else NULL_SPAN
+
+
+def add_bytes(nbytes):
+    """Adds bytes fetched to the innermost open span on this thread."""
+    if _enabled:
+        stack = _local.__dict__.get("stack")
+        if stack:
+            stack[-1].bytes += nbytes
+
+
+def add_rows(rows):
+    """Adds rows processed to the innermost open span on this thread."""
+    if _enabled:
+        stack = _local.__dict__.get("stack")
+        if stack:
+            stack[-1].rows += rows
+
+
+def instrumented(name=None, rows=None):
+    """Decorator recording each call as a span named `name` (default: module.qualname).
+
+    rows, if given, is called on the return value to count the rows it processed, e.g. rows=len.
+    Usable bare (@instrumented) or with arguments (@instrumented("http.forecast")).
+    """
+    def decorate(func):
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(label) as s:
+                result = func(*args, **kwargs)
+                if rows is not None and result is not None:
+                    s.rows += rows(result)
+                return result
+        return wrapper
+
+    if callable(name):
+        func, name = name, None
+        return decorate(func)
+    return decorate
+
+
+def enable(trace=False, max_events=MAX_TRACE_EVENTS):
+    """Starts recording spans into a fresh recorder; returns it."""
+    global _enabled, _recorder
+    _recorder = Recorder(trace=trace, max_events=max_events)
+    _enabled = True
+    return _recorder
+
+
+def disable():
+    """Stops recording. The last recorder's data stays readable through stats() and the writers."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def stats():
+    return _recorder.snapshot() if _recorder is not None else {}
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)  # scrapers never see a half-written file
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def prometheus_text(snapshot=None, labels=None):
+    """Renders span totals in the Prometheus text exposition format."""
+    snapshot = stats() if snapshot is None else snapshot
+    extra = "".join(f',{key}="{_label(str(value))}"' for key, value in sorted((labels or {}).items()))
+    metrics = [
+        ("calls_total", "counter", "Calls of each instrumented span.", "calls"),
+        ("seconds_total", "counter", "Wall time spent in each span, in seconds.", "seconds"),
+        ("seconds_max", "gauge", "Longest single call of each span, in seconds.", "max_seconds"),
+        ("bytes_total", "counter", "Bytes fetched inside each span.", "bytes"),
+        ("rows_total", "counter", "Rows processed inside each span.", "rows"),
+        ("errors_total", "counter", "Calls of each span that raised.", "errors"),
+    ]
+    lines = []
+    for suffix, kind, help_text, key in metrics:
+        metric = f"{METRIC_PREFIX}_{suffix}"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name in sorted(snapshot):
+            lines.append(f'{metric}{{span="{_label(name)}"{extra}}} {snapshot[name][key]!r}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path, labels=None):
+    """Writes span totals to a .prom file, e.g. for node_exporter's textfile collector."""
+    _write_atomic(path, prometheus_text(labels=labels))
+    return path
+
+
+def write_chrome_trace(path):
+    """Writes recorded spans as Chrome trace JSON (needs enable(trace=True))."""
+    if _recorder is None:
+        raise RuntimeError("Instrumentation was never enabled")
+    _write_atomic(path, json.dumps(_recorder.chrome_trace()))
+    return path
+
+
+class SamplingProfiler:
+    """Samples every thread's Python stack at a fixed interval and counts identical stacks.
+
+    Output is the folded-stack format ("outer;inner count" per line) read by flamegraph.pl,
+    speedscope and inferno. Threads parked in IDLE_FRAMES are skipped unless include_idle is set.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL, include_idle=False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.counts = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._labels = {}
+
+    def _frame_label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def sample(self):
+        own = threading.get_ident()
+        for tid, frame in sys._current_frames().items():
+            if tid == own:
+                continue
+            leaf = frame.f_code
+            if not self.include_idle and (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.counts[";".join(stack)] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+    def write_folded(self, path):
+        _write_atomic(path, self.folded())
+        return path
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def _run_name():
+    script = os.path.splitext(os.path.basename(sys.argv[0] if sys.argv and sys.argv[0] else "python"))[0]
+    return script or "python"
+
+
+def _write_reports(output_dir, profiler):
+    # Pool workers inherit the environment; only the process that owns the run writes reports
+    if multiprocessing.parent_process() is not None:
+        return
+    script = _run_name()
+    run = f"{script}-{datetime.datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+    if profiler is not None:
+        profiler.stop()
+        profiler.write_folded(os.path.join(output_dir, f"profile-{run}.folded"))
+    if _recorder is not None:
+        write_prometheus(os.path.join(output_dir, f"{script}.prom"), labels={"script": script})
+        if _recorder.trace:
+            write_chrome_trace(os.path.join(output_dir, f"trace-{run}.json"))
+
+
+def _env_flag(value):
+    return value.strip().lower() not in ("", "0", "false", "no", "off")
+
+
+def configure_from_env(environ=os.environ):
+    """Applies the ANALYTICS_* settings; called once on import."""
+    metrics = _env_flag(environ.get("ANALYTICS_INSTRUMENT", ""))
+    trace = _env_flag(environ.get("ANALYTICS_TRACE", ""))
+    profile = _env_flag(environ.get("ANALYTICS_PROFILE", ""))
+    if not (metrics or trace or profile):
+        return
+    output_dir = environ.get("ANALYTICS_INSTRUMENT_DIR", OUTPUT_DIR)
+    if metrics or trace:
+        enable(trace=trace)
+    profiler = None
+    if profile and multiprocessing.parent_process() is None:
+        interval = float(environ.get("ANALYTICS_PROFILE_INTERVAL") or PROFILE_INTERVAL)
+        profiler = SamplingProfiler(interval).start()
+    atexit.register(_write_reports, output_dir, profiler)
+
+
+configure_from_env()
@@ -0,0 +1,530 @@
+'''
+Collects current weather for US cities from OpenWeatherMap, the way the OpenWeatherMap_API notebook does,
+but concurrently, under a rate limit, with retries and with on-disk caches for the city table and the API.
+'''
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from html.parser import HTMLParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import requests
+import numpy as np
+import pandas as pd
+
+from Instrumentation import add_bytes, instrumented, span
+
+# Constants
+CITY_TABLE_URL = "https://en.wikipedia.org/wiki/List_of_United_States_cities_by_population"
+OWM_URL = "http://api.openweathermap.org/data/2.5/weather"
+OWM_API_KEY = os.environ.get("OWM_API_KEY", "")
+OWM_UNITS = "imperial"
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "openweathermap")
+CITY_TABLE_TTL = 7 * 24 * 3600  # the population table changes a few times a year
+WEATHER_TTL = 10 * 60  # OpenWeatherMap refreshes current conditions about every 10 minutes
+
+# The free plan allows 60 calls a minute; paid plans raise this
+RATE_PER_SECOND = 1.0
+MAX_WORKERS = 16
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 0.5
+RETRY_STATUS = {429, 500, 502, 503, 504}
+CACHE_FLUSH_EVERY = 500
+
+# Cell positions in the Wikipedia table, as used in the notebook
+RANK_CELL, NAME_CELL, POPULATION_CELL, LAND_AREA_CELL = 0, 1, 3, 6
+CITY_COLUMNS = ["Rank", "City_name", "2019_Population", "2016_Land_Area_sq_mi", "Latitude", "Longitude"]
+COORDINATE_DECIMALS = 2
+
+# DF2 column -> path into the API response; all float64 so a missing city is just NaN
+WEATHER_FIELDS = {
+    "Current_temperature": ("main", "temp"),
+    "Min_temperature": ("main", "temp_min"),
+    "Max_temperature": ("main", "temp_max"),
+    "Pressure_hPa_unit": ("main", "pressure"),
+    "Humidity_percentage": ("main", "humidity"),
+    "Visibility_meters": ("visibility",),
+    "Wind_speed_mph": ("wind", "speed"),
+}
+
+NUMBER_PATTERN = re.compile(r"\d[\d,]*(?:\.\d+)?")
+FOOTNOTE_PATTERN = re.compile(r"\[[^\]]*\]")
+
+
+def _first_number(text):
+    match = NUMBER_PATTERN.search(FOOTNOTE_PATTERN.sub("", text))
+    return float(match.group(0).replace(",", "")) if match else np.nan
+
+
+class CityTableParser(HTMLParser):
+    """Streams the first 'wikitable sortable' table into rows of (cell texts, first link texts, geo text).
+
+    One pass over the page without building a document tree; everything outside the table is skipped.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self.state = "before"  # before -> in_table -> done
+        self.depth = 0  # nested tables inside the one we want
+        self.row = None
+        self.cell = None
+        self.link = None
+        self.geo = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.state == "done":
+            return
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if tag == "table":
+            if self.state == "before" and "wikitable" in classes and "sortable" in classes:
+                self.state = "in_table"
+            elif self.state == "in_table":
+                self.depth += 1
+            return
+        if self.state != "in_table" or self.depth:
+            return
+        if tag == "tr":
+            self.row = {"cells": [], "links": [], "geo": None}
+        elif tag in ("td", "th") and self.row is not None:
+            self.cell, self.link = [], None
+        elif tag == "a" and self.cell is not None and self.link is None:
+            self.link = []
+        elif tag == "span" and "geo" in classes and self.row is not None:
+            self.geo = []
+
+    def handle_endtag(self, tag):
+        if self.state != "in_table":
+            return
+        if tag == "table":
+            if self.depth:
+                self.depth -= 1
+            else:
+                self.state = "done"
+            return
+        if self.depth:
+            return
+        if tag == "a" and self.link is not None and not isinstance(self.link, str):
+            self.link = "".join(self.link).strip()
+        elif tag == "span" and self.geo is not None:
+            self.row["geo"] = "".join(self.geo)
+            self.geo = None
+        elif tag in ("td", "th") and self.cell is not None:
+            link = self.link if isinstance(self.link, str) else None
+            self.row["cells"].append(" ".join("".join(self.cell).split()))
+            self.row["links"].append(link)
+            self.cell = self.link = None
+        elif tag == "tr" and self.row is not None:
+            self.rows.append(self.row)
+            self.row = None
+
+    def handle_data(self, data):
+        if self.state != "in_table" or self.depth:
+            return
+        if self.cell is not None:
+            self.cell.append(data)
+            if isinstance(self.link, list):
+                self.link.append(data)
+        if self.geo is not None:
+            self.geo.append(data)
+
+
+@instrumented("parse.city_table", rows=len)
+def parse_city_table(html, limit=None):
+    """Builds DF1 from the city table: rank, name, population, land area and rounded coordinates."""
+    parser = CityTableParser()
+    parser.feed(html)
+    parser.close()
+
+    records = []
+    for row in parser.rows:
+        cells = row["cells"]
+        # Header rows have no coordinates; data rows carry a "lat; lon" geo span
+        if row["geo"] is None or len(cells) <= LAND_AREA_CELL:
+            continue
+        latitude, longitude = (float(part) for part in row["geo"].split(";")[:2])
+        name = row["links"][NAME_CELL] or FOOTNOTE_PATTERN.sub("", cells[NAME_CELL]).strip()
+        records.append((_first_number(cells[RANK_CELL]), name, _first_number(cells[POPULATION_CELL]),
+                        _first_number(cells[LAND_AREA_CELL]), latitude, longitude))
+        if limit and len(records) >= limit:
+            break
+
+    cities = pd.DataFrame.from_records(records, columns=CITY_COLUMNS)
+    cities["Rank"] = cities["Rank"].astype("Int64")
+    cities["2019_Population"] = cities["2019_Population"].astype("Int64")
+    cities[["Latitude", "Longitude"]] = cities[["Latitude", "Longitude"]].round(COORDINATE_DECIMALS)
+    return cities
+
+
+def _fresh(path, ttl):
+    try:
+        return time.time() - os.path.getmtime(path) < ttl
+    except OSError:
+        return False
+
+
+def load_city_table(url=CITY_TABLE_URL, cache_dir=CACHE_DIR, ttl=CITY_TABLE_TTL, session=None, limit=None):
+    """Returns DF1, scraping the page only when the cached table is older than the TTL."""
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, f"city_table_{hashlib.sha1(url.encode()).hexdigest()}.pkl")
+        if _fresh(cache_path, ttl):
+            cities = pd.read_pickle(cache_path)
+            return cities.head(limit) if limit else cities
+
+    with span("http.city_table"):
+        response = (session or requests).get(url, timeout=30)
+        add_bytes(len(response.content))
+    response.raise_for_status()
+    cities = parse_city_table(response.text)
+
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        cities.to_pickle(tmp_path)
+        os.replace(tmp_path, cache_path)  # readers never see a half-written file
+    return cities.head(limit) if limit else cities
+
+
+def read_gazetteer_places(path):
+    """Reads a Census Gazetteer places file (~19,000 incorporated places plus CDPs) in DF1's layout."""
+    places = pd.read_csv(path, sep="\t", dtype={"GEOID": str}, encoding="latin-1")
+    places.columns = places.columns.str.strip()
+    names = places["NAME"].str.replace(r"\s+(city|town|village|borough|CDP|municipality)$", "", regex=True)
+    cities = pd.DataFrame({
+        "Rank": pd.array(np.arange(1, len(places) + 1), dtype="Int64"),
+        "City_name": names + ", " + places["USPS"] + ", US",
+        "2019_Population": pd.array([pd.NA] * len(places), dtype="Int64"),
+        "2016_Land_Area_sq_mi": places["ALAND_SQMI"].astype(float),
+        "Latitude": places["INTPTLAT"].astype(float).round(COORDINATE_DECIMALS),
+        "Longitude": places["INTPTLONG"].astype(float).round(COORDINATE_DECIMALS),
+    })
+    return cities
+
+
+class RateLimiter:
+    """Thread-safe token bucket: at most `rate` acquisitions per second, with bursts up to `burst`.
+
+    Tokens are reserved under the lock and the wait happens outside it, so waiting threads
+    queue up in order instead of spinning on the lock.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+class ResponseCache:
+    """API responses in SQLite keyed by query (never the API key), with the time they were fetched."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+            query TEXT PRIMARY KEY, status INTEGER, payload TEXT, fetched_at REAL)""")
+
+    def get_many(self, queries, ttl):
+        rows = {}
+        queries = list(queries)
+        cutoff = time.time() - ttl
+        for i in range(0, len(queries), 500):  # stay under SQLite's bound-parameter limit
+            batch = queries[i:i + 500]
+            sql = (f"SELECT query, status, payload FROM responses "
+                   f"WHERE fetched_at > ? AND query IN ({','.join('?' * len(batch))})")
+            rows.update({query: (status, json.loads(payload))
+                         for query, status, payload in self.conn.execute(sql, [cutoff, *batch])})
+        return rows
+
+    def put_many(self, entries):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                                  [(query, status, json.dumps(payload), fetched_at)
+                                   for query, status, payload, fetched_at in entries])
+
+    def evict_expired(self, ttl):
+        with self.conn:
+            self.conn.execute("DELETE FROM responses WHERE fetched_at <= ?", (time.time() - ttl,))
+
+    def close(self):
+        self.conn.close()
+
+
+class WeatherColumns:
+    """Preallocated DF2 columns, filled in place by row position as responses arrive."""
+
+    def __init__(self, size):
+        self.columns = {name: np.full(size, np.nan) for name in WEATHER_FIELDS}
+        self.status = np.zeros(size, dtype=np.int16)
+
+    def fill(self, i, status, payload):
+        self.status[i] = status
+        if status != 200:
+            return
+        for name, path in WEATHER_FIELDS.items():
+            value = payload
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            if value is not None:
+                self.columns[name][i] = value
+
+    def to_frame(self, index=None):
+        frame = pd.DataFrame(self.columns, index=index)
+        frame["Status"] = self.status
+        return frame
+
+
+def weather_query(city_name=None, latitude=None, longitude=None, units=OWM_UNITS):
+    """Query parameters for one place, by coordinates when known (unambiguous) else by name."""
+    if latitude is not None and longitude is not None and not (np.isnan(latitude) or np.isnan(longitude)):
+        return {"lat": f"{latitude:.{COORDINATE_DECIMALS}f}", "lon": f"{longitude:.{COORDINATE_DECIMALS}f}",
+                "units": units}
+    return {"q": city_name, "units": units}
+
+
+def _query_key(params):
+    return "&".join(f"{k}={params[k]}" for k in sorted(params))
+
+
+def fetch_with_retry(session, url, params, limiter=None, retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+    """Returns (status, payload). Retries throttling, server errors and failed requests.
+
+    Retries are done here rather than by urllib3 so every attempt passes through the rate limiter.
+    status is 0 when the request never got an answer.
+    """
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        retry_after = None
+        try:
+            with span("http.owm_weather"):
+                response = session.get(url, params=params, timeout=30)
+                add_bytes(len(response.content))
+        except requests.RequestException:  # dropped connections, timeouts, truncated bodies
+            if attempt == retries:
+                return 0, None
+        else:
+            if response.status_code not in RETRY_STATUS or attempt == retries:
+                try:
+                    payload = response.json()
+                except ValueError:
+                    payload = None
+                return response.status_code, payload
+            retry_after = response.headers.get("Retry-After")
+        delay = backoff * 2 ** attempt * (0.5 + random.random())  # jitter keeps workers from retrying in step
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        time.sleep(delay)
+
+
+def pooled_session(pool_size):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@instrumented("weather.collect", rows=len)
+def collect_weather(cities, api_key=OWM_API_KEY, base_url=OWM_URL, units=OWM_UNITS, by_coordinates=True,
+                    cache_dir=CACHE_DIR, ttl=WEATHER_TTL, rate_per_second=RATE_PER_SECOND, burst=1,
+                    workers=MAX_WORKERS, retries=MAX_RETRIES, backoff=BACKOFF_SECONDS, session=None):
+    """Returns DF2 for a DF1-shaped frame: one row per city, aligned to its index.
+
+    Cached responses younger than `ttl` are reused; the rest are fetched by `workers` threads
+    sharing one pooled session and one rate limiter. Places that share a query are fetched once.
+    Only definite answers (200 and 404) are cached. `Status` holds the HTTP status, 0 if unreachable.
+    """
+    names = cities["City_name"].tolist()
+    if by_coordinates and {"Latitude", "Longitude"} <= set(cities.columns):
+        lats = cities["Latitude"].to_numpy(dtype=float)
+        lons = cities["Longitude"].to_numpy(dtype=float)
+        params = [weather_query(n, la, lo, units) for n, la, lo in zip(names, lats, lons)]
+    else:
+        params = [weather_query(n, units=units) for n in names]
+    keys = [_query_key(p) for p in params]
+
+    rows_by_key = {}
+    for i, key in enumerate(keys):
+        rows_by_key.setdefault(key, []).append(i)
+
+    columns = WeatherColumns(len(cities))
+    cache = None
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        cache = ResponseCache(os.path.join(cache_dir, "responses.sqlite"))
+    try:
+        cached = cache.get_many(rows_by_key, ttl) if cache else {}
+        for key, (status, payload) in cached.items():
+            for i in rows_by_key[key]:
+                columns.fill(i, status, payload)
+
+        pending = [key for key in rows_by_key if key not in cached]
+        if pending:
+            session = session or pooled_session(workers)
+            limiter = RateLimiter(rate_per_second, burst=burst)
+            to_cache = []
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(fetch_with_retry, session, base_url,
+                                           {**params[rows_by_key[key][0]], "appid": api_key},
+                                           limiter, retries, backoff): key for key in pending}
+                # Results land on this thread only, so the buffers and SQLite need no locking
+                for future in as_completed(futures):
+                    key = futures[future]
+                    status, payload = future.result()
+                    for i in rows_by_key[key]:
+                        columns.fill(i, status, payload)
+                    if cache and status in (200, 404):
+                        to_cache.append((key, status, payload, time.time()))
+                        if len(to_cache) >= CACHE_FLUSH_EVERY:
+                            cache.put_many(to_cache)
+                            to_cache = []
+            if cache and to_cache:
+                cache.put_many(to_cache)
+    finally:
+        if cache:
+            cache.close()
+    return columns.to_frame(cities.index)
+
+
+def _mock_weather_payload(query):
+    """Deterministic fake current conditions for a name or coordinate query; 'Nowhere' is not found."""
+    name = query.get("q", [""])[0]
+    if name.startswith("Nowhere"):
+        return 404, {"cod": "404", "message": "city not found"}
+    seed = int(hashlib.sha1(json.dumps(sorted(query.items())).encode()).hexdigest()[:8], 16)
+    rng = np.random.default_rng(seed)
+    temp = float(rng.uniform(10, 95))
+    return 200, {
+        "cod": 200,
+        "name": name or f"{query.get('lat', ['0'])[0]},{query.get('lon', ['0'])[0]}",
+        "main": {"temp": temp, "temp_min": temp - 3.0, "temp_max": temp + 3.0,
+                 "pressure": int(rng.integers(990, 1030)), "humidity": int(rng.integers(10, 100))},
+        "visibility": int(rng.integers(1000, 10001)),
+        "wind": {"speed": float(rng.uniform(0, 25))},
+    }
+
+
+def start_mock_weather_server(latency=0.0, throttle_every=0):
+    """Starts a threaded local OpenWeatherMap stand-in; returns (server, weather_url). Call server.shutdown() when done.
+
+    With throttle_every=N, every Nth request is answered 429 so retries get exercised.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            with self.server.lock:
+                self.server.request_count += 1
+                throttled = throttle_every and self.server.request_count % throttle_every == 0
+            query = parse_qs(urlparse(self.path).query)
+            query.pop("appid", None)
+            if throttled:
+                status, payload = 429, {"cod": 429, "message": "rate limit exceeded"}
+            else:
+                status, payload = _mock_weather_payload(query)
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.request_count = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/data/2.5/weather"
+
+
+def synthetic_places(num_places, seed=0):
+    """A DF1-shaped frame of random places across the contiguous US."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Rank": pd.array(np.arange(1, num_places + 1), dtype="Int64"),
+        "City_name": [f"Place {i}" for i in range(num_places)],
+        "2019_Population": pd.array(rng.integers(100, 1_000_000, num_places), dtype="Int64"),
+        "2016_Land_Area_sq_mi": rng.uniform(0.5, 500, num_places).round(2),
+        "Latitude": rng.uniform(25, 48, num_places).round(COORDINATE_DECIMALS),
+        "Longitude": rng.uniform(-123, -70, num_places).round(COORDINATE_DECIMALS),
+    })
+
+
+def benchmark_collector(num_places=19_000, latency=0.05, workers=64, rate_per_second=2_000.0, cache_dir=None):
+    """Measures places per second against the mock server, cold and then from the response cache."""
+    import tempfile
+
+    server, url = start_mock_weather_server(latency=latency, throttle_every=100)
+    try:
+        places = synthetic_places(num_places)
+        with tempfile.TemporaryDirectory() as tmp:
+            for label in ("cold", "cached"):
+                before = server.request_count
+                start = time.perf_counter()
+                weather = collect_weather(places, api_key="mock", base_url=url, cache_dir=cache_dir or tmp,
+                                          rate_per_second=rate_per_second, burst=workers, workers=workers,
+                                          backoff=0.05)
+                elapsed = time.perf_counter() - start
+                print(f"{label:>6}: {num_places:,} places in {elapsed:.2f}s, {num_places / elapsed:,.0f} places/s, "
+                      f"{server.request_count - before} requests, {(weather['Status'] != 200).sum()} without data")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--benchmark" in sys.argv:
+        benchmark_collector()
+        sys.exit()
+
+    import matplotlib.pyplot as plt
+
+    # DF1: the 35 largest cities (or every place in a Census Gazetteer file passed with --places)
+    if "--places" in sys.argv:
+        DF1 = read_gazetteer_places(sys.argv[sys.argv.index("--places") + 1])
+    else:
+        DF1 = load_city_table(limit=35)
+    print(DF1.head())
+
+    # DF2: current weather for each city, then DF3 merges the two
+    DF2 = collect_weather(DF1)
+    DF3 = DF1.join(DF2)
+    print(DF3.head())
+
+    # Latitude against each weather field, as in the notebook
+    for column, label, color in [("Current_temperature", "Current Temperature (°F)", "blue"),
+                                 ("Pressure_hPa_unit", "Pressure (hPa unit)", "red"),
+                                 ("Humidity_percentage", "Humidity (%)", "green"),
+                                 ("Visibility_meters", "Visibility (meters)", "purple"),
+                                 ("Wind_speed_mph", "Wind Speed (mph)", "yellow")]:
+        plt.scatter(DF3["Latitude"], DF3[column], facecolors=color, marker="o", edgecolor="black")
+        plt.title(f"City Latitude vs. {label.split(' (')[0]}")
+        plt.ylabel(label)
+        plt.xlabel("Latitude")
+        plt.grid(True)
+        plt.show()
+
+    DF3.to_csv('US Cities and their Weather Data.csv')
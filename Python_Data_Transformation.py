@@ -1,12 +1,138 @@
 # Transform the  messy data!
 
-import pandas as pd
+import math
+import os
 import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from Instrumentation import instrumented, span
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # vectorized mode falls back to pandas .str on object arrays
+    pa = None
+
+SPECIAL_CHARACTERS = r'[^A-Za-z0-9 ]+'
+
+# Every character Python's str.strip() removes, so the Arrow trim matches it exactly
+PYTHON_WHITESPACE = ''.join(c for c in map(chr, range(0x3001)) if c.isspace())
+
+
+def _arrow_text_op(arr, op):
+    """Runs one text op on an Arrow string array, matching the Python str methods."""
+    if op == 'strip':
+        return pc.utf8_trim(arr, characters=PYTHON_WHITESPACE)
+    if op == 'lower':
+        # Arrow's Unicode lowercasing skips Python's special cases (e.g. 'İ', final sigma)
+        if pc.all(pc.string_is_ascii(arr)).as_py() is not False:
+            return pc.ascii_lower(arr)
+        return pa.array(pd.Series(arr.to_pandas(), dtype=object).str.lower(), type=pa.string())
+    if op == 'special':
+        return pc.replace_substring_regex(arr, pattern=SPECIAL_CHARACTERS, replacement='')
+    raise ValueError(f"Unknown text operation: {op}")
+
+
+def _pandas_text_op(values, op):
+    if op == 'strip':
+        return values.str.strip()
+    if op == 'lower':
+        return values.str.lower()
+    if op == 'special':
+        return values.str.replace(SPECIAL_CHARACTERS, '', regex=True)
+    raise ValueError(f"Unknown text operation: {op}")
+
+
+def vectorized_text_cleaning(series, ops):
+    """Applies text ops ('strip', 'lower', 'special') to the string values of a column.
+
+    Non-string values and missing values are left untouched, exactly like the per-element
+    static methods on DataCleaner. All ops run on one Arrow array when pyarrow is available.
+    """
+    if isinstance(series.dtype, pd.StringDtype) and series.dtype.na_value is pd.NA:
+        # Series.apply hands back an object result and re-infers it (<NA> turns into nan); match that
+        series = series.astype(object)
+    if pd.api.types.is_object_dtype(series.dtype):
+        inferred = pd.api.types.infer_dtype(series, skipna=True)
+        if inferred == 'empty':
+            return series
+        mask = series.notna() if inferred == 'string' else series.map(lambda x: isinstance(x, str)).astype(bool)
+    elif pd.api.types.is_string_dtype(series.dtype):
+        mask = series.notna()
+    else:
+        return series
+
+    values = series[mask]
+    if pa is not None:
+        arr = pa.array(values.astype(object), type=pa.string())
+        for op in ops:
+            arr = _arrow_text_op(arr, op)
+        cleaned = pd.Series(arr.to_numpy(zero_copy_only=False), index=values.index, dtype=object)
+    else:
+        cleaned = values.astype(object)
+        for op in ops:
+            cleaned = _pandas_text_op(cleaned, op)
+
+    if mask.all():
+        result = cleaned.astype(series.dtype)
+    else:
+        result = series.copy()
+        result[mask] = cleaned.astype(series.dtype)
+    # Series.apply/DataFrame.map re-infer the dtype of object results; do the same
+    return result.infer_objects() if pd.api.types.is_object_dtype(series.dtype) else result
+
+
+def _is_scalar_fill(value):
+    return not isinstance(value, (dict, pd.Series, pd.DataFrame))
+
+
+def clean_column_name(col):
+    """Lowercases a column name and replaces runs of whitespace with underscores."""
+    return re.sub(r'\s+', '_', col.lower())
+
+
+def _without_repeats(ops):
+    # Every text op is idempotent, so back-to-back repeats can be dropped
+    result = []
+    for op in ops:
+        if op not in result[-1:]:
+            result.append(op)
+    return result
+
 
 class DataCleaner:
-    def __init__(self, df):
-        """Initializes the DataCleaner with a DataFrame."""
+    def __init__(self, df, vectorized=False, lazy=False, workers=1):
+        """Initializes the DataCleaner with a DataFrame.
+
+        With vectorized=True, text cleaning runs as one Arrow/.str kernel per string column
+        instead of a Python call per cell. The output is identical either way.
+
+        With lazy=True, the cleaning methods only record steps in a plan. get_dataframe()
+        optimizes the plan and runs it with as few intermediate copies as possible.
+
+        With workers > 1, the chain is planned as in lazy mode and the row-local steps
+        (text cleaning, fill_missing_values) run on row slices in a process pool. Slices
+        travel as Arrow IPC buffers in shared memory, and drop_duplicates is resolved
+        globally from row digests computed by the workers.
+        """
         self.df = df
+        self.vectorized = vectorized
+        self.workers = workers
+        self.lazy = lazy or workers > 1
+        self.plan = []
+
+    def _text_columns(self, df=None):
+        df = self.df if df is None else df
+        return [col for col in df.columns
+                if pd.api.types.is_object_dtype(df[col].dtype) or pd.api.types.is_string_dtype(df[col].dtype)]
     
     @staticmethod
     def remove_whitespace(text):
@@ -21,50 +147,634 @@ class DataCleaner:
     @staticmethod
     def remove_special_characters(text):
         """Removes special characters from a string."""
-        return re.sub(r'[^A-Za-z0-9 ]+', '', text) if isinstance(text, str) else text
+        return re.sub(SPECIAL_CHARACTERS, '', text) if isinstance(text, str) else text
+
+    def _clean_text(self, series, ops):
+        """Runs a list of text ops ('strip', 'lower', 'special') over a column in one pass."""
+        if self.vectorized:
+            return vectorized_text_cleaning(series, ops)
+        funcs = [{'strip': self.remove_whitespace, 'lower': self.to_lowercase,
+                  'special': self.remove_special_characters}[op] for op in ops]
+
+        def clean(value):
+            for func in funcs:
+                value = func(value)
+            return value
+
+        return series.apply(clean)
     
     def fill_missing_values(self, value):
         """Fills missing values in the DataFrame with a specified value."""
-        self.df = self.df.fillna(value)
+        if self.lazy:
+            self.plan.append(('fill_missing_values', value))
+            return self
+        with span("transform.datacleaner.fill_missing_values"):
+            self.df = self.df.fillna(value)
         return self
     
     def drop_duplicates(self):
         """Drops duplicate rows from the DataFrame."""
-        self.df = self.df.drop_duplicates()
+        if self.lazy:
+            self.plan.append(('drop_duplicates', None))
+            return self
+        with span("transform.datacleaner.drop_duplicates"):
+            self.df = self.df.drop_duplicates()
         return self
     
     def clean_column_names(self):
         """Cleans column names by making them lowercase and replacing spaces with underscores."""
-        self.df.columns = [re.sub(r'\s+', '_', col.lower()) for col in self.df.columns]
+        if self.lazy:
+            self.plan.append(('clean_column_names', None))
+            return self
+        with span("transform.datacleaner.clean_column_names"):
+            self.df.columns = [clean_column_name(col) for col in self.df.columns]
         return self
     
     def apply_text_cleaning(self, column):
         """Applies whitespace removal and lowercase conversion to a specific column."""
-        self.df[column] = self.df[column].apply(self.remove_whitespace).apply(self.to_lowercase)
+        if self.lazy:
+            self.plan.append(('text', [(column, 'strip'), (column, 'lower')]))
+            return self
+        with span("transform.datacleaner.apply_text_cleaning"):
+            if self.vectorized:
+                self.df[column] = vectorized_text_cleaning(self.df[column], ['strip', 'lower'])
+            else:
+                self.df[column] = self.df[column].apply(self.remove_whitespace).apply(self.to_lowercase)
+        return self
+
+    def apply_special_character_removal(self, column):
+        """Removes special characters from a specific column."""
+        if self.lazy:
+            self.plan.append(('text', [(column, 'special')]))
+            return self
+        with span("transform.datacleaner.apply_special_character_removal"):
+            if self.vectorized:
+                self.df[column] = vectorized_text_cleaning(self.df[column], ['special'])
+            else:
+                self.df[column] = self.df[column].apply(self.remove_special_characters)
         return self
     
     def clean_all_text_columns(self):
         """Applies text cleaning (whitespace & lowercase) to all string columns."""
-        self.df = self.df.map(lambda x: self.remove_whitespace(x) if isinstance(x, str) else x)
+        if self.lazy:
+            # None stands for "every text column at the time the step runs"
+            self.plan.append(('text', [(None, 'strip')]))
+            return self
+        with span("transform.datacleaner.clean_all_text_columns"):
+            if self.vectorized:
+                self.df = self.df.copy()
+                for col in self._text_columns():
+                    self.df[col] = vectorized_text_cleaning(self.df[col], ['strip'])
+            else:
+                self.df = self.df.map(lambda x: self.remove_whitespace(x) if isinstance(x, str) else x)
         return self
+
+    def optimize_plan(self):
+        """Returns the recorded plan rewritten into fewer, fused steps.
+
+        - Column renames are idempotent and do not touch values, so one rename runs first and
+          column references recorded before it are translated to the new names.
+        - Adjacent text steps are fused into one stage that visits each column once, keeping
+          the per-column order of ops; back-to-back repeats (strip, strip) run once.
+        - Repeated drop_duplicates with nothing in between collapse to one, as do repeated
+          fill_missing_values after a scalar fill; back-to-back per-column (dict) fills merge.
+          drop_duplicates is not moved past value-changing steps: cleaning can create new
+          duplicates ("John " vs "john"), so reordering would change the result.
+        """
+        renames = [step for step in self.plan if step[0] == 'clean_column_names']
+        mapping = {col: clean_column_name(col) for col in self.df.columns} if renames else {}
+
+        optimized = [('clean_column_names', None)] if renames else []
+        renamed = False
+        for name, arg in self.plan:
+            if name == 'clean_column_names':
+                renamed = True
+                continue
+            if name == 'text':
+                if not renamed:
+                    arg = [(mapping.get(col, col) if col is not None else None, op) for col, op in arg]
+                if optimized and optimized[-1][0] == 'text':
+                    optimized[-1] = ('text', optimized[-1][1] + arg)
+                else:
+                    optimized.append(('text', list(arg)))
+                continue
+            if optimized and optimized[-1][0] == name and name == 'drop_duplicates':
+                continue
+            if name == 'fill_missing_values':
+                if isinstance(arg, dict) and not renamed:
+                    arg = {mapping.get(col, col): value for col, value in arg.items()}
+                if optimized and optimized[-1][0] == name:
+                    previous = optimized[-1][1]
+                    if _is_scalar_fill(previous):
+                        # A scalar fill leaves nothing missing for the second one
+                        continue
+                    if isinstance(previous, dict) and isinstance(arg, dict):
+                        # Columns the first fill already covered keep its value
+                        optimized[-1] = (name, {**arg, **previous})
+                        continue
+            optimized.append((name, arg))
+        return optimized
+
+    def explain(self):
+        """Returns a readable description of the optimized plan."""
+        lines = ["== Optimized plan =="]
+        for i, (name, arg) in enumerate(self.optimize_plan(), 1):
+            if name == 'text':
+                columns = {}
+                for col, op in arg:
+                    columns.setdefault('<all text columns>' if col is None else col, []).append(op)
+                detail = '; '.join(f"{col}: {' -> '.join(_without_repeats(ops))}" for col, ops in columns.items())
+                lines.append(f"{i}. text cleaning ({detail})")
+            elif name == 'fill_missing_values':
+                lines.append(f"{i}. fill_missing_values({arg!r})")
+            else:
+                lines.append(f"{i}. {name}")
+        if len(lines) == 1:
+            lines.append("(empty)")
+        return '\n'.join(lines)
+
+    def _run_text_stage(self, df, steps):
+        text_columns = set(self._text_columns(df))
+        columns = [col for col in df.columns if col in text_columns]
+        columns += [col for col, _ in steps if col is not None and col not in text_columns and col not in columns]
+
+        updates = {}
+        for col in columns:
+            ops = _without_repeats(op for target, op in steps
+                                   if target == col or (target is None and col in text_columns))
+            if ops:
+                updates[col] = self._clean_text(df[col], ops)
+        if updates:
+            df = df.copy(deep=False)
+            for col, series in updates.items():
+                df[col] = series
+        return df
+
+    def _run_step(self, df, name, arg):
+        with span(f"transform.datacleaner.{name}") as s:
+            s.add(rows=len(df))
+            return self._apply_step(df, name, arg)
+
+    def _apply_step(self, df, name, arg):
+        if name == 'clean_column_names':
+            return df.rename(columns=clean_column_name)
+        if name == 'text':
+            return self._run_text_stage(df, arg)
+        if name == 'fill_missing_values':
+            return df.fillna(arg)
+        if name == 'drop_duplicates':
+            return self._drop_duplicates(df)
+        raise ValueError(f"Unknown plan step: {name}")
+
+    def _execute_plan(self):
+        if self.workers > 1 and pa is not None:
+            return self._execute_plan_parallel()
+        df = self.df
+        for name, arg in self.optimize_plan():
+            df = self._run_step(df, name, arg)
+        return df
+
+    def _execute_plan_parallel(self):
+        """Runs each stretch of row-local steps (plus a trailing dedupe) in the process pool."""
+        df = self.df
+        steps = self.optimize_plan()
+        i = 0
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while i < len(steps):
+                if steps[i][0] == 'clean_column_names':
+                    # Only touches the column index; not worth shipping to the workers
+                    df = self._run_step(df, *steps[i])
+                    i += 1
+                    continue
+                segment = []
+                while i < len(steps) and steps[i][0] in ('text', 'fill_missing_values'):
+                    segment.append(steps[i])
+                    i += 1
+                dedupe = i < len(steps) and steps[i][0] == 'drop_duplicates'
+                if dedupe:
+                    i += 1
+                df = self._run_parallel_segment(pool, df, segment, dedupe)
+        return df
+
+    @instrumented("transform.datacleaner.parallel_segment", rows=len)
+    def _run_parallel_segment(self, pool, df, segment, dedupe):
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed-type object columns have no Arrow type; run this stretch in-process
+            for name, arg in segment + ([('drop_duplicates', None)] if dedupe else []):
+                df = self._run_step(df, name, arg)
+            return df
+
+        source, size = _write_shared_table(table)
+        del table
+        results = []
+        try:
+            chunk_rows = max(math.ceil(len(df) / (self.workers * 4)), 1)
+            futures = [pool.submit(_clean_shared_chunk, source.name, size, start, chunk_rows,
+                                   segment, self.vectorized, dedupe)
+                       for start in range(0, max(len(df), 1), chunk_rows)]
+            for future in futures:
+                results.append(future.result())
+        finally:
+            source.close()
+            source.unlink()
+
+        parts = []
+        for kind, payload in results:
+            if kind == 'frame':
+                parts.append(payload)
+                continue
+            name, result_size = payload
+            output = shared_memory.SharedMemory(name=name)
+            try:
+                # One memcpy out of the block so it can be released right away
+                parts.append(pa.ipc.open_stream(pa.py_buffer(bytes(output.buf[:result_size]))).read_all())
+            finally:
+                output.close()
+                output.unlink()
+
+        if all(isinstance(part, pa.Table) for part in parts):
+            table = pa.concat_tables(parts)
+            if dedupe:
+                table = table.take(_first_occurrences(table.column(DIGEST_HI).to_numpy(),
+                                                      table.column(DIGEST_LO).to_numpy()))
+                table = table.drop_columns([DIGEST_HI, DIGEST_LO])
+            return table.to_pandas()
+
+        df = pd.concat([part.to_pandas() if isinstance(part, pa.Table) else part for part in parts])
+        if dedupe:
+            df = df.iloc[_first_occurrences(df[DIGEST_HI].to_numpy(), df[DIGEST_LO].to_numpy())]
+            df = df.drop(columns=[DIGEST_HI, DIGEST_LO])
+        return df
+
+    def _drop_duplicates(self, df):
+        return df.drop_duplicates()
     
     def get_dataframe(self):
         """Returns the cleaned DataFrame."""
+        if self.lazy and self.plan:
+            self.df = self._execute_plan()
+            self.plan = []
         return self.df
 
-# Fake data to test
-data = {
-    'Name': ['John', 'Mary', 'Sophia', 'David', 'Emily', 'Lucas', 'John', 'Emily', 'David', 'Sophia'],
-    'Age': [29, 34, None, 22, 28, 25, 29, 28, 22, None]
-}
-df = pd.DataFrame(data)
-
-cleaner = DataCleaner(df)
-df_cleaned = (cleaner.clean_all_text_columns()
-                     .fill_missing_values(0)
-                     .drop_duplicates()
-                     .clean_column_names()
-                     .apply_text_cleaning('name')
-                     .get_dataframe())
-
-print(df_cleaned)
+# 128-bit row digest built from two independently keyed 64-bit pandas row hashes
+DIGEST_DTYPE = np.dtype([('hi', '<u8'), ('lo', '<u8')])
+
+
+def _inexact_integers(series):
+    """Returns (mask, values) for the integers that float64 cannot hold exactly, or None if there are none."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        if not pd.api.types.is_integer_dtype(dtype):
+            return None
+        values = series.to_numpy(dtype=dtype.numpy_dtype, na_value=0)
+    elif np.issubdtype(dtype, np.integer):
+        values = series.to_numpy()
+    else:
+        return None
+    if values.dtype.itemsize < 8:
+        return None
+    as_float = values.astype('float64')
+    # 2**63 (2**64 unsigned) rounds out of range, so those never round-trip
+    limit = 2.0 ** (values.dtype.itemsize * 8 - (values.dtype.kind == 'i'))
+    inexact = as_float >= limit
+    fits = ~inexact
+    inexact[fits] = as_float[fits].astype(values.dtype) != values[fits]
+    if not inexact.any():
+        return None
+    return inexact, values[inexact]
+
+
+def row_digests(df):
+    """Returns one 128-bit digest per row, stable across chunks with differently inferred dtypes."""
+    canonical = df.copy(deep=False)
+    wide = []
+    for i, col in enumerate(canonical.columns):
+        # read_csv may infer int in one chunk and float (because of a NaN) in the next
+        if pd.api.types.is_numeric_dtype(canonical[col].dtype) and not pd.api.types.is_bool_dtype(canonical[col].dtype):
+            # Integers beyond 2**53 would collide as floats; their exact values are mixed in below
+            inexact = _inexact_integers(canonical[col])
+            if inexact is not None:
+                wide.append((i, *inexact))
+            canonical[col] = canonical[col].astype('float64')
+        elif pd.api.types.is_string_dtype(canonical[col].dtype):
+            canonical[col] = canonical[col].astype(object)
+    digests = np.empty(len(df), dtype=DIGEST_DTYPE)
+    digests['hi'] = pd.util.hash_pandas_object(canonical, index=False, hash_key='row-digest-hi-00').to_numpy()
+    digests['lo'] = pd.util.hash_pandas_object(canonical, index=False, hash_key='row-digest-lo-00').to_numpy()
+    # Rows without such integers keep the float digest, so they still match float chunks
+    for i, mask, values in wide:
+        for part, key in (('hi', 'row-digest-hi-01'), ('lo', 'row-digest-lo-01')):
+            extra = pd.util.hash_array(values, hash_key=key)
+            digests[part][mask] = digests[part][mask] * np.uint64(0x9E3779B97F4A7C15) + extra + np.uint64(i)
+    return digests
+
+
+def _sorted_contains(run, values):
+    """Boolean mask of which sorted `values` are present in the sorted array `run`."""
+    if len(run) == 0:
+        return np.zeros(len(values), dtype=bool)
+    pos = np.searchsorted(run, values)
+    return run[np.minimum(pos, len(run) - 1)] == values
+
+
+class RowDigestSet:
+    """Set of row digests with bounded memory.
+
+    New digests collect in sorted in-memory runs. Once more than max_in_memory digests are
+    held, they are written to disk as one sorted .npy run and memory-mapped for lookups.
+    Disk runs of similar size are merged block by block, so only O(log n) runs exist.
+    """
+
+    def __init__(self, max_in_memory=5_000_000, spill_dir=None, merge_block=1_000_000):
+        self.max_in_memory = max_in_memory
+        self.merge_block = merge_block
+        self.spill_dir = tempfile.mkdtemp(prefix='row_digests_', dir=spill_dir)
+        self._memory_runs = []
+        self._memory_size = 0
+        self._disk_runs = []
+        self._run_id = 0
+
+    def __len__(self):
+        return self._memory_size + sum(len(run) for run in self._disk_runs)
+
+    def add_new(self, digests):
+        """Adds digests and returns a mask marking the first occurrence of each unseen one."""
+        unique, first = np.unique(digests, return_index=True)
+        unseen = np.ones(len(unique), dtype=bool)
+        for run in self._memory_runs + self._disk_runs:
+            unseen &= ~_sorted_contains(run, unique)
+
+        mask = np.zeros(len(digests), dtype=bool)
+        mask[first[unseen]] = True
+
+        if unseen.any():
+            self._memory_runs.append(unique[unseen])
+            self._memory_size += int(unseen.sum())
+            if len(self._memory_runs) > 16:
+                self._memory_runs = [np.sort(np.concatenate(self._memory_runs))]
+            if self._memory_size > self.max_in_memory:
+                self._spill()
+        return mask
+
+    def _new_run_path(self):
+        self._run_id += 1
+        return os.path.join(self.spill_dir, f"run_{self._run_id:06d}.npy")
+
+    def _spill(self):
+        path = self._new_run_path()
+        np.save(path, np.sort(np.concatenate(self._memory_runs)))
+        self._memory_runs = []
+        self._memory_size = 0
+        self._disk_runs.append(np.load(path, mmap_mode='r'))
+        while len(self._disk_runs) > 1 and len(self._disk_runs[-2]) <= 2 * len(self._disk_runs[-1]):
+            right = self._disk_runs.pop()
+            left = self._disk_runs.pop()
+            self._disk_runs.append(self._merge(left, right))
+
+    def _merge(self, left, right):
+        # Runs never share a digest, so each element's merged position is its own index plus
+        # the number of smaller elements in the other run; write it straight to that slot.
+        path = self._new_run_path()
+        merged = np.lib.format.open_memmap(path, mode='w+', dtype=DIGEST_DTYPE, shape=(len(left) + len(right),))
+        for run, other in ((left, right), (right, left)):
+            for start in range(0, len(run), self.merge_block):
+                block = np.asarray(run[start:start + self.merge_block])
+                merged[start + np.arange(len(block)) + np.searchsorted(other, block)] = block
+        merged.flush()
+        for run in (left, right):
+            os.remove(run.filename)
+        del merged
+        return np.load(path, mmap_mode='r')
+
+    def close(self):
+        """Deletes the spill files."""
+        self._memory_runs = []
+        self._disk_runs = []
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+
+# Columns the workers append so the parent can deduplicate without rehashing
+DIGEST_HI, DIGEST_LO = '__row_digest_hi', '__row_digest_lo'
+
+
+def _first_occurrences(hi, lo):
+    """Sorted positions of the first row for each distinct (hi, lo) digest."""
+    digests = np.empty(len(hi), dtype=DIGEST_DTYPE)
+    digests['hi'] = hi
+    digests['lo'] = lo
+    _, first = np.unique(digests, return_index=True)
+    return np.sort(first)
+
+
+def _write_shared_table(table):
+    """Writes a table as an Arrow IPC stream into a new shared memory block."""
+    sizer = pa.MockOutputStream()
+    with pa.ipc.new_stream(sizer, table.schema) as writer:
+        writer.write_table(table)
+    size = sizer.size()
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    with pa.ipc.new_stream(pa.FixedSizeBufferWriter(pa.py_buffer(block.buf)), table.schema) as writer:
+        writer.write_table(table)
+    return block, size
+
+
+def _read_shared_slice(name, size, start, rows):
+    """Reads rows [start, start + rows) of a shared table into memory owned by this process."""
+    source = shared_memory.SharedMemory(name=name)
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(source.buf[:size])).read_all().slice(start, rows)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        # No view of the block may outlive it, or close() fails
+        del table
+    finally:
+        source.close()
+    return pa.ipc.open_stream(sink.getvalue()).read_all()
+
+
+def _clean_shared_chunk(source_name, size, start, rows, segment, vectorized, dedupe):
+    """Worker: cleans one row slice of a shared table and returns where the result lives.
+
+    The result is written to a new shared block. If cleaning left a column with mixed
+    Python types (e.g. fill_missing_values(0) on a text column), Arrow cannot hold it and
+    the DataFrame is returned directly instead.
+    """
+    chunk = _read_shared_slice(source_name, size, start, rows).to_pandas()
+    cleaner = DataCleaner(chunk, vectorized=vectorized)
+    for name, arg in segment:
+        chunk = cleaner._run_step(chunk, name, arg)
+    if dedupe:
+        digests = row_digests(chunk)
+    try:
+        result = pa.Table.from_pandas(chunk, preserve_index=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        if dedupe:
+            chunk = chunk.assign(**{DIGEST_HI: digests['hi'], DIGEST_LO: digests['lo']})
+        return 'frame', chunk
+    if dedupe:
+        result = result.append_column(DIGEST_HI, pa.array(digests['hi']))
+        result = result.append_column(DIGEST_LO, pa.array(digests['lo']))
+    output, output_size = _write_shared_table(result)
+    output.close()
+    return 'arrow', (output.name, output_size)
+
+
+class _ChunkCleaner(DataCleaner):
+    """Runs a shared plan on one chunk, deduplicating against every earlier chunk."""
+
+    def __init__(self, df, plan, digests, vectorized=False):
+        super().__init__(df, vectorized=vectorized, lazy=True)
+        self.plan = list(plan)
+        self.digests = digests
+
+    def _drop_duplicates(self, df):
+        return df[self.digests.add_new(row_digests(df))]
+
+
+class StreamingDataCleaner(DataCleaner):
+    """DataCleaner for CSV files larger than memory.
+
+    The fluent methods record a plan (as in lazy mode) that runs on each chunk read from
+    the CSV. drop_duplicates is global across chunks: a RowDigestSet remembers the digest
+    of every kept row within a fixed memory budget and spills the rest to disk. Memory use
+    is bounded by chunksize and max_digests_in_memory, not by the size of the input.
+    """
+
+    def __init__(self, path, chunksize=100_000, vectorized=False, max_digests_in_memory=5_000_000,
+                 spill_dir=None, **read_csv_kwargs):
+        self.path = path
+        self.chunksize = chunksize
+        self.max_digests_in_memory = max_digests_in_memory
+        self.spill_dir = spill_dir
+        self.read_csv_kwargs = read_csv_kwargs
+        # Only the header is loaded; the plan optimizer needs the column names
+        super().__init__(pd.read_csv(path, nrows=0, **read_csv_kwargs), vectorized=vectorized, lazy=True)
+
+    def iter_chunks(self):
+        """Yields cleaned chunks in file order."""
+        digests = RowDigestSet(self.max_digests_in_memory, self.spill_dir)
+        try:
+            for chunk in pd.read_csv(self.path, chunksize=self.chunksize, **self.read_csv_kwargs):
+                cleaned = _ChunkCleaner(chunk, self.plan, digests, vectorized=self.vectorized)._execute_plan()
+                if len(cleaned):
+                    yield cleaned
+        finally:
+            digests.close()
+
+    def to_csv(self, output_path):
+        """Streams the cleaned rows into a CSV file and returns the number of rows written."""
+        rows = 0
+        header = True
+        with open(output_path, 'w', newline='', encoding='utf-8') as f:
+            for chunk in self.iter_chunks():
+                chunk.to_csv(f, index=False, header=header)
+                header = False
+                rows += len(chunk)
+        if header:
+            # No rows survived; still write the header
+            self._execute_plan().to_csv(output_path, index=False)
+        return rows
+
+    def to_parquet(self, output_path):
+        """Streams the cleaned rows into a Parquet file and returns the number of rows written.
+
+        The schema comes from the first chunk; pass dtype=... through to read_csv when a column
+        could be inferred differently in later chunks.
+        """
+        import pyarrow.parquet as pq
+
+        rows = 0
+        writer = None
+        try:
+            for chunk in self.iter_chunks():
+                if writer is None:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                else:
+                    table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+                writer.write_table(table)
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            # No rows survived; still write a file with the columns
+            self._execute_plan().to_parquet(output_path, index=False)
+        return rows
+
+    def get_dataframe(self):
+        """Returns all cleaned rows in one DataFrame (only for outputs that fit in memory)."""
+        chunks = list(self.iter_chunks())
+        return pd.concat(chunks) if chunks else self._execute_plan()
+
+
+def _synthetic_people(rows, seed=0):
+    """Messy synthetic rows (padded/mixed-case names, missing ages) for benchmarks."""
+    rng = np.random.default_rng(seed)
+    names = np.array([' John', 'MARY ', 'Sophia!', ' david ', 'Emily', 'Lucas#', 'Ana-Maria', 'O\'Brien '], dtype=object)
+    cities = np.array(['New York ', ' Boston', 'CHICAGO', 'Los Angeles', ' Austin '], dtype=object)
+    ages = rng.integers(18, 90, rows).astype('float64')
+    ages[rng.random(rows) < 0.1] = np.nan
+    return pd.DataFrame({
+        'Full Name': names[rng.integers(0, len(names), rows)],
+        'Home City': cities[rng.integers(0, len(cities), rows)],
+        'Age': ages,
+        'Visits': rng.integers(0, 50, rows),
+    })
+
+
+def benchmark_parallel_cleaning(sizes=(1_000_000, 10_000_000, 50_000_000), workers=None):
+    """Times the same lazy chain on one process and on `workers` processes."""
+    workers = workers or os.cpu_count()
+    print(f"{'rows':>12} {'1 proc (s)':>11} {f'{workers} procs (s)':>13} {'speedup':>8}")
+    for rows in sizes:
+        frame = _synthetic_people(rows)
+        timings = []
+        for n in (1, workers):
+            start = time.perf_counter()
+            (DataCleaner(frame, vectorized=True, lazy=True, workers=n)
+             .clean_column_names()
+             .clean_all_text_columns()
+             .apply_text_cleaning('full_name')
+             .apply_special_character_removal('full_name')
+             .fill_missing_values(0)
+             .drop_duplicates()
+             .get_dataframe())
+            timings.append(time.perf_counter() - start)
+        print(f"{rows:>12} {timings[0]:>11.2f} {timings[1]:>13.2f} {timings[0] / timings[1]:>7.2f}x")
+
+
+if __name__ == "__main__":
+    # Fake data to test
+    data = {
+        'Name': ['John', 'Mary', 'Sophia', 'David', 'Emily', 'Lucas', 'John', 'Emily', 'David', 'Sophia'],
+        'Age': [29, 34, None, 22, 28, 25, 29, 28, 22, None]
+    }
+    df = pd.DataFrame(data)
+
+    cleaner = DataCleaner(df)
+    df_cleaned = (cleaner.clean_all_text_columns()
+                         .fill_missing_values(0)
+                         .drop_duplicates()
+                         .clean_column_names()
+                         .apply_text_cleaning('name')
+                         .get_dataframe())
+
+    print(df_cleaned)
+
+    # Same chain, planned lazily and run in one optimized pass
+    lazy_cleaner = (DataCleaner(pd.DataFrame(data), lazy=True)
+                    .clean_all_text_columns()
+                    .fill_missing_values(0)
+                    .drop_duplicates()
+                    .clean_column_names()
+                    .apply_text_cleaning('name'))
+    print(lazy_cleaner.explain())
+    print(lazy_cleaner.get_dataframe())
+
+    # Single-process vs process-pool timings at 1M, 10M and 50M rows
+    if "--benchmark" in sys.argv:
+        benchmark_parallel_cleaning()
@@ -0,0 +1,493 @@
+'''
+Rollups behind the Online Business Sales 2017-2019 dashboard.
+
+Both CSVs are loaded once into typed columns (categorical Product Type and Month),
+every dashboard rollup is computed in one pass, and the result is cached on disk
+keyed by the hash of the source files. Later runs render straight from the cache.
+'''
+
+import hashlib
+import io
+import math
+import os
+import pickle
+import sys
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from Instrumentation import instrumented
+
+TRANSACTIONS_CSV = "business.retailsales.csv"
+MONTHLY_CSV = "business.retailsales2.csv"
+ROLLUP_CACHE_DIR = ".rollup_cache"
+
+# Calendar order, so month rollups and charts run January to December
+MONTHS = ["January", "February", "March", "April", "May", "June",
+          "July", "August", "September", "October", "November", "December"]
+MONTH_DTYPE = pd.CategoricalDtype(MONTHS, ordered=True)
+
+TRANSACTION_DTYPES = {
+    "Product Type": "category", "Net Quantity": "int64", "Gross Sales": "float64",
+    "Discounts": "float64", "Returns": "float64", "Total Net Sales": "float64",
+}
+MONTHLY_DTYPES = {
+    "Month": MONTH_DTYPE, "Year": "int16", "Total Orders": "int64", "Gross Sales": "float64",
+    "Discounts": "float64", "Returns": "float64", "Net Sales": "float64",
+    "Shipping": "float64", "Total Sales": "float64",
+}
+TRANSACTION_MEASURES = ["Net Quantity", "Gross Sales", "Discounts", "Returns", "Total Net Sales"]
+MONTHLY_MEASURES = ["Total Orders", "Gross Sales", "Discounts", "Returns", "Net Sales", "Shipping", "Total Sales"]
+
+# What the incremental aggregators track by default: per product type for the
+# transaction table, per period for the monthly table
+TRANSACTION_KEYS = ["Product Type"]
+TRANSACTION_TRACKED = ["Net Quantity", "Total Net Sales"]
+MONTHLY_KEYS = ["Year", "Month"]
+MONTHLY_TRACKED = ["Total Orders", "Net Sales"]
+
+# Quantile sketches answer within this relative error of the exact value
+SKETCH_RELATIVE_ACCURACY = 0.01
+
+# Bump when the rollups change shape, so old cache files are not reused
+ROLLUP_VERSION = 1
+
+
+def file_digest(path, block_size=1 << 20):
+    """SHA-256 of a file's bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@instrumented("io.load_transactions", rows=len)
+def load_transactions(path=TRANSACTIONS_CSV):
+    return pd.read_csv(path, dtype=TRANSACTION_DTYPES)
+
+
+@instrumented("io.load_monthly", rows=len)
+def load_monthly(path=MONTHLY_CSV):
+    return pd.read_csv(path, dtype=MONTHLY_DTYPES)
+
+
+@instrumented("transform.rollups")
+def compute_rollups(transactions, monthly):
+    """Every rollup the dashboard draws, from one grouping per table.
+
+    The monthly table is grouped once at month x year; the month and year rollups are
+    summed from that small grid instead of re-scanning the rows.
+    """
+    by_product_type = transactions.groupby("Product Type", observed=True).agg(
+        Purchases=("Net Quantity", "size"), **{m: (m, "sum") for m in TRANSACTION_MEASURES})
+    by_product_type = by_product_type.sort_values("Purchases", ascending=False, kind="stable")
+
+    by_month_year = monthly.groupby(["Year", "Month"], observed=True)[MONTHLY_MEASURES].sum()
+    by_month = by_month_year.groupby(level="Month", observed=True).sum()
+    by_year = by_month_year.groupby(level="Year").sum()
+
+    return {
+        "by_product_type": by_product_type,
+        "by_month": by_month,
+        "by_year": by_year,
+        "by_month_year": by_month_year,
+    }
+
+
+def _cache_path(cache_dir, transactions_path, monthly_path):
+    key = hashlib.sha256(
+        f"{ROLLUP_VERSION}:{file_digest(transactions_path)}:{file_digest(monthly_path)}".encode()).hexdigest()
+    return os.path.join(cache_dir, f"rollups-{key[:32]}.pkl")
+
+
+def load_rollups(transactions_path=TRANSACTIONS_CSV, monthly_path=MONTHLY_CSV, cache_dir=ROLLUP_CACHE_DIR):
+    """Returns the dashboard rollups, computing and caching them only when a source file changed."""
+    path = _cache_path(cache_dir, transactions_path, monthly_path)
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+
+    rollups = compute_rollups(load_transactions(transactions_path), load_monthly(monthly_path))
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(rollups, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+    # Only the rollups of the current files are worth keeping
+    for name in os.listdir(cache_dir):
+        if name.startswith("rollups-") and name.endswith(".pkl") and os.path.join(cache_dir, name) != path:
+            os.remove(os.path.join(cache_dir, name))
+    return rollups
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative-error guarantees (DDSketch-style log buckets).
+
+    Values are counted in buckets whose bounds grow by a factor gamma, so any quantile
+    is answered within `relative_accuracy` of the exact (lower) order statistic. Memory
+    grows with the log of the value range, not with the number of values, and two
+    sketches merge by adding bucket counts.
+    """
+
+    def __init__(self, relative_accuracy=SKETCH_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}  # keyed by the bucket of the magnitude
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.zeros += int(np.count_nonzero(values == 0))
+        for store, magnitudes in ((self.positive, values[values > 0]), (self.negative, -values[values < 0])):
+            if len(magnitudes):
+                buckets, counts = np.unique(np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64),
+                                            return_counts=True)
+                for bucket, n in zip(buckets.tolist(), counts.tolist()):
+                    store[bucket] = store.get(bucket, 0) + n
+        return self
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError("Only sketches with the same relative accuracy can be merged")
+        for store, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for bucket, n in theirs.items():
+                store[bucket] = store.get(bucket, 0) + n
+        self.zeros += other.zeros
+        self.count += other.count
+        return self
+
+    def quantiles(self, qs):
+        """Estimates of the lower order statistic at each q in `qs`; NaN when empty."""
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        if self.count == 0:
+            return np.full(len(qs), np.nan)
+        negative = sorted(self.negative, reverse=True)
+        positive = sorted(self.positive)
+        bucket_value = lambda b: 2 * self.gamma ** b / (self.gamma + 1)
+        # Buckets in ascending value order: big negatives, zero, then positives
+        values = np.array([-bucket_value(b) for b in negative] + [0.0] + [bucket_value(b) for b in positive])
+        counts = np.array([self.negative[b] for b in negative] + [self.zeros] + [self.positive[b] for b in positive])
+        ranks = np.floor(qs * (self.count - 1))
+        return values[np.searchsorted(np.cumsum(counts), ranks, side="right")]
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+
+class RunningStats:
+    """Count, sum, min, max and a quantile sketch of one measure, updatable and mergeable."""
+
+    def __init__(self, relative_accuracy=SKETCH_RELATIVE_ACCURACY):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.count += len(values)
+            self.total += float(values.sum())
+            self.minimum = min(self.minimum, float(values.min()))
+            self.maximum = max(self.maximum, float(values.max()))
+            self.sketch.add(values)
+        return self
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.sketch.merge(other.sketch)
+        return self
+
+
+class IncrementalAggregator:
+    """Running per-group statistics that are updated with new rows instead of recomputed.
+
+    Each group keeps a RunningStats per measure, so summary() costs O(groups) no matter
+    how many rows have been seen, and aggregators over disjoint rows merge exactly
+    (quantiles within the sketch's relative accuracy).
+    """
+
+    def __init__(self, keys, measures, relative_accuracy=SKETCH_RELATIVE_ACCURACY):
+        self.keys = list(keys)
+        self.measures = list(measures)
+        self.relative_accuracy = relative_accuracy
+        self.groups = {}
+        self.key_dtypes = {}
+        self.rows = 0
+
+    def _group(self, key):
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = {m: RunningStats(self.relative_accuracy) for m in self.measures}
+        return group
+
+    def update(self, frame):
+        """Folds a batch of new rows into the running statistics."""
+        if frame.empty:
+            return self
+        for key in self.keys:
+            self.key_dtypes.setdefault(key, frame[key].dtype)
+        values = {m: frame[m].to_numpy(dtype=np.float64, na_value=np.nan) for m in self.measures}
+        for key, rows in frame.groupby(self.keys, observed=True, sort=False).indices.items():
+            group = self._group(key if isinstance(key, tuple) else (key,))
+            for m in self.measures:
+                group[m].add(values[m][rows])
+        self.rows += len(frame)
+        return self
+
+    def merge(self, other):
+        if other.keys != self.keys or other.measures != self.measures:
+            raise ValueError("Only aggregators with the same keys and measures can be merged")
+        for key, group in other.groups.items():
+            mine = self._group(key)
+            for m in self.measures:
+                mine[m].merge(group[m])
+        for key, dtype in other.key_dtypes.items():
+            self.key_dtypes.setdefault(key, dtype)
+        self.rows += other.rows
+        return self
+
+    def rollup(self, keys):
+        """A coarser aggregator (e.g. Year from Year x Month) built by merging groups, not rows."""
+        keys = list(keys)
+        positions = [self.keys.index(k) for k in keys]
+        coarse = IncrementalAggregator(keys, self.measures, self.relative_accuracy)
+        coarse.key_dtypes = {k: self.key_dtypes[k] for k in keys if k in self.key_dtypes}
+        for key, group in self.groups.items():
+            target = coarse._group(tuple(key[p] for p in positions))
+            for m in self.measures:
+                target[m].merge(group[m])
+        coarse.rows = self.rows
+        return coarse
+
+    def summary(self, quantiles=(0.5, 0.9)):
+        """DataFrame indexed by the group keys with (measure, stat) columns."""
+        quantile_names = [f"p{round(q * 100):d}" for q in quantiles]
+        columns = pd.MultiIndex.from_product([self.measures, ["count", "sum", "mean", "min", "max"] + quantile_names])
+        rows = []
+        for group in self.groups.values():
+            row = []
+            for m in self.measures:
+                stats = group[m]
+                empty = stats.count == 0
+                row += [stats.count, stats.total, np.nan if empty else stats.total / stats.count,
+                        np.nan if empty else stats.minimum, np.nan if empty else stats.maximum]
+                # The sketch's estimate never leaves the exact min/max
+                row += np.clip(stats.sketch.quantiles(quantiles), stats.minimum, stats.maximum).tolist()
+            rows.append(row)
+
+        index = pd.MultiIndex.from_tuples(list(self.groups), names=self.keys)
+        for level, key in enumerate(self.keys):
+            dtype = self.key_dtypes.get(key)
+            if dtype is not None:
+                index = index.set_levels(index.levels[level].astype(dtype), level=level)
+        if len(self.keys) == 1:
+            index = index.get_level_values(0)
+        return pd.DataFrame(rows, index=index, columns=columns).sort_index()
+
+
+def verify_against_recompute(aggregator, frame, quantiles=(0.5, 0.9)):
+    """Compares the aggregator with a full pandas recompute over `frame` (all rows it has seen).
+
+    Returns one row per (measure, stat) with the worst error and whether it is within
+    tolerance: exact for counts/min/max, float round-off for sums and means, and the
+    sketch's relative accuracy for quantiles (against the lower order statistic).
+    """
+    incremental = aggregator.summary(quantiles)
+    grouped = frame.groupby(aggregator.keys, observed=True)[aggregator.measures]
+    expected = {
+        "count": grouped.count(), "sum": grouped.sum(), "mean": grouped.mean(),
+        "min": grouped.min(), "max": grouped.max(),
+    }
+    for q in quantiles:
+        expected[f"p{round(q * 100):d}"] = grouped.quantile(q, interpolation="lower")
+
+    report = []
+    for m in aggregator.measures:
+        for stat, table in expected.items():
+            exact = table[m].reindex(incremental.index).to_numpy(dtype=np.float64)
+            got = incremental[(m, stat)].to_numpy(dtype=np.float64)
+            if stat.startswith("p"):
+                error = np.abs(got - exact) / np.maximum(np.abs(exact), 1e-12)
+                tolerance = aggregator.relative_accuracy * (1 + 1e-9)  # the bound is inclusive
+            else:
+                error = np.abs(got - exact) / np.maximum(np.abs(exact), 1.0)
+                tolerance = 0.0 if stat in ("count", "min", "max") else 1e-9
+            error = np.where(np.isnan(got) & np.isnan(exact), 0.0, error)
+            worst = float(np.nanmax(error)) if len(error) else 0.0
+            report.append((m, stat, worst, tolerance, bool(worst <= tolerance and not np.isnan(error).any())))
+    missing = len(expected["count"].index.difference(incremental.index)) + len(
+        incremental.index.difference(expected["count"].index))
+    report.append(("*", "groups", float(missing), 0.0, missing == 0))
+    return pd.DataFrame(report, columns=["measure", "stat", "max_error", "tolerance", "ok"])
+
+
+class IncrementalCSVAggregator:
+    """Keeps an IncrementalAggregator in step with a CSV that only ever grows by appended rows.
+
+    refresh() parses just the rows added since the last call. If the file shrank or its
+    already-read tail changed, the history is no longer trustworthy and it starts over.
+    With `state_path` the position and aggregates survive between runs.
+
+    A last line without a trailing newline may still be mid-write, so it is left for a later
+    refresh; pass complete=True once the writer is done to read it anyway.
+    """
+
+    TAIL_BYTES = 1 << 16
+
+    def __init__(self, path, keys, measures, dtypes=None, state_path=None,
+                 relative_accuracy=SKETCH_RELATIVE_ACCURACY):
+        self.path = path
+        self.keys = list(keys)
+        self.measures = list(measures)
+        self.dtypes = dict(dtypes or {})
+        self.state_path = state_path
+        self.relative_accuracy = relative_accuracy
+        self._reset()
+        if state_path and os.path.exists(state_path):
+            with open(state_path, "rb") as f:
+                state = pickle.load(f)
+            if state["path"] == os.path.abspath(path):
+                self.offset, self.tail_digest, self.columns, self.aggregator = (
+                    state["offset"], state["tail_digest"], state["columns"], state["aggregator"])
+
+    def _reset(self):
+        self.offset = 0
+        self.tail_digest = None
+        self.columns = None
+        self.aggregator = IncrementalAggregator(self.keys, self.measures, self.relative_accuracy)
+
+    def _tail(self, end):
+        with open(self.path, "rb") as f:
+            f.seek(max(0, end - self.TAIL_BYTES))
+            return hashlib.sha256(f.read(end - max(0, end - self.TAIL_BYTES))).hexdigest()
+
+    def refresh(self, complete=False):
+        """Reads rows appended since the last refresh; returns how many were added.
+
+        With complete=True the end of the file is taken as the end of a row.
+        """
+        size = os.path.getsize(self.path)
+        if size < self.offset or (self.offset and self._tail(self.offset) != self.tail_digest):
+            self._reset()
+        if size == self.offset:
+            return 0
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        if not complete:
+            data = data[:data.rfind(b"\n") + 1]
+            if not data:
+                return 0
+        end = self.offset + len(data)
+        if self.columns is None:
+            frame = pd.read_csv(io.BytesIO(data), dtype=self.dtypes)
+            self.columns = list(frame.columns)
+        else:
+            dtypes = {c: t for c, t in self.dtypes.items() if c in self.columns}
+            frame = pd.read_csv(io.BytesIO(data), header=None, names=self.columns, dtype=dtypes)
+        self.aggregator.update(frame)
+        self.offset = end
+        self.tail_digest = self._tail(end)
+
+        if self.state_path:
+            tmp = self.state_path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump({"path": os.path.abspath(self.path), "offset": self.offset, "tail_digest": self.tail_digest,
+                             "columns": self.columns, "aggregator": self.aggregator}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.state_path)
+        return len(frame)
+
+
+@instrumented("plot.dashboard")
+def plot_dashboard(rollups, top_products=4):
+    """Draws the notebook's 2x3 dashboard from the rollups; returns the figure."""
+    fig = plt.figure(figsize=(18, 10))
+    fig.subplots_adjust(wspace=.3, hspace=.4)
+    grid = rollups["by_month_year"]
+    by_month = rollups["by_month"]
+    months = by_month.index.astype(str)
+
+    # scatter plot
+    ax = fig.add_subplot(2, 3, 1)
+    ax.scatter(grid["Total Orders"], grid["Total Sales"], marker="o")
+    ax.set_title("Sales typically increase with order volume")
+    ax.set_ylabel("Total Sales")
+    ax.set_xlabel("Total Orders")
+
+    # histogram
+    ax = fig.add_subplot(2, 3, 2)
+    ax.hist(grid["Total Orders"], histtype='stepfilled', align='mid')
+    ax.set_ylabel("Frequency")
+    ax.set_xlabel("Number of Total Orders")
+    ax.set_title("Total Orders throughout 2017-2019 is skewed right")
+
+    # line
+    ax = fig.add_subplot(2, 3, 3)
+    ax.plot(months, by_month["Total Orders"])
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.set_title("Total orders change sporadically throughout the year")
+    ax.set_ylabel("Total Orders")
+    ax.set_xlabel("Month")
+
+    # bar
+    ax = fig.add_subplot(2, 3, 4)
+    ax.bar(months, by_month["Net Sales"])
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Net Sales")
+    ax.set_title("Net Sales are highest in November and December")
+
+    # pie -- purchase counts per category, no longer typed in by hand
+    ax = fig.add_subplot(2, 3, 5)
+    top = rollups["by_product_type"]["Purchases"].head(top_products)
+    ax.pie(top.to_numpy(), labels=top.index.astype(str), startangle=90, autopct='%.1f%%',
+           counterclock=True, shadow=True)
+    ax.set_title('Most purchased products by category')
+    ax.axis('equal')
+    return fig
+
+
+if __name__ == "__main__":
+    rollups = load_rollups()
+    print(rollups["by_product_type"][["Purchases", "Net Quantity", "Total Net Sales"]].head())
+    print(rollups["by_year"][["Total Orders", "Net Sales"]])
+
+    # Incremental aggregates, fed in batches and checked against a full recompute
+    if "--verify" in sys.argv:
+        transactions = load_transactions()
+        aggregator = IncrementalAggregator(TRANSACTION_KEYS, TRANSACTION_TRACKED)
+        for start in range(0, len(transactions), 250):
+            aggregator.update(transactions.iloc[start:start + 250])
+        report = verify_against_recompute(aggregator, transactions)
+        print(report.to_string(index=False))
+        assert report["ok"].all(), "incremental aggregates drifted from the full recompute"
+
+        monthly = IncrementalCSVAggregator(MONTHLY_CSV, MONTHLY_KEYS, MONTHLY_TRACKED, MONTHLY_DTYPES)
+        monthly.refresh(complete=True)  # a finished export, which has no trailing newline
+        report = verify_against_recompute(monthly.aggregator, load_monthly())
+        print(report.to_string(index=False))
+        assert report["ok"].all(), "monthly CSV aggregates drifted from the full recompute"
+        print(monthly.aggregator.rollup(["Year"]).summary())
+
+    # Dashboard - straight from the cached rollups
+    if "--no-show" not in sys.argv:
+        plot_dashboard(rollups)
+        plt.show()
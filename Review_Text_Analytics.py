@@ -0,0 +1,507 @@
+'''
+Text features for the Women's E-Commerce Clothing Reviews analysis.
+
+The notebook expands contractions key by key, then makes a separate pass per feature
+(TextBlob polarity, length, word count, average word length). Here contractions are
+expanded in one regex pass per review, the length features come from one vectorized
+pass, and sentiment is scored once per distinct review, in batches across processes.
+'''
+
+import os
+import re
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    from textblob import TextBlob
+except ImportError:  # sentiment needs TextBlob, or a scorer passed in
+    TextBlob = None
+
+try:
+    from wordcloud import WordCloud, STOPWORDS
+except ImportError:  # counts still work, with only the review stopwords below
+    WordCloud = None
+    STOPWORDS = frozenset()
+
+from Instrumentation import instrumented
+
+# Contraction -> expansion, as used in the reviews notebook
+CONTRACTIONS = {
+    "ain't": "am not",
+    "aren't": "are not",
+    "can't": "cannot",
+    "can't've": "cannot have",
+    "'cause": "because",
+    "could've": "could have",
+    "couldn't": "could not",
+    "couldn't've": "could not have",
+    "didn't": "did not",
+    "doesn't": "does not",
+    "don't": "do not",
+    "hadn't": "had not",
+    "hadn't've": "had not have",
+    "hasn't": "has not",
+    "haven't": "have not",
+    "he'd": "he would",
+    "he'd've": "he would have",
+    "he'll": "he will",
+    "he'll've": "he will have",
+    "he's": "he is",
+    "how'd": "how did",
+    "how'd'y": "how do you",
+    "how'll": "how will",
+    "how's": "how does",
+    "i'd": "i would",
+    "i'd've": "i would have",
+    "i'll": "i will",
+    "i'll've": "i will have",
+    "i'm": "i am",
+    "i've": "i have",
+    "isn't": "is not",
+    "it'd": "it would",
+    "it'd've": "it would have",
+    "it'll": "it will",
+    "it'll've": "it will have",
+    "it's": "it is",
+    "let's": "let us",
+    "ma'am": "madam",
+    "mayn't": "may not",
+    "might've": "might have",
+    "mightn't": "might not",
+    "mightn't've": "might not have",
+    "must've": "must have",
+    "mustn't": "must not",
+    "mustn't've": "must not have",
+    "needn't": "need not",
+    "needn't've": "need not have",
+    "o'clock": "of the clock",
+    "oughtn't": "ought not",
+    "oughtn't've": "ought not have",
+    "shan't": "shall not",
+    "sha'n't": "shall not",
+    "shan't've": "shall not have",
+    "she'd": "she would",
+    "she'd've": "she would have",
+    "she'll": "she will",
+    "she'll've": "she will have",
+    "she's": "she is",
+    "should've": "should have",
+    "shouldn't": "should not",
+    "shouldn't've": "should not have",
+    "so've": "so have",
+    "so's": "so is",
+    "that'd": "that would",
+    "that'd've": "that would have",
+    "that's": "that is",
+    "there'd": "there would",
+    "there'd've": "there would have",
+    "there's": "there is",
+    "they'd": "they would",
+    "they'd've": "they would have",
+    "they'll": "they will",
+    "they'll've": "they will have",
+    "they're": "they are",
+    "they've": "they have",
+    "to've": "to have",
+    "wasn't": "was not",
+    " u ": " you ",
+    " ur ": " your ",
+    " n ": " and ",
+}
+
+# Every character str.split() treats as whitespace, and the ASCII ones as a byte lookup
+# table (it includes \x1c-\x1f, which a regex \s would miss on bytes)
+PYTHON_WHITESPACE = ''.join(c for c in map(chr, range(0x3001)) if c.isspace())
+ASCII_WHITESPACE = np.zeros(256, dtype=bool)
+ASCII_WHITESPACE[[ord(c) for c in PYTHON_WHITESPACE if ord(c) < 128]] = True
+
+# Texts per vectorized length-feature chunk; keeps the byte buffers cache-sized
+LENGTH_CHUNK_SIZE = 10_000
+
+# Distinct reviews per sentiment batch sent to a worker process
+SENTIMENT_CHUNK_SIZE = 2_000
+
+# Scores kept between calls; a review seen before is never scored again
+SENTIMENT_CACHE_SIZE = 1_000_000
+
+# Extra stopwords the notebook adds to wordcloud's STOPWORDS for the review clouds
+REVIEW_STOPWORDS = {
+    "absolutely", "bc", "so", "sooo", "really", "happened", "wanted", "hopes", "ordered", "truly", "true", "find",
+    "store", "someone", "overall", "initially", "found", "zip", "usual", "somewhat", "nothing", "online", "glad",
+    "definitely", "outrageously", "never", "hits", "net", "layer", "layers", "bought", "imo", "major", "work",
+    "directly", "several", "sewn", "time", "ve", "nicely", "knee", "every", "length", "wear", "high", "size",
+    "bottom", "dress", "half", "fact", "shirt", "top", "design", "jumpsuit", "5'8",
+}
+
+# WordCloud's default token pattern
+TOKEN_PATTERN = re.compile(r"\w[\w']*")
+
+# Reviews per word-count chunk
+WORD_COUNT_CHUNK_SIZE = 20_000
+
+
+def _trie_pattern(words):
+    """Regex matching any of `words`, shaped as a trie so each position is tried once.
+
+    Optional groups are greedy, so the longest key wins ("can't've" over "can't").
+    """
+    root = {}
+    for word in words:
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node):
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return re.compile(emit(root))
+
+
+# Shorthand keys like " u " are matched without their trailing space, which stays in the
+# text to open the next key, so "love u n miss it" expands both as the key-by-key loop does
+_SPACED = [key for key in CONTRACTIONS if key.startswith(" ") and key.endswith(" ")]
+_EXPANSIONS = {**CONTRACTIONS, **{key[:-1]: CONTRACTIONS[key][:-1] for key in _SPACED}}
+CONTRACTION_PATTERN = re.compile("(?:%s)|(?:%s)(?= )" % (
+    _trie_pattern(key for key in CONTRACTIONS if key not in _SPACED).pattern,
+    _trie_pattern(key[:-1] for key in _SPACED).pattern))
+
+
+def cont_to_exp(x):
+    """The notebook's key-by-key expansion, kept as the reference for benchmarks."""
+    if type(x) is str:
+        x = x.replace('\\', '')
+        for key in CONTRACTIONS:
+            value = CONTRACTIONS[key]
+            x = x.replace(key, value)
+        return x
+    else:
+        return x
+
+
+def _expand(match):
+    return _EXPANSIONS[match.group(0)]
+
+
+def expand_contractions(texts):
+    """Expands contractions in a Series of reviews, one regex pass over each distinct review.
+
+    Unlike the key-by-key loop, compound forms expand fully: "can't've" becomes "cannot
+    have" rather than "cannot've", and repeated shorthand expands every time ("u u" becomes
+    "you you"). Non-strings are passed through untouched.
+    """
+    codes, uniques = pd.factorize(texts)
+    expanded = np.array([CONTRACTION_PATTERN.sub(_expand, u.replace('\\', '')) if type(u) is str else u
+                         for u in uniques], dtype=object)
+    result = texts.to_numpy(dtype=object).copy()
+    found = codes >= 0  # missing values keep their place
+    result[found] = expanded[codes[found]]
+    return pd.Series(result, index=texts.index, name=texts.name, dtype=object)
+
+
+def _split_counts(texts):
+    """(len(x), whitespace characters, len(x.split())) for an object array of strings.
+
+    ASCII texts are handled in chunks: their bytes are joined into one buffer, classified
+    with a lookup table, and counted per text from cumulative sums. The rare non-ASCII
+    text, whose whitespace may be multi-byte, goes through str.split().
+    """
+    n = len(texts)
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=n)
+    is_ascii = np.fromiter(map(str.isascii, texts), dtype=bool, count=n)
+    spaces = np.zeros(n, dtype=np.int64)
+    words = np.zeros(n, dtype=np.int64)
+
+    ascii_rows = np.flatnonzero(is_ascii)
+    for start in range(0, len(ascii_rows), LENGTH_CHUNK_SIZE):
+        rows = ascii_rows[start:start + LENGTH_CHUNK_SIZE]
+        offsets = np.concatenate([[0], np.cumsum(lengths[rows])])
+        ws = ASCII_WHITESPACE[np.frombuffer("".join(texts[rows]).encode("ascii"), dtype=np.uint8)]
+        word_start = ~ws
+        word_start[1:] &= ws[:-1]
+        firsts = offsets[:-1][lengths[rows] > 0]
+        word_start[firsts] = ~ws[firsts]  # a text's first character never continues the previous text
+        for out, mask in ((spaces, ws), (words, word_start)):
+            totals = np.concatenate([[0], np.cumsum(mask, dtype=np.int32)])
+            out[rows] = totals[offsets[1:]] - totals[offsets[:-1]]
+
+    for i in np.flatnonzero(~is_ascii):
+        parts = texts[i].split()
+        words[i] = len(parts)
+        spaces[i] = lengths[i] - sum(map(len, parts))
+    return lengths, spaces, words
+
+
+def length_features(texts):
+    """review_len, word_count and avg_word_len for a Series of strings, column-wise.
+
+    Counts follow len() and str.split() exactly and are computed once per distinct text.
+    A review with no words (or a missing one) gets NaN for its average instead of
+    raising like the notebook's per-row helper.
+    """
+    codes, uniques = pd.factorize(texts)
+    lengths, spaces, words = _split_counts(np.asarray(uniques, dtype=object))
+    found = codes >= 0
+    review_len, space_count, word_count = (np.zeros(len(codes), dtype=np.int64) for _ in range(3))
+    for out, values in ((review_len, lengths), (space_count, spaces), (word_count, words)):
+        out[found] = values[codes[found]]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_word_len = np.where(word_count > 0, (review_len - space_count) / word_count, np.nan)
+    return pd.DataFrame({"review_len": review_len, "word_count": word_count, "avg_word_len": avg_word_len},
+                        index=texts.index)
+
+
+def textblob_polarity(text):
+    return TextBlob(text).sentiment.polarity
+
+
+def _score_chunk(scorer, texts):
+    return [scorer(text) for text in texts]
+
+
+class SentimentScorer:
+    """Scores review polarity once per distinct text, in batches across a process pool.
+
+    `scorer` maps one text to a float and must be picklable (a module-level function);
+    it defaults to TextBlob polarity. Scores are memoized, so repeated reviews, within
+    a call or across calls, are looked up instead of re-scored.
+    """
+
+    def __init__(self, scorer=None, workers=None, chunk_size=SENTIMENT_CHUNK_SIZE, cache_size=SENTIMENT_CACHE_SIZE):
+        if scorer is None:
+            if TextBlob is None:
+                raise ImportError("TextBlob is required for the default sentiment scorer")
+            scorer = textblob_polarity
+        self.scorer = scorer
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.cache_size = cache_size
+        self.cache = {}
+
+    def score(self, texts):
+        """Polarity for each text in a Series, as a float Series with the same index (NaN if missing)."""
+        codes, uniques = pd.factorize(texts)
+        uniques = np.asarray(uniques, dtype=object)
+        scores = np.empty(len(uniques))
+        todo = []
+        for i, text in enumerate(uniques):
+            cached = self.cache.get(text)
+            if cached is None:
+                todo.append(i)
+            else:
+                scores[i] = cached
+
+        todo_texts = [uniques[i] for i in todo]
+        chunks = [todo_texts[i:i + self.chunk_size] for i in range(0, len(todo_texts), self.chunk_size)]
+        if self.workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = pool.map(_score_chunk, [self.scorer] * len(chunks), chunks)
+                fresh = [s for chunk in results for s in chunk]
+        else:
+            fresh = [s for chunk in chunks for s in _score_chunk(self.scorer, chunk)]
+
+        for i, text, s in zip(todo, todo_texts, fresh):
+            scores[i] = s
+            if len(self.cache) < self.cache_size:
+                self.cache[text] = s
+        result = np.full(len(codes), np.nan)
+        result[codes >= 0] = scores[codes[codes >= 0]]
+        return pd.Series(result, index=texts.index, name="polarity")
+
+
+@instrumented("transform.review_features", rows=len)
+def review_text_features(df, text_col='Review_Text', scorer=None, workers=None):
+    """The notebook's feature columns: expanded text, polarity, review_len, word_count, avg_word_len."""
+    df = df.copy()
+    df[text_col] = expand_contractions(df[text_col])
+    df['polarity'] = SentimentScorer(scorer, workers).score(df[text_col])
+    features = length_features(df[text_col])
+    for column in features:
+        df[column] = features[column]
+    return df
+
+
+def review_stopwords(extra=()):
+    """wordcloud's STOPWORDS plus the notebook's review stopwords, lowercased."""
+    return frozenset(w.lower() for w in set(STOPWORDS) | REVIEW_STOPWORDS | set(extra))
+
+
+def count_words(texts, stopwords):
+    """Word counts for an iterable of texts, tokenized the way WordCloud.generate does.
+
+    The texts are lowercased and tokenized with one findall over the joined chunk, and
+    Counter does the counting in C. Trailing 's, numbers and stopwords are then dropped
+    per distinct word rather than per token.
+    """
+    counts = Counter(TOKEN_PATTERN.findall("\n".join(t for t in texts if type(t) is str).lower()))
+    for word in [w for w in counts if w.endswith("'s")]:
+        counts[word[:-2]] += counts.pop(word)
+    for word in [w for w in counts if w.isdigit() or w in stopwords or not w]:
+        del counts[word]
+    return counts
+
+
+def _count_chunk(frame, text_col, group_by, stopwords):
+    if not group_by:
+        return {None: count_words(frame[text_col], stopwords)}
+    frame = frame.dropna(subset=[text_col])
+    return {(key if isinstance(key, tuple) else (key,)): count_words(group[text_col], stopwords)
+            for key, group in frame.groupby(group_by, dropna=False, sort=False)}
+
+
+def normalize_plurals(counts):
+    """Folds "dresses" into "dress" when both occur, as WordCloud does; run on final counts."""
+    for word in [w for w in counts if w.endswith("s") and not w.endswith("ss") and w[:-1] in counts]:
+        counts[word[:-1]] += counts.pop(word)
+    return counts
+
+
+def _review_chunks(source, text_col, group_by, chunksize):
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+        return
+    if isinstance(source, (str, os.PathLike)):
+        # The raw export calls the column "Review Text"; only the needed columns are read
+        wanted = {text_col, text_col.replace("_", " "), *(group_by or [])}
+        for chunk in pd.read_csv(source, chunksize=chunksize, usecols=lambda c: c in wanted):
+            yield chunk.rename(columns={text_col.replace("_", " "): text_col})
+        return
+    yield from source
+
+
+@instrumented("transform.word_frequencies")
+def word_frequencies(source, text_col='Review_Text', group_by=None, stopwords=None,
+                     chunksize=WORD_COUNT_CHUNK_SIZE, workers=1, plurals=True):
+    """Word counts over a whole review corpus, for WordCloud.generate_from_frequencies.
+
+    `source` is a CSV path (read in chunks), a DataFrame, or an iterable of DataFrames.
+    Chunks are counted independently, in a process pool when workers > 1 with a few
+    chunks per worker in flight, and merged, so memory is bounded by the vocabulary
+    rather than the corpus. With `group_by` (e.g. ["Department Name"]) the result is a
+    dict of Counters keyed by group tuple; otherwise a single Counter.
+    """
+    stopwords = review_stopwords() if stopwords is None else frozenset(w.lower() for w in stopwords)
+    group_by = [group_by] if isinstance(group_by, str) else list(group_by or [])
+    totals = {}
+
+    def merge(partial):
+        for key, counts in partial.items():
+            if key in totals:
+                totals[key].update(counts)
+            else:
+                totals[key] = counts
+
+    chunks = _review_chunks(source, text_col, group_by, chunksize)
+    if workers <= 1:
+        for chunk in chunks:
+            merge(_count_chunk(chunk, text_col, group_by, stopwords))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(_count_chunk, chunk, text_col, group_by, stopwords))
+                if len(pending) >= workers * 2:
+                    merge(pending.popleft().result())
+            while pending:
+                merge(pending.popleft().result())
+
+    if plurals:
+        for counts in totals.values():
+            normalize_plurals(counts)
+    if not group_by:
+        return totals.get(None, Counter())
+    return totals
+
+
+@instrumented("plot.word_cloud")
+def word_cloud(frequencies, stopwords=None, **kwargs):
+    """A WordCloud drawn from precomputed counts (the notebook's settings by default)."""
+    if WordCloud is None:
+        raise ImportError("wordcloud is required to draw word clouds")
+    options = dict(max_font_size=50, max_words=100, background_color="white")
+    options.update(kwargs)
+    return WordCloud(**options).generate_from_frequencies(frequencies)
+
+
+REVIEW_PHRASES = [
+    "i love this dress", "it's so cute", "i can't wait to wear it", "they're great", "the fit isn't perfect",
+    "u know", "i'm 5'8 and it hits at the knee", "the fabric is soft", "i didn't expect much",
+    "it's a bit see through", "ordered my usual size", "i'd recommend sizing down", "wasn't what i hoped",
+    "the color is gorgeous", "it'll be perfect for summer", "can't've asked for more", "runs small",
+    "the zipper broke", "so comfortable n flattering", "you've got to try it",
+]
+
+
+def synthetic_reviews(n, distinct=50_000, seed=0):
+    """n reviews drawn from `distinct` generated ones, so repeats occur like in real data."""
+    rng = np.random.default_rng(seed)
+    phrases = np.array(REVIEW_PHRASES, dtype=object)
+    lengths = rng.integers(2, 9, distinct)
+    picks = rng.integers(0, len(phrases), lengths.sum())
+    pool = [". ".join(phrases[p]) for p in np.split(picks, np.cumsum(lengths)[:-1])]
+    return pd.Series(np.array(pool, dtype=object)[rng.integers(0, distinct, n)], name="Review_Text")
+
+
+def benchmark_review_features(n=1_000_000, workers=None, baseline_sample=50_000, scorer=None):
+    """Times the notebook's per-row approach against the pipeline on n synthetic reviews.
+
+    The per-row baseline runs on a sample and is scaled to n. Sentiment is skipped when
+    TextBlob is missing and no scorer is given.
+    """
+    texts = synthetic_reviews(n)
+    sample = texts.iloc[:baseline_sample]
+    scale = n / len(sample)
+    print(f"{n:,} reviews, {texts.nunique():,} distinct")
+
+    def timed(label, baseline, pipeline):
+        start = time.perf_counter()
+        baseline()
+        before = (time.perf_counter() - start) * scale
+        start = time.perf_counter()
+        pipeline()
+        after = time.perf_counter() - start
+        print(f"{label:>14}: per-row {before:8.2f}s   pipeline {after:8.2f}s")
+
+    timed("contractions", lambda: sample.apply(cont_to_exp), lambda: expand_contractions(texts))
+    timed("lengths", lambda: (sample.apply(len), sample.apply(lambda x: len(x.split())),
+                              sample.apply(lambda x: sum(len(w) for w in x.split()) / len(x.split()))),
+          lambda: length_features(texts))
+    if scorer is not None or TextBlob is not None:
+        score = scorer or textblob_polarity
+        timed("sentiment", lambda: sample.apply(score), lambda: SentimentScorer(scorer, workers).score(texts))
+    else:
+        print("     sentiment: skipped, TextBlob is not installed")
+
+
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark_review_features()
+        sys.exit()
+
+    # Same input as the notebook
+    df = pd.read_csv('Womens Clothing E-Commerce Reviews.csv')
+    df.rename(columns={'Review Text': 'Review_Text'}, inplace=True)
+    df = review_text_features(df)
+    print(df[['polarity', 'review_len', 'word_count', 'avg_word_len']].describe())
+
+    # Word clouds over every review, not just the first 1000 characters
+    frequencies = word_frequencies(df, workers=os.cpu_count() or 1)
+    print(frequencies.most_common(20))
+    for (department,), counts in word_frequencies(df, group_by=['Department Name']).items():
+        print(department, [w for w, _ in counts.most_common(10)])
+    if WordCloud is not None:
+        import matplotlib.pyplot as plt
+        plt.imshow(word_cloud(frequencies), interpolation='bilinear')
+        plt.axis("off")
+        plt.show()
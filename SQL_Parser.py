@@ -1,109 +1,326 @@
 # This will parse a SQL query and extract the SELECT columns.
 
 import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
 
-def extract_columns(sql_query):
-    """Extracts column names from a SQL SELECT query, ensuring aliases, functions, and subqueries are handled correctly."""
+from Instrumentation import instrumented
+
+# Set to False to silence the per-query debug print in extract_columns
+DEBUG_OUTPUT = True
+
+# How many distinct query shapes each process remembers
+PARSE_CACHE_SIZE = 10_000
+
+# One alternation per token class, tried in order. Every branch consumes at least one
+# character and none of them can backtrack across another token, so a full scan is linear.
+TOKEN_PATTERN = re.compile(r"""
+      (?P<space>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+    | (?P<string>'(?:[^']|'')*(?:'|\Z))
+    | (?P<quoted>"(?:[^"]|"")*(?:"|\Z)|`(?:[^`]|``)*(?:`|\Z)|\[[^\]]*(?:\]|\Z))
+    | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+)
+    | (?P<word>[A-Za-z_][\w$]*)
+    | (?P<open>\()
+    | (?P<close>\))
+    | (?P<comma>,)
+    | (?P<dot>\.)
+    | (?P<semicolon>;)
+    | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+# Keywords that end the select list when they appear outside of parentheses
+CLAUSE_KEYWORDS = {"FROM", "WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "UNION",
+                   "INTERSECT", "EXCEPT", "INTO", "WINDOW", "OFFSET", "FETCH"}
+
+# Words that can never be an implicit alias ("expr alias" without AS)
+RESERVED_WORDS = CLAUSE_KEYWORDS | {
+    "SELECT", "AS", "CASE", "WHEN", "THEN", "ELSE", "END", "AND", "OR", "NOT", "IN",
+    "IS", "NULL", "TRUE", "FALSE", "LIKE", "BETWEEN", "DISTINCT", "ALL", "ON", "OVER",
+    "PARTITION", "BY", "ASC", "DESC", "EXISTS", "INTERVAL", "TOP",
+}
+
+# Modifiers that may directly follow SELECT and are not part of the first column
+SELECT_MODIFIERS = {"DISTINCT", "ALL"}
+
+
+def tokenize_sql(sql_query):
+    """Yields (kind, value) tokens from a SQL string, skipping whitespace and comments."""
+    for match in TOKEN_PATTERN.finditer(sql_query):
+        kind = match.lastgroup
+        if kind == "space" or kind == "comment":
+            continue
+        value = match.group(kind)
+        if kind == "word":
+            yield "word", value
+        elif kind == "quoted":
+            # Strip the quote characters and unescape doubled quotes
+            yield "quoted", value[1:-1].replace(value[0] * 2, value[0]) if value[0] != "[" else value[1:-1]
+        else:
+            yield kind, value
+
+
+def _is_keyword(token, keywords):
+    return token[0] == "word" and token[1].upper() in keywords
+
+
+def _iter_select_items(tokens):
+    """Yields the top-level tokens of each item in the first top-level SELECT list.
+
+    Anything nested in parentheses (function arguments, subqueries) is collapsed into a
+    single ("group", None) token, so commas and FROMs inside it never split the list.
+    """
+    depth = 0
+    in_select = False
+    item = []
+
+    for token in tokens:
+        kind = token[0]
+        if kind == "open":
+            if depth == 0 and in_select:
+                item.append(("group", None))
+            depth += 1
+            continue
+        if kind == "close":
+            depth = max(depth - 1, 0)
+            continue
+        if depth > 0:
+            continue
+
+        if not in_select:
+            # Skip CTEs and anything else before the main SELECT
+            if _is_keyword(token, {"SELECT"}):
+                in_select = True
+            continue
+
+        if kind == "semicolon" or _is_keyword(token, CLAUSE_KEYWORDS):
+            break
+        if kind == "comma":
+            yield item
+            item = []
+        elif not item and _is_keyword(token, SELECT_MODIFIERS):
+            continue
+        else:
+            item.append(token)
+
+    if in_select:
+        yield item
+
+
+def _column_name(item):
+    """Returns the output name of one select-list item, or None if it has none."""
+    if not item:
+        return None
+
+    last = item[-1]
+    if last[0] not in ("word", "quoted") or _is_keyword(last, RESERVED_WORDS):
+        return None
+
+    if len(item) == 1:
+        # Bare column: customer_id
+        return last[1]
+
+    prev = item[-2]
+    if _is_keyword(prev, {"AS"}):
+        # Explicit alias: expr AS alias
+        return last[1]
+    if prev[0] == "dot":
+        # Qualified column: orders.customer_id -> customer_id
+        names, dots = item[0::2], item[1::2]
+        if all(tok[0] in ("word", "quoted") for tok in names) and all(tok[0] == "dot" for tok in dots):
+            return last[1]
+        return None
+    if prev[0] in ("word", "quoted", "group", "number", "string") and not (
+            prev[0] == "word" and prev[1].upper() in RESERVED_WORDS - {"END"}):
+        # Implicit alias: SUM(sales) total_sales, CASE ... END status
+        return last[1]
+    return None
+
+
+@instrumented("parse.sql_columns")
+def extract_select_columns(sql_query):
+    """Extracts column names from a SQL SELECT query in one linear pass, without printing."""
     extracted_columns = []
+    seen = set()
 
-    # First, capture everything between the first SELECT and the second FROM (if present)
-    match = re.search(r"SELECT(.*?FROM.*?FROM)", sql_query, re.IGNORECASE | re.DOTALL)
-    
-    if match:
-        # If we have a match, we are dealing with a query with a second FROM (like nested SELECTs)
-        columns = match.group(1).strip()
-
-        # Split the columns correctly while avoiding commas inside parentheses (for functions/subqueries)
-        column_list = re.split(r",\s*(?![^()]*\))", columns)
-
-        for col in column_list:
-            col = col.strip()
-
-            # Extract alias if present (AS keyword)
-            alias_match = re.search(r"AS\s+([\w_]+)", col, re.IGNORECASE)
-            if alias_match:
-                extracted_columns.append(alias_match.group(1))
-
-            # Handle CASE statements by extracting alias after END AS
-            case_match = re.search(r"END\s+AS\s+([\w_]+)", col, re.IGNORECASE)
-            if case_match:
-                extracted_columns.append(case_match.group(1))
-
-            # Handle functions and subqueries: Extract alias if present
-            subquery_or_function_match = re.search(r"\)\s+AS\s+([\w_]+)", col, re.IGNORECASE)
-            if subquery_or_function_match:
-                extracted_columns.append(subquery_or_function_match.group(1))
-
-            # Handle direct column selections without aliases
-            direct_col_match = re.search(r"^\s*([\w_]+)\s*$", col)
-            if direct_col_match:
-                extracted_columns.append(direct_col_match.group(1))
-
-    else:
-        # For simple queries (without a nested SELECT and second FROM)
-        match = re.search(r"SELECT(.*?)FROM", sql_query, re.IGNORECASE | re.DOTALL)
-        
-        if match:
-            columns = match.group(1).strip()
-
-            # Split the columns correctly while avoiding commas inside parentheses (for functions/subqueries)
-            column_list = re.split(r",\s*(?![^()]*\))", columns)
-
-            for col in column_list:
-                col = col.strip()
-
-                # Extract alias if present (AS keyword)
-                alias_match = re.search(r"AS\s+([\w_]+)", col, re.IGNORECASE)
-                if alias_match:
-                    extracted_columns.append(alias_match.group(1))
-
-                # Handle CASE statements by extracting alias after END AS
-                case_match = re.search(r"END\s+AS\s+([\w_]+)", col, re.IGNORECASE)
-                if case_match:
-                    extracted_columns.append(case_match.group(1))
-
-                # Handle functions and subqueries: Extract alias if present
-                subquery_or_function_match = re.search(r"\)\s+AS\s+([\w_]+)", col, re.IGNORECASE)
-                if subquery_or_function_match:
-                    extracted_columns.append(subquery_or_function_match.group(1))
-
-                # Handle direct column selections without aliases
-                direct_col_match = re.search(r"^\s*([\w_]+)\s*$", col)
-                if direct_col_match:
-                    extracted_columns.append(direct_col_match.group(1))
-
-    # Ensure no duplicates
-    extracted_columns = list(set(extracted_columns))
+    for item in _iter_select_items(tokenize_sql(sql_query)):
+        name = _column_name(item)
+        if name and name not in seen:
+            seen.add(name)
+            extracted_columns.append(name)
+
+    return extracted_columns
+
+
+def extract_columns(sql_query, debug=None):
+    """Extracts column names from a SQL SELECT query, ensuring aliases, functions, and subqueries are handled correctly."""
+    extracted_columns = extract_select_columns(sql_query)
 
     # Debug print the extracted columns
-    print(f"Extracted Columns: {extracted_columns}")
+    if DEBUG_OUTPUT if debug is None else debug:
+        print(f"Extracted Columns: {extracted_columns}")
 
     return extracted_columns
 
 
-# Example Usage for a simple query
-sql_simple = """
-SELECT customer_id, sales, pls_work, please as pls
-    FROM orders 
-    WHERE order_date >= '2024-01-01'
-"""
-columns_simple = extract_columns(sql_simple)
-
-# Example Usage for a complex query -- the limitation is it will not read columns after the first Subquery in the main select
-sql_complex = """
-SELECT 
-    customer_id, customer_id as cust_id,
-    CASE 
-        WHEN total_sales > 1000 THEN 'VIP'
-        ELSE 'Regular'
-    END AS customer_status, pls_work,
-    (SELECT AVG(sales) FROM transactions WHERE transactions.customer_id = orders.customer_id) AS avg_customer_sales,
-    SUM(sales) AS total_sales
-FROM (
-    SELECT customer_id, sales 
-    FROM orders 
-    WHERE order_date >= '2024-01-01'
-) orders
-GROUP BY customer_id
-"""
-columns_complex = extract_columns(sql_complex)
+# Literals never name a column, so they are swapped for a fixed placeholder of the same
+# token kind. Quoted identifiers are matched first so quotes inside them are left alone.
+FINGERPRINT_PATTERN = re.compile(r"""
+      (?P<quoted>"(?:[^"]|"")*"|`(?:[^`]|``)*`|\[[^\]]*\])
+    | (?P<string>'(?:[^']|'')*')
+    | (?P<number>(?<![\w.])\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)
+    | (?P<space>(?:\s|--[^\n]*|/\*.*?\*/)+)
+""", re.VERBOSE | re.DOTALL)
+
+# A run of whitespace and comments collapses to one space
+FINGERPRINT_REPLACEMENTS = {"string": "''", "number": "0", "space": " "}
+
+
+def _fingerprint_token(match):
+    return FINGERPRINT_REPLACEMENTS.get(match.lastgroup, match.group(0))
+
+
+@instrumented("parse.sql_fingerprint")
+def query_fingerprint(sql_query):
+    """Normalizes a query to its shape: literals replaced, comments and extra whitespace removed."""
+    return FINGERPRINT_PATTERN.sub(_fingerprint_token, sql_query).strip()
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _extract_fingerprint_columns(fingerprint):
+    # Cached per process; a tuple so callers cannot mutate the cached value
+    return tuple(extract_select_columns(fingerprint))
+
+
+def extract_columns_cached(sql_query):
+    """Extracts columns through the per-process LRU cache of query shapes."""
+    return list(_extract_fingerprint_columns(query_fingerprint(sql_query)))
+
+
+def _extract_chunk(queries):
+    return [extract_columns_cached(q) for q in queries]
+
+
+def read_query_log(path, one_per_line=False):
+    """Streams queries from a log file: one per line, or statements ending with ';'."""
+    with open(path, encoding="utf-8") as f:
+        if one_per_line:
+            for line in f:
+                if line.strip():
+                    yield line.rstrip("\n")
+            return
+
+        statement = []
+        for line in f:
+            statement.append(line)
+            if line.rstrip().endswith(";"):
+                yield "".join(statement).strip()
+                statement = []
+        if "".join(statement).strip():
+            yield "".join(statement).strip()
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def extract_columns_many(queries, workers=1, chunk_size=1_000):
+    """Yields the column list for each query, in input order.
+
+    `queries` can be any iterable of SQL strings or a path to a query log. With
+    workers > 1 the stream is cut into chunks that run in a process pool; only a few
+    chunks per worker are in flight at once, so arbitrarily long logs stream through.
+    """
+    if isinstance(queries, (str, bytes)) or hasattr(queries, "__fspath__"):
+        queries = read_query_log(queries)
+
+    if workers <= 1:
+        for query in queries:
+            yield extract_columns_cached(query)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in _chunked(queries, chunk_size):
+            pending.append(pool.submit(_extract_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def generate_synthetic_query(target_bytes):
+    """Builds a SELECT with a mix of plain, aliased, CASE, function and subquery columns."""
+    templates = [
+        "col_{i}",
+        "t.col_{i} AS alias_{i}",
+        "CASE WHEN amount_{i} > 1000 THEN 'VIP, gold' ELSE 'Regular' END AS status_{i}",
+        "COALESCE(SUM(sales_{i}), 0) total_{i}",
+        "(SELECT AVG(x) FROM t{i} WHERE t{i}.id = orders.id) AS avg_{i}",
+        "\"Quoted Col {i}\"",
+    ]
+    parts = []
+    size = len("SELECT \nFROM orders")
+    i = 0
+    while size < target_bytes:
+        part = templates[i % len(templates)].format(i=i)
+        parts.append(part)
+        size += len(part) + 2
+        i += 1
+    return "SELECT " + ",\n".join(parts) + "\nFROM orders"
+
+
+def benchmark_extract_columns(sizes=(1_000, 10_000, 100_000, 1_000_000), repeats=3):
+    """Times extract_select_columns on synthetic queries and prints microseconds per KB."""
+    print(f"{'size (bytes)':>14} {'columns':>9} {'best (ms)':>10} {'us/KB':>8}")
+    for size in sizes:
+        query = generate_synthetic_query(size)
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            columns = extract_select_columns(query)
+            best = min(best, time.perf_counter() - start)
+        per_kb = best * 1e6 / (len(query) / 1024)
+        print(f"{len(query):>14} {len(columns):>9} {best * 1000:>10.2f} {per_kb:>8.1f}")
+
+
+if __name__ == "__main__":
+    # Example Usage for a simple query
+    sql_simple = """
+    SELECT customer_id, sales, pls_work, please as pls
+        FROM orders
+        WHERE order_date >= '2024-01-01'
+    """
+    columns_simple = extract_columns(sql_simple)
+
+    # Example Usage for a complex query -- subqueries, CASE and functions in the main select
+    sql_complex = """
+    SELECT
+        customer_id, customer_id as cust_id,
+        CASE
+            WHEN total_sales > 1000 THEN 'VIP'
+            ELSE 'Regular'
+        END AS customer_status, pls_work,
+        (SELECT AVG(sales) FROM transactions WHERE transactions.customer_id = orders.customer_id) AS avg_customer_sales,
+        SUM(sales) AS total_sales
+    FROM (
+        SELECT customer_id, sales
+        FROM orders
+        WHERE order_date >= '2024-01-01'
+    ) orders
+    GROUP BY customer_id
+    """
+    columns_complex = extract_columns(sql_complex)
+
+    # Scaling check: time per KB should stay flat from 1 KB to 1 MB
+    if "--benchmark" in sys.argv:
+        benchmark_extract_columns()
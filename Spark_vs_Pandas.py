@@ -1,31 +1,559 @@
-# Use Pandas for small to medium datasets, as it offers fast processing, simple usability, 
-# and seamless integration with REST APIs. 
+# Use Pandas for small to medium datasets, as it offers fast processing, simple usability,
+# and seamless integration with REST APIs.
 
-# Choose PySpark for large-scale datasets, leveraging distributed and parallel processing, 
-# making it ideal for JDBC connections and complex ETL workflows, though it requires a Spark setup. 
+# Choose PySpark for large-scale datasets, leveraging distributed and parallel processing,
+# making it ideal for JDBC connections and complex ETL workflows, though it requires a Spark setup.
 
-import pandas as pd
+# Which one fits is not just a row count: a narrow 2M-row table is fine in pandas while a wide
+# 300k-row one can exhaust RAM. choose_engine() estimates the in-memory size from a sample,
+# checks the machine's free memory and cores, and picks the cheapest engine that fits.
+
+import os
 import random
-from pyspark.sql import SparkSession
-
-# Function to determine whether to use Pandas or Spark
-def should_use_spark(data_size, threshold=1_000_000):
-    return data_size >= threshold
-
-# Generate fake SAP data
-num_records = random.randint(500_000, 1_500_000)  # Simulating different data sizes
-data = generate_fake_sap_data(num_records)
-
-print(f"Generated {num_records} records...")
-
-if should_use_spark(len(data)):
-    # Use Spark for large datasets
-    spark = SparkSession.builder.appName("SAPDataIngestion").getOrCreate()
-    df_spark = spark.createDataFrame(data)
-    print("Using Spark:")
-    df_spark.show(5)
-else:
-    # Use Pandas for small datasets
-    df = pd.DataFrame(data)
-    print("Using Pandas:")
-    print(df.head())
+import shutil
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # the generator falls back to NumPy columns
+    pa = None
+
+try:
+    from pyspark.sql import SparkSession
+except ImportError:  # Spark is only an option when pyspark is installed
+    SparkSession = None
+
+PANDAS, CHUNKED_PANDAS, SPARK = "pandas", "chunked pandas", "spark"
+
+EngineChoice = namedtuple("EngineChoice", ["engine", "reason", "rows", "estimated_bytes", "estimates"])
+
+
+class EngineCostModel:
+    """Tunable constants behind choose_engine.
+
+    The per-row costs and Spark startup time are machine specific; run
+    calibrate_cost_model() to measure them instead of relying on the defaults.
+    """
+
+    def __init__(self, pandas_seconds_per_row=1.0e-6, chunked_seconds_per_row=1.3e-6,
+                 spark_seconds_per_row=2.5e-6, spark_startup_seconds=15.0,
+                 working_set_factor=3.0, memory_fraction=0.6, chunk_memory_bytes=256 * 1024 ** 2,
+                 spark_min_cores=2):
+        # Cost of the ingest + head/aggregate workload, per row, single process
+        self.pandas_seconds_per_row = pandas_seconds_per_row
+        self.chunked_seconds_per_row = chunked_seconds_per_row
+        # Spark's per-row cost is divided across cores; startup is paid once per session
+        self.spark_seconds_per_row = spark_seconds_per_row
+        self.spark_startup_seconds = spark_startup_seconds
+        # pandas needs several copies of the data while transforming it
+        self.working_set_factor = working_set_factor
+        # Share of currently available memory a job may plan to use
+        self.memory_fraction = memory_fraction
+        # Target size of one chunk for the chunked engine
+        self.chunk_memory_bytes = chunk_memory_bytes
+        self.spark_min_cores = spark_min_cores
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+        return f"EngineCostModel({fields})"
+
+
+def available_memory_bytes():
+    """Returns the memory currently available to new allocations."""
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        pass
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+
+
+def _is_categorical(values):
+    return isinstance(getattr(values, "dtype", None), pd.CategoricalDtype)
+
+
+def _categorical_columns(frame):
+    """Returns (vocabulary bytes, code bytes per row, names) for the categorical columns of `frame`.
+
+    A categorical costs its codes per row plus its vocabulary once; a sample's deep memory
+    usage would charge the whole vocabulary to every sampled row.
+    """
+    vocabulary, per_row, names = 0, 0, []
+    for name, values in frame.items():
+        if _is_categorical(values):
+            vocabulary += values.cat.categories.memory_usage(deep=True)
+            per_row += values.cat.codes.dtype.itemsize
+            names.append(name)
+    return vocabulary, per_row, names
+
+
+def estimate_footprint(data, sample_size=2_000, seed=0):
+    """Estimates (rows, bytes) of `data` once loaded into pandas, from a random sample.
+
+    `data` can be an Arrow table, a DataFrame, a dict of columns or a sequence of records.
+    Categorical columns count their codes per row and their vocabulary once.
+    """
+    if isinstance(data, pd.DataFrame):
+        rows = len(data)
+        sample = data.sample(min(sample_size, rows), random_state=seed) if rows else data
+    else:
+        rows = data.num_rows if pa is not None and isinstance(data, pa.Table) else (
+            len(next(iter(data.values()), [])) if isinstance(data, dict) else len(data))
+        idx = sorted(random.Random(seed).sample(range(rows), min(sample_size, rows)))
+        if pa is not None and isinstance(data, pa.Table):
+            # Arrow's buffer sizes understate pandas' (strings become Python objects), so a
+            # converted sample is measured; dictionary columns keep their whole dictionary
+            sample = to_pandas(data.take(pa.array(idx, type=pa.int64())))
+        elif isinstance(data, dict):
+            sample = pd.DataFrame({k: pd.Categorical(v).take(idx) if _is_categorical(v) else [v[i] for i in idx]
+                                   for k, v in data.items()})
+        else:
+            sample = pd.DataFrame([data[i] for i in idx])
+
+    if not rows or not len(sample):
+        return rows, 0
+    vocabulary, code_bytes, categorical = _categorical_columns(sample)
+    per_row = code_bytes + sample.drop(columns=categorical).memory_usage(index=False, deep=True).sum() / len(sample)
+    return rows, vocabulary + int(per_row * rows)
+
+
+def choose_engine(data, model=None, memory_bytes=None, cores=None, spark_available=None):
+    """Picks pandas, chunked pandas or local Spark for `data` and says why.
+
+    Engines whose working set does not fit in memory are ruled out; among the rest the one
+    with the lowest modelled run time wins.
+    """
+    model = model or EngineCostModel()
+    memory_bytes = available_memory_bytes() if memory_bytes is None else memory_bytes
+    cores = (os.cpu_count() or 1) if cores is None else cores
+    spark_available = SparkSession is not None if spark_available is None else spark_available
+
+    rows, estimated_bytes = estimate_footprint(data)
+    budget = memory_bytes * model.memory_fraction
+    working_set = estimated_bytes * model.working_set_factor
+
+    estimates = {}
+    ruled_out = []
+    if working_set <= budget:
+        estimates[PANDAS] = rows * model.pandas_seconds_per_row
+    else:
+        ruled_out.append(f"pandas needs ~{working_set / 1e9:.2f} GB but only {budget / 1e9:.2f} GB is budgeted")
+    estimates[CHUNKED_PANDAS] = rows * model.chunked_seconds_per_row
+    if not spark_available:
+        ruled_out.append("pyspark is not installed")
+    elif cores < model.spark_min_cores:
+        ruled_out.append(f"only {cores} core(s), Spark needs {model.spark_min_cores}")
+    else:
+        estimates[SPARK] = model.spark_startup_seconds + rows * model.spark_seconds_per_row / cores
+
+    engine = min(estimates, key=estimates.get)
+    reason = (f"{engine}: {rows:,} rows, ~{estimated_bytes / 1e6:,.1f} MB in memory "
+              f"(~{working_set / 1e6:,.1f} MB working set), {memory_bytes / 1e9:.2f} GB available, "
+              f"{cores} core(s); estimated " +
+              ", ".join(f"{name} {seconds:.2f}s" for name, seconds in sorted(estimates.items(), key=lambda kv: kv[1])))
+    if ruled_out:
+        reason += "; ruled out: " + "; ".join(ruled_out)
+    return EngineChoice(engine, reason, rows, estimated_bytes, estimates)
+
+
+# Vocabularies for the synthetic SAP sales-order items (VBAP-style fields)
+SAP_SALES_ORGS = np.array(["1000", "1010", "2000", "3000"], dtype=object)
+SAP_PLANTS = np.array(["1000", "1100", "1200", "2000", "2100", "3000"], dtype=object)
+SAP_CURRENCIES = np.array(["USD", "EUR", "GBP", "JPY"], dtype=object)
+SAP_UNITS = np.array(["EA", "PC", "KG", "L", "BOX"], dtype=object)
+SAP_NUM_MATERIALS = 5_000
+SAP_NUM_CUSTOMERS = 20_000
+SAP_START_DATE = np.datetime64("2020-01-01")
+SAP_DATE_RANGE_DAYS = 5 * 365
+
+
+def _sap_vocabulary(prefix, count, width):
+    return np.array([f"{prefix}{i:0{width}d}" for i in range(count)], dtype=object)
+
+
+SAP_MATERIALS = _sap_vocabulary("MAT", SAP_NUM_MATERIALS, 7)
+SAP_CUSTOMERS = _sap_vocabulary("CUST", SAP_NUM_CUSTOMERS, 6)
+
+SAP_CATEGORIES = {
+    "VKORG": SAP_SALES_ORGS,
+    "WERKS": SAP_PLANTS,
+    "MATNR": SAP_MATERIALS,
+    "KUNNR": SAP_CUSTOMERS,
+    "WAERK": SAP_CURRENCIES,
+    "VRKME": SAP_UNITS,
+}
+
+
+def _sap_columns(rng, start, rows):
+    """Draws one batch of SAP sales-order items as NumPy arrays (categoricals as codes)."""
+    # Ten items per order: global row i is item (i % 10 + 1) * 10 of order i // 10
+    position = start + np.arange(rows, dtype=np.int64)
+    qty = rng.integers(1, 500, rows)
+    price = np.round(rng.lognormal(3.0, 1.0, rows), 2)
+    return {
+        "VBELN": position // 10 + 1_000_000_000,
+        "POSNR": (position % 10 + 1) * 10,
+        "ERDAT": SAP_START_DATE + rng.integers(0, SAP_DATE_RANGE_DAYS, rows).astype("timedelta64[D]"),
+        "VKORG": rng.integers(0, len(SAP_SALES_ORGS), rows, dtype=np.int32),
+        "WERKS": rng.integers(0, len(SAP_PLANTS), rows, dtype=np.int32),
+        "MATNR": rng.zipf(1.3, rows).clip(max=SAP_NUM_MATERIALS).astype(np.int32) - 1,
+        "KUNNR": rng.integers(0, SAP_NUM_CUSTOMERS, rows, dtype=np.int32),
+        "KWMENG": qty,
+        "VRKME": rng.integers(0, len(SAP_UNITS), rows, dtype=np.int32),
+        "NETPR": price,
+        "NETWR": np.round(qty * price, 2),
+        "WAERK": rng.choice(len(SAP_CURRENCIES), rows, p=[0.6, 0.25, 0.1, 0.05]).astype(np.int32),
+    }
+
+
+def _sap_batch(columns, output):
+    if output == "arrow":
+        arrays = {}
+        for name, values in columns.items():
+            if name in SAP_CATEGORIES:
+                # Dictionary-encoded: codes plus a small shared vocabulary, no per-row strings
+                arrays[name] = pa.DictionaryArray.from_arrays(values, pa.array(SAP_CATEGORIES[name], type=pa.string()))
+            else:
+                arrays[name] = pa.array(values)
+        return pa.table(arrays)
+    if output == "numpy":
+        return {name: SAP_CATEGORIES[name][values] if name in SAP_CATEGORIES else values
+                for name, values in columns.items()}
+    raise ValueError(f"Unknown output format: {output}")
+
+
+def generate_fake_sap_batches(num_records, batch_size=1_000_000, seed=None, output=None):
+    """Yields fake SAP sales-order items in fixed-size batches, so 100M+ rows never sit in memory.
+
+    Each batch is an Arrow table (default when pyarrow is installed) or a dict of NumPy
+    arrays. The same seed and batch size always produce the same rows.
+    """
+    output = output or ("arrow" if pa is not None else "numpy")
+    seeds = np.random.SeedSequence(seed)
+    for start in range(0, num_records, batch_size):
+        rows = min(batch_size, num_records - start)
+        rng = np.random.default_rng(seeds.spawn(1)[0])
+        yield _sap_batch(_sap_columns(rng, start, rows), output)
+
+
+def generate_fake_sap_data(num_records, seed=None, output=None):
+    """Generates fake SAP sales-order items as columnar data.
+
+    Returns an Arrow table or a dict of NumPy arrays. Both go straight into pandas
+    (Table.to_pandas / pd.DataFrame) and Spark (see to_spark) without building Python rows.
+    """
+    output = output or ("arrow" if pa is not None else "numpy")
+    batches = list(generate_fake_sap_batches(num_records, batch_size=max(num_records, 1), seed=seed, output=output))
+    if output == "arrow":
+        return batches[0] if batches else pa.table({})
+    return batches[0] if batches else {}
+
+
+def to_pandas(data):
+    """Converts generator output (Arrow table or dict of arrays) into a DataFrame."""
+    if pa is not None and isinstance(data, pa.Table):
+        return data.to_pandas(date_as_object=False)
+    return pd.DataFrame(data, copy=False)
+
+
+def to_spark(spark, data):
+    """Creates a Spark DataFrame from generator output through Arrow, not row by row."""
+    if pa is not None and isinstance(data, pa.Table):
+        try:
+            # Spark 4 accepts Arrow tables directly
+            return spark.createDataFrame(data)
+        except (TypeError, ValueError):
+            pass
+    spark.conf.set("spark.sql.execution.arrow.pyspark.enabled", "true")
+    return spark.createDataFrame(to_pandas(data))
+
+
+def _as_table(data):
+    """Collects generator output (a table, a dict of arrays or an iterable of batches) into one Arrow table."""
+    if isinstance(data, pa.Table):
+        return data
+    if isinstance(data, dict):
+        return pa.table(data)
+    if isinstance(data, pd.DataFrame):
+        return pa.Table.from_pandas(data, preserve_index=False)
+    return pa.concat_tables(batch if isinstance(batch, pa.Table) else pa.table(batch) for batch in data)
+
+
+# Aggregations that can be computed per batch and then merged
+MERGEABLE_AGGREGATES = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+
+class PandasEngine:
+    """Everything in one in-memory DataFrame."""
+
+    name = PANDAS
+
+    def load(self, data):
+        self.df = to_pandas(data if isinstance(data, (dict, pd.DataFrame)) or pa is None else _as_table(data))
+        return self
+
+    def head(self, n=5):
+        return self.df.head(n)
+
+    def aggregate(self, by, column, func="sum"):
+        return (self.df.groupby(by, observed=True)[column].agg(func)
+                .reset_index().sort_values(by, ignore_index=True))
+
+    def close(self):
+        self.df = None
+
+
+class ChunkedEngine:
+    """Out-of-core pandas/Arrow engine for data between "fits in pandas" and "needs Spark".
+
+    load() accepts a Parquet file, an Arrow IPC (.arrow/.feather) file, or in-memory /
+    streamed generator output, which is first spilled batch by batch to an IPC file. Reads
+    go through memory maps, so only the batches being worked on occupy RAM, and
+    aggregate() runs each record batch on a thread pool (Arrow releases the GIL) before
+    merging the partial results.
+    """
+
+    name = CHUNKED_PANDAS
+
+    def __init__(self, workers=None, spill_dir=None, batch_rows=1_000_000):
+        self.workers = workers or os.cpu_count() or 1
+        self.spill_dir = spill_dir
+        # In-memory tables are split into record batches of at most this many rows
+        self.batch_rows = batch_rows
+        self._tmpdir = None
+
+    def load(self, data):
+        if isinstance(data, (str, os.PathLike)):
+            path = os.fspath(data)
+        else:
+            self._tmpdir = tempfile.mkdtemp(prefix="chunked_engine_", dir=self.spill_dir)
+            path = os.path.join(self._tmpdir, "data.arrow")
+            self._write_ipc(data, path, self.batch_rows)
+
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            self._parquet = pq.ParquetFile(path, memory_map=True)
+            self._ipc = None
+            self.num_batches = self._parquet.num_row_groups
+        else:
+            self._ipc = pa.ipc.open_file(pa.memory_map(path))
+            self._parquet = None
+            self.num_batches = self._ipc.num_record_batches
+        return self
+
+    @staticmethod
+    def _write_ipc(data, path, batch_rows):
+        if isinstance(data, (pa.Table, dict, pd.DataFrame)):
+            data = [data]
+        writer = None
+        with pa.OSFile(path, "wb") as sink:
+            for batch in data:
+                table = _as_table(batch)
+                if writer is None:
+                    writer = pa.ipc.new_file(sink, table.schema)
+                writer.write_table(table, max_chunksize=batch_rows)
+            if writer is not None:
+                writer.close()
+
+    def _batch(self, i):
+        if self._ipc is not None:
+            return pa.Table.from_batches([self._ipc.get_batch(i)])
+        return self._parquet.read_row_group(i)
+
+    def head(self, n=5):
+        tables, rows = [], 0
+        for i in range(self.num_batches):
+            if rows >= n:
+                break
+            tables.append(self._batch(i).slice(0, n - rows))
+            rows += tables[-1].num_rows
+        return to_pandas(pa.concat_tables(tables)) if tables else pd.DataFrame()
+
+    def aggregate(self, by, column, func="sum"):
+        funcs = ["sum", "count"] if func == "mean" else [func]
+        if any(f not in MERGEABLE_AGGREGATES for f in funcs):
+            raise ValueError(f"Chunked aggregation supports {sorted(MERGEABLE_AGGREGATES)} and mean, not {func!r}")
+        if not self.num_batches:
+            return pd.DataFrame(columns=[by, column])
+
+        def partial(i):
+            return self._batch(i).group_by(by, use_threads=False).aggregate([(column, f) for f in funcs])
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            partials = pa.concat_tables(pool.map(partial, range(self.num_batches)))
+        merged = partials.group_by(by).aggregate(
+            [(f"{column}_{f}", MERGEABLE_AGGREGATES[f]) for f in funcs])
+
+        result = to_pandas(merged)
+        if func == "mean":
+            result[column] = result[f"{column}_sum_sum"] / result[f"{column}_count_sum"]
+        else:
+            result[column] = result[f"{column}_{func}_{MERGEABLE_AGGREGATES[func]}"]
+        return result[[by, column]].sort_values(by, ignore_index=True)
+
+    def close(self):
+        self._ipc = self._parquet = None
+        if self._tmpdir:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+
+class SparkEngine:
+    """Local-mode Spark session fed through Arrow."""
+
+    name = SPARK
+
+    def __init__(self, app_name="SAPDataIngestion"):
+        self.spark = SparkSession.builder.appName(app_name).getOrCreate()
+
+    def load(self, data):
+        self.df = to_spark(self.spark, data if isinstance(data, dict) else _as_table(data))
+        return self
+
+    def head(self, n=5):
+        return self.df.limit(n).toPandas()
+
+    def aggregate(self, by, column, func="sum"):
+        from pyspark.sql import functions as F
+        return (self.df.groupBy(by).agg(getattr(F, func)(column).alias(column))
+                .orderBy(by).toPandas())
+
+    def close(self):
+        self.df = None
+
+
+def make_engine(name, **kwargs):
+    """Returns a fresh engine for an EngineChoice.engine name."""
+    engines = {PANDAS: PandasEngine, CHUNKED_PANDAS: ChunkedEngine, SPARK: SparkEngine}
+    return engines[name](**kwargs)
+
+
+def benchmark_engines(sizes=(1_000_000, 10_000_000), engines=(PANDAS, CHUNKED_PANDAS, SPARK),
+                      batch_size=1_000_000, seed=0):
+    """Times load, head and a groupby-sum through each engine on generated SAP data."""
+    if SparkSession is None:
+        engines = [name for name in engines if name != SPARK]
+    print(f"{'rows':>12} {'engine':>15} {'load (s)':>9} {'head (s)':>9} {'agg (s)':>9}")
+    for rows in sizes:
+        for name in engines:
+            batches = generate_fake_sap_batches(rows, batch_size=batch_size, seed=seed)
+            engine = make_engine(name)
+            try:
+                load = _time(lambda: engine.load(batches))
+                head = _time(lambda: engine.head(5))
+                agg = _time(lambda: engine.aggregate("MATNR", "NETWR", "sum"))
+            finally:
+                engine.close()
+            print(f"{rows:>12,} {name:>15} {load:>9.3f} {head:>9.3f} {agg:>9.3f}")
+
+
+def _time(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def _run_workload(engine, data):
+    """The load + head + groupby-sum workload the cost model prices, closing the engine after."""
+    try:
+        engine.load(data)
+        engine.head(5)
+        engine.aggregate("MATNR", "NETWR", "sum")
+    finally:
+        engine.close()
+
+
+def _spark_wins_above(model, seconds_per_row, cores):
+    """Row count above which Spark's startup is paid back against an engine costing seconds_per_row."""
+    gain_per_row = seconds_per_row - model.spark_seconds_per_row / cores
+    return model.spark_startup_seconds / gain_per_row if gain_per_row > 0 else None
+
+
+def calibrate_cost_model(sizes=(200_000, 1_000_000), include_spark=True, chunk_rows=250_000, memory_bytes=None,
+                         seed=0):
+    """Measures per-row costs and Spark startup on this machine and returns a fitted model.
+
+    Runs the same load + head + groupby workload through PandasEngine, ChunkedEngine and
+    SparkEngine on generated SAP data (the input choose_engine routes), fits per-row costs
+    from the largest size, and prints the row counts where chunked pandas and Spark take over.
+    """
+    model = EngineCostModel()
+    cores = os.cpu_count() or 1
+    engines = {PANDAS: PandasEngine}
+    if pa is not None:
+        engines[CHUNKED_PANDAS] = lambda: ChunkedEngine(batch_rows=chunk_rows)
+    results = {}
+    for rows in sizes:
+        data = generate_fake_sap_data(rows, seed=seed)
+        results[rows] = {name: _time(lambda: _run_workload(engine(), data)) for name, engine in engines.items()}
+        print(f"{rows:>10,} rows: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in results[rows].items()))
+
+    largest = max(sizes)
+    model.pandas_seconds_per_row = results[largest][PANDAS] / largest
+    if CHUNKED_PANDAS in results[largest]:
+        model.chunked_seconds_per_row = results[largest][CHUNKED_PANDAS] / largest
+
+    # pandas hands over to chunked pandas once its working set no longer fits, unless chunked is faster outright
+    bytes_per_row = estimate_footprint(data)[1] / largest
+    memory_bytes = available_memory_bytes() if memory_bytes is None else memory_bytes
+    pandas_limit = int(memory_bytes * model.memory_fraction / (bytes_per_row * model.working_set_factor))
+    if model.chunked_seconds_per_row < model.pandas_seconds_per_row:
+        pandas_limit = 0
+        print("Crossover: chunked pandas beats pandas at every size on this machine")
+    else:
+        print(f"Crossover: chunked pandas takes over above ~{pandas_limit:,} rows, where pandas stops fitting in memory")
+
+    if include_spark and SparkSession is not None:
+        start = time.perf_counter()
+        engine = SparkEngine("EngineCalibration")
+        model.spark_startup_seconds = time.perf_counter() - start
+        try:
+            spark_seconds = _time(lambda: _run_workload(engine, data))
+        finally:
+            engine.spark.stop()
+        model.spark_seconds_per_row = spark_seconds * cores / largest
+        print(f"Spark startup {model.spark_startup_seconds:.2f}s, {spark_seconds:.3f}s for {largest:,} rows")
+
+        over_pandas = _spark_wins_above(model, model.pandas_seconds_per_row, cores)
+        over_chunked = _spark_wins_above(model, model.chunked_seconds_per_row, cores)
+        if over_pandas is not None and over_pandas < pandas_limit:
+            print(f"Crossover: Spark wins above ~{over_pandas:,.0f} rows")
+        elif over_chunked is not None:
+            print(f"Crossover: Spark wins above ~{max(over_chunked, pandas_limit):,.0f} rows")
+        else:
+            print("Crossover: Spark never beats pandas or chunked pandas on this machine for this workload")
+    return model
+
+if __name__ == "__main__":
+    # Generate fake SAP data
+    num_records = random.randint(500_000, 1_500_000)  # Simulating different data sizes
+    data = generate_fake_sap_data(num_records, seed=42)
+
+    print(f"Generated {num_records} records...")
+
+    choice = choose_engine(data)
+    print(f"Engine choice -> {choice.reason}")
+
+    # All three engines share the same load/head/aggregate API
+    engine = make_engine(choice.engine).load(data)
+    print(f"Using {engine.name}:")
+    print(engine.head(5))
+    print(engine.aggregate("WERKS", "NETWR", "sum"))
+    engine.close()
+
+    if "--benchmark" in sys.argv:
+        benchmark_engines()
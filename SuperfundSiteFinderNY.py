@@ -9,10 +9,63 @@ For mapping tools like Folium or Google Maps, 4–6 decimal places is ideal.
 More than 7 is rarely needed unless you're doing high-precision GPS work.
 '''
 
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+
 import folium
 from folium import Marker, Circle
+from folium.elements import MacroElement
+from folium.plugins import MarkerCluster
+from folium.template import Template
+from folium.utilities import JsCode
+import numpy as np
 import pandas as pd
 
+try:
+    from sklearn.neighbors import BallTree
+except ImportError:  # scikit-learn is optional; queries fall back to brute force
+    BallTree = None
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # snapshots are then read through pandas, without memory mapping
+    pq = None
+
+from Instrumentation import instrumented
+
+# Mean Earth radius; haversine distances on the unit sphere are scaled by this
+EARTH_RADIUS_KM = 6371.0088
+
+# Query points per brute-force block, keeps the pairwise distance matrix small
+BRUTE_FORCE_CHUNK = 4096
+
+# Radius drawn around each site and used for the "near a site" check
+SITE_RADIUS_KM = 1.0
+
+# Where the bulk site snapshot lives, and how many incremental parts it may
+# collect before they are compacted back into one
+SNAPSHOT_DIR = "superfund_snapshot"
+SNAPSHOT_MAX_PARTS = 8
+
+# Columns of a normalized site table
+SITE_COLUMNS = ['Site ID', 'Site Name', 'County', 'State', 'Latitude', 'Longitude', 'Superfund Status']
+
+# Header spellings seen in EPA exports, lowercased, mapped to SITE_COLUMNS
+SITE_COLUMN_ALIASES = {
+    'site id': 'Site ID', 'site_id': 'Site ID', 'epa id': 'Site ID', 'site epa id': 'Site ID', 'epa_id': 'Site ID',
+    'site name': 'Site Name', 'site_name': 'Site Name', 'name': 'Site Name',
+    'county': 'County', 'state': 'State', 'st': 'State',
+    'latitude': 'Latitude', 'lat': 'Latitude', 'longitude': 'Longitude', 'lon': 'Longitude', 'long': 'Longitude',
+    'superfund status': 'Superfund Status', 'npl status': 'Superfund Status', 'status': 'Superfund Status',
+}
+
+# Above this many points the map switches from one Marker/Circle per row to layers
+CLUSTER_THRESHOLD = 500
+
 # Superfund data
 data = {
     'Latitude': [43.0935, 43.2736, 43.0848, 40.6736, 40.7365, 40.6997, 42.9414, 42.6333],
@@ -31,57 +84,625 @@ data = {
 
 df = pd.DataFrame(data)
 
-# Ask user if they want to add a new site or skip
-print("If you'd like to add a new site for comparison, enter the details below.")
-print("Otherwise, press Enter to skip.")
-
-user_input = input("Enter County,Latitude,Longitude,Superfund Status (Yes/No),Site Name or press Enter to skip: ").strip()
-
-if user_input:
-    try:
-        county, lat, lon, status, site_name = [x.strip() for x in user_input.split(',')]
-        new_site = {
-            'Latitude': float(lat),
-            'Longitude': float(lon),
-            'Superfund Status': status,
-            'Site Name': site_name,
-            'County': county
-        }
-        df = pd.concat([df, pd.DataFrame([new_site])], ignore_index=True)
-        print(f"Successfully added: {site_name} in {county}.")
-    except Exception as e:
-        print("Invalid input format. Skipping new site addition.")
-        print("Error:", e)
-
-# Create map centered on NY State
-m = folium.Map(location=[42.9, -75], zoom_start=7)
-
-# Add site markers and radius circles
-for _, row in df.iterrows():
-    location = [row['Latitude'], row['Longitude']]
-    is_superfund = row['Superfund Status'].lower() == 'yes'
-    color = 'red' if is_superfund else 'green'
-
-    # Add marker
-    Marker(
-        location=location,
-        popup=f"{row['Site Name']} ({row['County']})",
-        icon=folium.Icon(color=color)
-    ).add_to(m)
-
-    # Add radius circle for all entries
-    Circle(
-        location=location,
-        radius=1000,  # 1 km radius around Superfund site
-        color=color,
-        fill=True,
-        fill_color=color,
-        fill_opacity=0.2,
-        popup=f"2 km radius around {row['Site Name']}"
-    ).add_to(m)
-
-# Show map
-m
-
-# Example Input:
-# Queens,40.7650, -73.9304,No,Queens Example
+
+def _as_radians(latitudes, longitudes):
+    """Stacks lat/lon degrees (scalars or arrays) into an (n, 2) array of radians."""
+    lat = np.atleast_1d(np.asarray(latitudes, dtype=np.float64))
+    lon = np.atleast_1d(np.asarray(longitudes, dtype=np.float64))
+    return np.radians(np.column_stack([lat, lon]))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; inputs are degrees and broadcast like numpy arrays."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def brute_force_nearest(site_lats, site_lons, latitudes, longitudes, k=1):
+    """Reference k-nearest search: every query against every site, in blocks."""
+    lat = np.atleast_1d(np.asarray(latitudes, dtype=np.float64))
+    lon = np.atleast_1d(np.asarray(longitudes, dtype=np.float64))
+    site_lats = np.asarray(site_lats, dtype=np.float64)
+    site_lons = np.asarray(site_lons, dtype=np.float64)
+    k = min(k, len(site_lats))
+    distances = np.empty((len(lat), k))
+    indices = np.empty((len(lat), k), dtype=np.intp)
+    for start in range(0, len(lat), BRUTE_FORCE_CHUNK):
+        block = slice(start, start + BRUTE_FORCE_CHUNK)
+        d = haversine_km(lat[block, None], lon[block, None], site_lats[None, :], site_lons[None, :])
+        nearest = np.argpartition(d, k - 1, axis=1)[:, :k] if k < d.shape[1] else np.tile(np.arange(k), (len(d), 1))
+        nearest_d = np.take_along_axis(d, nearest, axis=1)
+        order = np.argsort(nearest_d, axis=1, kind="stable")
+        indices[block] = np.take_along_axis(nearest, order, axis=1)
+        distances[block] = np.take_along_axis(nearest_d, order, axis=1)
+    return distances, indices
+
+
+class SiteIndex:
+    """Proximity queries over site coordinates, using a haversine BallTree when available.
+
+    Every query method takes scalars or equal-length arrays of latitudes and longitudes in
+    degrees and answers all of them in one vectorized call; distances are in km.
+    """
+
+    def __init__(self, latitudes, longitudes, leaf_size=40):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.tree = None
+        if BallTree is not None and len(self.latitudes):  # BallTree refuses zero rows; no sites means no hits
+            self.tree = BallTree(_as_radians(self.latitudes, self.longitudes), leaf_size=leaf_size, metric="haversine")
+
+    @classmethod
+    def from_frame(cls, frame, lat_col="Latitude", lon_col="Longitude", **kwargs):
+        return cls(frame[lat_col].to_numpy(), frame[lon_col].to_numpy(), **kwargs)
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    def nearest(self, latitudes, longitudes, k=1):
+        """Returns (distances, indices), each (n_queries, k), closest site first."""
+        k = min(k, len(self))
+        if not k:
+            n = len(_as_radians(latitudes, longitudes))
+            return np.empty((n, 0)), np.empty((n, 0), dtype=np.intp)
+        if self.tree is None:
+            return brute_force_nearest(self.latitudes, self.longitudes, latitudes, longitudes, k)
+        distances, indices = self.tree.query(_as_radians(latitudes, longitudes), k=k)
+        return distances * EARTH_RADIUS_KM, indices
+
+    def within(self, latitudes, longitudes, radius_km, sort_results=True):
+        """Returns (distances, indices): per query point, arrays of the sites within radius_km."""
+        points = _as_radians(latitudes, longitudes)
+        if self.tree is not None:
+            indices, distances = self.tree.query_radius(points, r=radius_km / EARTH_RADIUS_KM,
+                                                        return_distance=True, sort_results=sort_results)
+            return [d * EARTH_RADIUS_KM for d in distances], list(indices)
+
+        lat, lon = np.degrees(points[:, 0]), np.degrees(points[:, 1])
+        all_distances, all_indices = [], []
+        for start in range(0, len(lat), BRUTE_FORCE_CHUNK):
+            block = slice(start, start + BRUTE_FORCE_CHUNK)
+            d = haversine_km(lat[block, None], lon[block, None], self.latitudes[None, :], self.longitudes[None, :])
+            for row in d:
+                hits = np.flatnonzero(row <= radius_km)
+                if sort_results:
+                    hits = hits[np.argsort(row[hits], kind="stable")]
+                all_distances.append(row[hits])
+                all_indices.append(hits)
+        return all_distances, all_indices
+
+    def count_within(self, latitudes, longitudes, radius_km):
+        """Number of sites within radius_km of each query point."""
+        if self.tree is not None:
+            return self.tree.query_radius(_as_radians(latitudes, longitudes), r=radius_km / EARTH_RADIUS_KM,
+                                          count_only=True)
+        return np.array([len(hits) for hits in self.within(latitudes, longitudes, radius_km, sort_results=False)[1]])
+
+    def is_near(self, latitudes, longitudes, radius_km):
+        """Boolean array: is any site within radius_km of each query point?"""
+        distances, _ = self.nearest(latitudes, longitudes, k=1)
+        return (distances <= radius_km).any(axis=1)
+
+
+def benchmark_proximity(n_sites=(8, 1_300, 20_000), n_queries=1_000_000, k=3, radius_km=5.0, seed=0):
+    """Times SiteIndex (build + queries) against brute force on random points in NY State."""
+    rng = np.random.default_rng(seed)
+
+    def random_points(n):
+        return rng.uniform(40.5, 45.0, n), rng.uniform(-79.8, -71.8, n)
+
+    query_lat, query_lon = random_points(n_queries)
+    print(f"{'sites':>8} {'queries':>9} {'build (s)':>10} {'knn (s)':>9} {'radius (s)':>11} {'brute knn (s)':>14}")
+    for n in n_sites:
+        site_lat, site_lon = random_points(n)
+        start = time.perf_counter()
+        index = SiteIndex(site_lat, site_lon)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        distances, indices = index.nearest(query_lat, query_lon, k=k)
+        knn = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index.count_within(query_lat, query_lon, radius_km)
+        radius = time.perf_counter() - start
+
+        # Brute force grows with sites x queries, so time a sample and scale it up
+        sample = min(n_queries, max(1_000, 20_000_000 // n))
+        start = time.perf_counter()
+        brute_d, _ = brute_force_nearest(site_lat, site_lon, query_lat[:sample], query_lon[:sample], k=k)
+        brute = (time.perf_counter() - start) * n_queries / sample
+        assert np.allclose(brute_d, distances[:sample], atol=1e-6)
+
+        print(f"{n:>8} {n_queries:>9} {build:>10.3f} {knn:>9.2f} {radius:>11.2f} {brute:>14.2f}")
+
+
+class PartitionedSiteIndex:
+    """SiteIndex API over several indexes whose rows follow each other (one per snapshot part)."""
+
+    def __init__(self, indexes):
+        self.indexes = list(indexes)
+        self.offsets = np.cumsum([0] + [len(index) for index in self.indexes])[:-1]
+
+    def __len__(self):
+        return sum(len(index) for index in self.indexes)
+
+    def nearest(self, latitudes, longitudes, k=1):
+        k = min(k, len(self))
+        parts = [index.nearest(latitudes, longitudes, k) for index in self.indexes]
+        distances = np.hstack([d for d, _ in parts])
+        indices = np.hstack([i + offset for (_, i), offset in zip(parts, self.offsets)])
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+    def within(self, latitudes, longitudes, radius_km, sort_results=True):
+        parts = [index.within(latitudes, longitudes, radius_km, sort_results=False) for index in self.indexes]
+        all_distances, all_indices = [], []
+        for q in range(len(parts[0][0])):
+            d = np.concatenate([dists[q] for dists, _ in parts])
+            i = np.concatenate([idx[q] + offset for (_, idx), offset in zip(parts, self.offsets)])
+            if sort_results:
+                order = np.argsort(d, kind="stable")
+                d, i = d[order], i[order]
+            all_distances.append(d)
+            all_indices.append(i)
+        return all_distances, all_indices
+
+    def count_within(self, latitudes, longitudes, radius_km):
+        return sum(index.count_within(latitudes, longitudes, radius_km) for index in self.indexes)
+
+    def is_near(self, latitudes, longitudes, radius_km):
+        distances, _ = self.nearest(latitudes, longitudes, k=1)
+        return (distances <= radius_km).any(axis=1)
+
+
+def read_site_export(path):
+    """Reads an EPA site export (CSV or GeoJSON) into a raw DataFrame."""
+    if path.lower().endswith((".geojson", ".json")):
+        with open(path) as f:
+            features = json.load(f).get("features", [])
+        raw = pd.json_normalize([feature.get("properties") or {} for feature in features])
+        coords = [(feature.get("geometry") or {}).get("coordinates") or [None, None] for feature in features]
+        # GeoJSON points are [lon, lat]; they win over any lat/lon properties
+        raw['Longitude'] = [c[0] for c in coords]
+        raw['Latitude'] = [c[1] for c in coords]
+        return raw
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def normalize_sites(raw):
+    """Maps an export onto SITE_COLUMNS and validates coordinates, all column-wise.
+
+    Returns (sites, rejected): rows without usable coordinates are dropped and counted.
+    Swapped lat/lon pairs are repaired, coordinates are rounded to 6 decimals (~0.1 m),
+    and duplicates of the same Site ID keep the last row.
+    """
+    renames = {}
+    for column in raw.columns:
+        target = SITE_COLUMN_ALIASES.get(str(column).strip().lower())
+        if target and target not in renames.values():
+            renames[column] = target
+    sites = raw.rename(columns=renames)
+
+    lat, lon = (pd.to_numeric(sites[column], errors='coerce').to_numpy(dtype=np.float64) if column in sites
+                else np.full(len(sites), np.nan) for column in ('Latitude', 'Longitude'))
+    swapped = (np.abs(lat) > 90) & (np.abs(lon) <= 90)
+    lat, lon = np.where(swapped, lon, lat), np.where(swapped, lat, lon)
+    valid = (np.isfinite(lat) & np.isfinite(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+             & ~((lat == 0) & (lon == 0)))  # 0,0 is a missing value, not a site
+
+    out = pd.DataFrame(index=sites.index)
+    for column in ('Site Name', 'County', 'State'):
+        out[column] = sites[column].fillna('').astype(str).str.strip() if column in sites else ''
+    out['Latitude'] = lat.round(6)
+    out['Longitude'] = lon.round(6)
+    if 'Superfund Status' in sites:
+        status = sites['Superfund Status'].fillna('').astype(str).str.strip().str.lower()
+        # Yes/No as typed by hand, or an NPL status ("Final NPL", "Deleted NPL", ...)
+        out['Superfund Status'] = np.where(status.isin(['no', 'n', 'false']) | status.str.contains('deleted'), 'No', 'Yes')
+    else:
+        out['Superfund Status'] = 'Yes'
+    if 'Site ID' in sites:
+        out['Site ID'] = sites['Site ID'].fillna('').astype(str).str.strip()
+    else:
+        out['Site ID'] = ''
+    missing_id = out['Site ID'] == ''
+    out.loc[missing_id, 'Site ID'] = (out['Site Name'] + '@' + out['Latitude'].map('{:.4f}'.format) + ','
+                                      + out['Longitude'].map('{:.4f}'.format))[missing_id]
+
+    out = out.loc[valid, SITE_COLUMNS]
+    out = out.drop_duplicates('Site ID', keep='last').reset_index(drop=True)
+    return out, int((~valid).sum())
+
+
+class SiteSnapshot:
+    """Normalized sites as Parquet parts on disk, each stored with its prebuilt SiteIndex.
+
+    Loading memory-maps the Parquet files and unpickles the indexes, so nothing is
+    re-parsed or rebuilt. add() writes only the new rows as another part; once there are
+    more than max_parts parts they are compacted into one and indexed once.
+    """
+
+    def __init__(self, path=SNAPSHOT_DIR, max_parts=SNAPSHOT_MAX_PARTS):
+        self.path = path
+        self.max_parts = max_parts
+        self.parts = []
+        self.next_part = 0
+        self._frames = []
+        self._indexes = []
+        self._sites = None
+        manifest = os.path.join(path, "manifest.json")
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                state = json.load(f)
+            self.parts, self.next_part = state["parts"], state["next_part"]
+            for part in self.parts:
+                frame, index = self._read_part(part)
+                self._frames.append(frame)
+                self._indexes.append(index)
+
+    def __len__(self):
+        return sum(len(frame) for frame in self._frames)
+
+    @property
+    def sites(self):
+        """All sites in part order; row i is what the index reports as site i."""
+        if self._sites is None:
+            frames = self._frames or [pd.DataFrame(columns=SITE_COLUMNS)]
+            self._sites = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        return self._sites
+
+    @property
+    def index(self):
+        if not self._indexes:
+            raise ValueError("The snapshot has no sites yet")
+        return self._indexes[0] if len(self._indexes) == 1 else PartitionedSiteIndex(self._indexes)
+
+    def _read_part(self, part):
+        parquet_path = os.path.join(self.path, part + ".parquet")
+        if pq is not None:
+            frame = pq.read_table(parquet_path, memory_map=True).to_pandas()
+        else:
+            frame = pd.read_parquet(parquet_path)
+        with open(os.path.join(self.path, part + ".index.pkl"), "rb") as f:
+            return frame, pickle.load(f)
+
+    def _write_part(self, frame):
+        part = f"sites-{self.next_part:05d}"
+        self.next_part += 1
+        frame.to_parquet(os.path.join(self.path, part + ".parquet"), index=False)
+        index = SiteIndex.from_frame(frame)
+        with open(os.path.join(self.path, part + ".index.pkl"), "wb") as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return part, index
+
+    def _save_manifest(self):
+        tmp = os.path.join(self.path, "manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"parts": self.parts, "next_part": self.next_part}, f)
+        os.replace(tmp, os.path.join(self.path, "manifest.json"))
+
+    def add(self, sites):
+        """Adds normalized sites whose Site ID is new; returns how many were added."""
+        os.makedirs(self.path, exist_ok=True)
+        sites = sites[SITE_COLUMNS]
+        if len(self):
+            sites = sites[~sites['Site ID'].isin(self.sites['Site ID'])]
+        if sites.empty:
+            return 0
+        added = len(sites)
+
+        old_parts = []
+        if len(self.parts) >= self.max_parts:
+            # Compact: one part and one index build for everything
+            old_parts = self.parts
+            sites = pd.concat(self._frames + [sites], ignore_index=True)
+            self.parts, self._frames, self._indexes = [], [], []
+        sites = sites.reset_index(drop=True)
+        part, index = self._write_part(sites)
+        self.parts.append(part)
+        self._frames.append(sites)
+        self._indexes.append(index)
+        self._sites = None
+        self._save_manifest()
+        for old in old_parts:
+            for suffix in (".parquet", ".index.pkl"):
+                os.remove(os.path.join(self.path, old + suffix))
+        return added
+
+
+@instrumented("io.load_sites")
+def load_sites(path, snapshot_dir=SNAPSHOT_DIR):
+    """Adds an export file to the snapshot; returns (snapshot, added, rejected)."""
+    sites, rejected = normalize_sites(read_site_export(path))
+    snapshot = SiteSnapshot(snapshot_dir)
+    added = snapshot.add(sites)
+    return snapshot, added, rejected
+
+
+def radius_rings(latitudes, longitudes, radius_km, segments=32):
+    """Ring polygons around every point at once: (n, segments + 1, 2) [lon, lat] degrees, closed."""
+    lat1 = np.radians(np.asarray(latitudes, dtype=np.float64))[:, None]
+    lon1 = np.radians(np.asarray(longitudes, dtype=np.float64))[:, None]
+    bearing = np.linspace(0, 2 * np.pi, segments + 1)[None, :]
+    d = radius_km / EARTH_RADIUS_KM
+    lat2 = np.arcsin(np.sin(lat1) * np.cos(d) + np.cos(lat1) * np.sin(d) * np.cos(bearing))
+    lon2 = lon1 + np.arctan2(np.sin(bearing) * np.sin(d) * np.cos(lat1), np.cos(d) - np.sin(lat1) * np.sin(lat2))
+    rings = np.stack([np.degrees(lon2), np.degrees(lat2)], axis=-1).round(5)  # ~1 m is plenty for a map
+    rings[:, -1] = rings[:, 0]
+    return rings
+
+
+def _site_colors(frame):
+    return np.where(frame['Superfund Status'].str.lower().to_numpy() == 'yes', 'red', 'green')
+
+
+def site_point_features(frame):
+    """GeoJSON point features for the sites, with the popup text and color as properties."""
+    lon = frame['Longitude'].to_numpy().round(6).tolist()
+    lat = frame['Latitude'].to_numpy().round(6).tolist()
+    popups = (frame['Site Name'].astype(str) + " (" + frame['County'].astype(str) + ")").tolist()
+    return {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [x, y]},
+         "properties": {"popup": p, "color": c}}
+        for x, y, p, c in zip(lon, lat, popups, _site_colors(frame).tolist())]}
+
+
+def site_ring_features(frame, radius_km=SITE_RADIUS_KM, segments=32):
+    """GeoJSON polygon features for the radius rings, built from one vectorized geometry step."""
+    rings = radius_rings(frame['Latitude'].to_numpy(), frame['Longitude'].to_numpy(), radius_km, segments).tolist()
+    popups = (f"{radius_km:g} km radius around " + frame['Site Name'].astype(str)).tolist()
+    return [{"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [ring]},
+             "properties": {"popup": p, "color": c}}
+            for ring, p, c in zip(rings, popups, _site_colors(frame).tolist())]
+
+
+def _tile_keys(latitudes, longitudes, zoom):
+    """Web Mercator "x_y" tile keys at `zoom` for each point."""
+    n = 2 ** zoom
+    lat = np.radians(np.clip(np.asarray(latitudes, dtype=np.float64), -85.0511, 85.0511))
+    x = np.floor((np.asarray(longitudes, dtype=np.float64) + 180) / 360 * n).clip(0, n - 1).astype(int)
+    y = np.floor((1 - np.arcsinh(np.tan(lat)) / np.pi) / 2 * n).clip(0, n - 1).astype(int)
+    return np.char.add(np.char.add(x.astype(str), "_"), y.astype(str))
+
+
+def write_ring_tiles(frame, tile_dir, radius_km=SITE_RADIUS_KM, tile_zoom=8, segments=32):
+    """Writes one GeoJSON file of rings per map tile at `tile_zoom`; returns the tile keys written."""
+    os.makedirs(tile_dir, exist_ok=True)
+    features = site_ring_features(frame, radius_km, segments)
+    keys = _tile_keys(frame['Latitude'].to_numpy(), frame['Longitude'].to_numpy(), tile_zoom)
+    order = np.argsort(keys, kind="stable")
+    tiles, starts = np.unique(keys[order], return_index=True)
+    for key, chunk in zip(tiles, np.split(order, starts[1:])):
+        with open(os.path.join(tile_dir, f"{key}.geojson"), "w") as f:
+            # dumps, not dump: dump streams through the pure-Python encoder
+            f.write(json.dumps({"type": "FeatureCollection", "features": [features[i] for i in chunk]},
+                               separators=(",", ":")))
+    return tiles.tolist()
+
+
+# Leaflet callback shared by markers and rings: color from the feature, popup as plain text
+_STYLE_FEATURE = """function(feature, layer) {
+    var color = feature.properties.color;
+    if (layer.setStyle) {
+        layer.setStyle({color: color, fillColor: color, fillOpacity: 0.2, weight: 2});
+    } else if (color !== 'red') {
+        layer.setIcon(L.AwesomeMarkers.icon({markerColor: color, icon: 'info-sign', prefix: 'glyphicon'}));
+    }
+    var text = document.createElement('div');
+    text.textContent = feature.properties.popup;
+    layer.bindPopup(text);
+}"""
+
+
+class _RingLayer(MacroElement):
+    """Radius rings as one Leaflet GeoJSON layer, shown from `min_zoom` on.
+
+    With `tile_url` the rings are not embedded: the tiles covering the view are fetched
+    as the map moves, so the page only ever holds the rings near what is on screen.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var layer = L.geoJSON(null, {onEachFeature: {{ this.on_each_feature }}});
+            var minZoom = {{ this.min_zoom }};
+            {%- if this.tile_url %}
+            var available = new Set({{ this.tiles | tojson }}), loaded = {}, n = Math.pow(2, {{ this.tile_zoom }});
+            function loadTiles() {
+                var b = map.getBounds();
+                var tx = function(lon) { return Math.max(0, Math.min(n - 1, Math.floor((lon + 180) / 360 * n))); };
+                var ty = function(lat) {
+                    var r = Math.max(-85.0511, Math.min(85.0511, lat)) * Math.PI / 180;
+                    return Math.max(0, Math.min(n - 1, Math.floor((1 - Math.asinh(Math.tan(r)) / Math.PI) / 2 * n)));
+                };
+                for (var x = tx(b.getWest()); x <= tx(b.getEast()); x++) {
+                    for (var y = ty(b.getNorth()); y <= ty(b.getSouth()); y++) {
+                        var key = x + '_' + y;
+                        if (loaded[key] || !available.has(key)) continue;
+                        loaded[key] = true;
+                        fetch({{ this.tile_url | tojson }} + '/' + key + '.geojson')
+                            .then(function(r) { return r.json(); })
+                            .then(function(data) { layer.addData(data); });
+                    }
+                }
+            }
+            {%- else %}
+            layer.addData({{ this.data | tojson }});
+            function loadTiles() {}
+            {%- endif %}
+            function refresh() {
+                if (map.getZoom() < minZoom) { map.removeLayer(layer); return; }
+                map.addLayer(layer);
+                loadTiles();
+            }
+            map.on('moveend', refresh);
+            refresh();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, data=None, min_zoom=0, tile_url=None, tiles=(), tile_zoom=8):
+        super().__init__()
+        self._name = "RingLayer"
+        self.data = data
+        self.min_zoom = min_zoom
+        self.tile_url = tile_url
+        self.tiles = list(tiles)
+        self.tile_zoom = tile_zoom
+        self.on_each_feature = JsCode(_STYLE_FEATURE)
+
+
+@instrumented("plot.site_map")
+def build_site_map(frame, radius_km=SITE_RADIUS_KM, mode=None, location=(42.9, -75), zoom_start=7,
+                   ring_min_zoom=None, tile_dir=None, tile_url=None, tile_zoom=8):
+    """Draws sites and their radius rings on a folium map.
+
+    mode="markers" adds a Marker and a Circle per row, the original look for a handful of
+    sites. mode="cluster" emits all sites as one GeoJSON layer inside a client-side marker
+    cluster and all rings as one layer built in a single vectorized step; the rings appear
+    from `ring_min_zoom` (default 10) on, when they are big enough to see. With `tile_dir`
+    the rings are written there as per-tile GeoJSON files (fetched from `tile_url`,
+    default the directory name, so the map must be served over HTTP) instead of being
+    embedded in the page. The default mode picks "cluster" above CLUSTER_THRESHOLD rows.
+    """
+    if mode is None:
+        mode = "cluster" if len(frame) > CLUSTER_THRESHOLD else "markers"
+    m = folium.Map(location=list(location), zoom_start=zoom_start)
+
+    if mode == "markers":
+        # Add site markers and radius circles
+        for _, row in frame.iterrows():
+            location = [row['Latitude'], row['Longitude']]
+            is_superfund = row['Superfund Status'].lower() == 'yes'
+            color = 'red' if is_superfund else 'green'
+
+            # Add marker
+            Marker(
+                location=location,
+                popup=f"{row['Site Name']} ({row['County']})",
+                icon=folium.Icon(color=color)
+            ).add_to(m)
+
+            # Add radius circle for all entries
+            Circle(
+                location=location,
+                radius=radius_km * 1000,  # 1 km radius around Superfund site
+                color=color,
+                fill=True,
+                fill_color=color,
+                fill_opacity=0.2,
+                popup=f"{radius_km:g} km radius around {row['Site Name']}"
+            ).add_to(m)
+        return m
+    if mode != "cluster":
+        raise ValueError(f"Unknown map mode: {mode!r}")
+
+    cluster = MarkerCluster(name="Sites", options={"chunkedLoading": True}).add_to(m)
+    folium.GeoJson(
+        site_point_features(frame),
+        marker=Marker(icon=folium.Icon(color='red')),
+        on_each_feature=JsCode(_STYLE_FEATURE),
+    ).add_to(cluster)
+
+    ring_min_zoom = 10 if ring_min_zoom is None else ring_min_zoom
+    if tile_dir is not None:
+        tiles = write_ring_tiles(frame, tile_dir, radius_km, tile_zoom)
+        rings = _RingLayer(min_zoom=ring_min_zoom, tile_url=tile_url or os.path.basename(os.path.normpath(tile_dir)),
+                           tiles=tiles, tile_zoom=tile_zoom)
+    else:
+        rings = _RingLayer({"type": "FeatureCollection", "features": site_ring_features(frame, radius_km)},
+                           min_zoom=ring_min_zoom)
+    rings.add_to(m)
+    return m
+
+
+def benchmark_map_rendering(sizes=(8, 1_300, 20_000), markers_limit=5_000, seed=0, tile_dir=None):
+    """Prints build + render time and HTML size per map mode for random NY sites.
+
+    Ring tiles are written under `tile_dir`, or to a temporary directory removed afterwards.
+    """
+    rng = np.random.default_rng(seed)
+    print(f"{'sites':>8} {'mode':>14} {'build (s)':>10} {'html (KB)':>10}")
+    with tempfile.TemporaryDirectory(prefix="map_tiles_") as scratch:
+        for n in sizes:
+            frame = pd.DataFrame({
+                'Latitude': rng.uniform(40.5, 45.0, n), 'Longitude': rng.uniform(-79.8, -71.8, n),
+                'Superfund Status': np.where(rng.random(n) < 0.5, 'Yes', 'No'),
+                'Site Name': [f"Site {i}" for i in range(n)], 'County': 'Somewhere',
+            })
+            tiles = os.path.join(tile_dir or scratch, str(n))
+            runs = [("markers", {}), ("cluster", {}), ("cluster+tiles", {"tile_dir": tiles})]
+            for label, kwargs in runs:
+                if label == "markers" and n > markers_limit:
+                    continue
+                start = time.perf_counter()
+                html = build_site_map(frame, mode=label.split("+")[0], **kwargs).get_root().render()
+                elapsed = time.perf_counter() - start
+                print(f"{n:>8} {label:>14} {elapsed:>10.2f} {len(html.encode()) / 1024:>10.0f}")
+
+if __name__ == "__main__":
+    # Proximity vs brute force on a million random addresses, then map build size/time
+    if "--benchmark" in sys.argv:
+        benchmark_proximity()
+        benchmark_map_rendering()
+        sys.exit()
+
+    # A bulk EPA export replaces the sample sites: --sites export.csv adds it to the snapshot
+    if "--sites" in sys.argv:
+        snapshot, added, rejected = load_sites(sys.argv[sys.argv.index("--sites") + 1])
+        print(f"Added {added} sites to the snapshot ({rejected} rows without usable coordinates skipped).")
+    else:
+        snapshot = SiteSnapshot()
+    if len(snapshot):
+        df = snapshot.sites
+
+    superfund_sites = df[df['Superfund Status'].str.lower() == 'yes'].reset_index(drop=True)
+    if len(superfund_sites) and len(superfund_sites) == len(snapshot):
+        site_index = snapshot.index  # prebuilt, nothing to rebuild
+    else:
+        site_index = SiteIndex.from_frame(superfund_sites)
+
+    # Ask user if they want to add a new site or skip
+    print("If you'd like to add a new site for comparison, enter the details below.")
+    print("Otherwise, press Enter to skip.")
+
+    user_input = input("Enter County,Latitude,Longitude,Superfund Status (Yes/No),Site Name or press Enter to skip: ").strip()
+
+    if user_input:
+        try:
+            county, lat, lon, status, site_name = [x.strip() for x in user_input.split(',')]
+            new_site = {
+                'Latitude': float(lat),
+                'Longitude': float(lon),
+                'Superfund Status': status,
+                'Site Name': site_name,
+                'County': county
+            }
+            df = pd.concat([df, pd.DataFrame([new_site])], ignore_index=True)
+            print(f"Successfully added: {site_name} in {county}.")
+
+            # How close is the new point to the known Superfund sites?
+            distances, indices = site_index.nearest(float(lat), float(lon), k=1)
+            if indices.size:
+                nearest_site = superfund_sites.iloc[indices[0, 0]]
+                print(f"Nearest Superfund site: {nearest_site['Site Name']} ({distances[0, 0]:.1f} km away)")
+            else:
+                print("No Superfund sites to compare against.")
+            if site_index.is_near(float(lat), float(lon), SITE_RADIUS_KM)[0]:
+                print(f"Within {SITE_RADIUS_KM:g} km of a Superfund site.")
+        except Exception as e:
+            print("Invalid input format. Skipping new site addition.")
+            print("Error:", e)
+
+    # Create map centered on NY State; large site lists are clustered
+    m = build_site_map(df)
+
+    # Save map (in a notebook, display `m` instead)
+    m.save("superfund_map.html")
+    print("Map saved to superfund_map.html")
+
+    # Example Input:
+    # Queens,40.7650, -73.9304,No,Queens Example
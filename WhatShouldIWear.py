@@ -2,10 +2,28 @@
 Say goodbye to over or under dressing! This uses location and weather info to infer what the user should wear.
 '''
 import requests
+import asyncio
 import datetime
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 import pytz
+import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from Instrumentation import add_bytes, instrumented, span
 
 # Constants
 LOCATION = "New York City"
@@ -14,15 +32,27 @@ TIMEZONE = "America/New_York"
 EASTERN = pytz.timezone(TIMEZONE)
 HOW_MANY_HRS = 24
 
-
-# Set global font settings
-matplotlib.rcParams['font.family'] = 'DejaVu Sans'  # or 'Arial', 'Helvetica', etc.
-matplotlib.rcParams['font.size'] = 10
-matplotlib.rcParams['axes.titlesize'] = 11
-matplotlib.rcParams['axes.labelsize'] = 9
-matplotlib.rcParams['xtick.labelsize'] = 9
-matplotlib.rcParams['ytick.labelsize'] = 9
-matplotlib.rcParams['legend.fontsize'] = 9
+# Forecast API and caching
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+FORECAST_TTL_SECONDS = 30 * 60  # Open-Meteo refreshes its models roughly hourly
+FORECAST_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "whatshouldiwear")
+# Everything the suggestion and both charts need, so one request serves all of them
+FORECAST_HOURLY_VARS = ["temperature_2m", "precipitation_probability", "wind_speed_10m"]
+FORECAST_DAILY_VARS = ["sunrise", "sunset", "temperature_2m_min", "temperature_2m_max",
+                       "precipitation_probability_max", "wind_speed_10m_max"]
+
+
+# Set global font settings (also applied explicitly by the headless ChartRenderer)
+CHART_RC = {
+    'font.family': 'DejaVu Sans',  # or 'Arial', 'Helvetica', etc.
+    'font.size': 10,
+    'axes.titlesize': 11,
+    'axes.labelsize': 9,
+    'xtick.labelsize': 9,
+    'ytick.labelsize': 9,
+    'legend.fontsize': 9,
+}
+matplotlib.rcParams.update(CHART_RC)
 CHART_SIZE = (14, 4) 
 
 # Utility Functions (same as before)
@@ -59,22 +89,174 @@ def convert_utc_to_eastern(utc_time_str):
     eastern_time = utc_time.astimezone(EASTERN)  # Convert to Eastern Time
     return eastern_time.strftime("%I:%M %p")  # Return formatted time
 
-# Fetch weather data (same as before)
+# Forecast client: one pooled connection, one merged request, cached in memory and on disk
+class ForecastClient:
+    def __init__(self, base_url=FORECAST_URL, ttl=FORECAST_TTL_SECONDS, cache_dir=FORECAST_CACHE_DIR,
+                 hourly_vars=FORECAST_HOURLY_VARS, daily_vars=FORECAST_DAILY_VARS, session=None):
+        self.base_url = base_url
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        # Variables always requested, so different callers share one cached response
+        self.hourly_vars = list(hourly_vars)
+        self.daily_vars = list(daily_vars)
+        self.session = session or requests.Session()
+        self.memory_cache = {}
+        self.frame_cache = {}
+        self.network_calls = 0
+        self._last_eviction = time.time()
+
+    @staticmethod
+    def _merge(defaults, extra):
+        return sorted(set(defaults) | set(extra or []))
+
+    def _cache_key(self, latitude, longitude, timezone, daily_vars, hourly_vars, forecast_days=None):
+        return json.dumps([round(latitude, 4), round(longitude, 4), timezone, daily_vars, hourly_vars, forecast_days])
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry["fetched_at"] >= self.ttl:
+            self._remove(self._cache_path(key))
+            return None
+        return entry
+
+    def _write_disk(self, key, entry):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._cache_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)  # readers never see a half-written file
+        # Entries for places nobody asks about again are only ever dropped by a sweep
+        if time.time() - self._last_eviction >= self.ttl:
+            self.evict_expired()
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:  # another worker got there first
+            pass
+
+    def evict_expired(self):
+        """Drops cache entries older than the TTL from memory and disk; runs once per TTL on cache writes."""
+        now = self._last_eviction = time.time()
+        self.memory_cache = {k: v for k, v in self.memory_cache.items() if now - v["fetched_at"] < self.ttl}
+        self.frame_cache = {k: v for k, v in self.frame_cache.items() if k in self.memory_cache}
+        if self.cache_dir and os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    expired = name.endswith(".json") and now - os.path.getmtime(path) >= self.ttl
+                except OSError:
+                    continue
+                if expired:
+                    self._remove(path)
+
+    def _fetch_entry(self, latitude, longitude, timezone, daily_vars=None, hourly_vars=None, forecast_days=None):
+        daily_vars = self._merge(self.daily_vars, daily_vars)
+        hourly_vars = self._merge(self.hourly_vars, hourly_vars)
+        key = self._cache_key(latitude, longitude, timezone, daily_vars, hourly_vars, forecast_days)
+
+        entry = self.memory_cache.get(key)
+        if entry is None or time.time() - entry["fetched_at"] >= self.ttl:
+            entry = self._read_disk(key)
+            if entry is None:
+                params = {"latitude": latitude, "longitude": longitude, "timezone": timezone,
+                          "daily": ",".join(daily_vars), "hourly": ",".join(hourly_vars)}
+                if forecast_days:
+                    params["forecast_days"] = forecast_days
+                self.network_calls += 1
+                with span("http.forecast"):
+                    response = self.session.get(self.base_url, params=params, timeout=30)
+                    add_bytes(len(response.content))
+                if response.status_code != 200:
+                    print("Failed to fetch data")
+                    return key, None
+                entry = {"fetched_at": time.time(), "data": response.json()}
+                self._write_disk(key, entry)
+            self.memory_cache[key] = entry
+        return key, entry
+
+    def fetch(self, latitude, longitude, timezone, daily_vars=None, hourly_vars=None):
+        _, entry = self._fetch_entry(latitude, longitude, timezone, daily_vars, hourly_vars)
+        return entry["data"] if entry else None
+
+    def fetch_hourly_frame(self, latitude, longitude, timezone, forecast_days=None):
+        """Returns the hourly forecast as a time-indexed frame, built once per cached response."""
+        key, entry = self._fetch_entry(latitude, longitude, timezone, forecast_days=forecast_days)
+        if entry is None:
+            return None
+        cached = self.frame_cache.get(key)
+        if cached is None or cached[0] != entry["fetched_at"]:
+            cached = (entry["fetched_at"], build_hourly_frame(entry["data"]["hourly"], timezone))
+            self.frame_cache[key] = cached
+        return cached[1]
+
+
+FORECAST_CLIENT = ForecastClient()
+
+# Fetch weather data (same as before, now served by the shared cached client)
+@instrumented("forecast.fetch_weather_data")
 def fetch_weather_data(latitude, longitude, timezone, daily_vars=None, hourly_vars=None):
-    url = f"https://api.open-meteo.com/v1/forecast?latitude={latitude}&longitude={longitude}&timezone={timezone}"
-
-    if daily_vars:
-        url += "&daily=" + ",".join(daily_vars)
-    if hourly_vars:
-        url += "&hourly=" + ",".join(hourly_vars)
-
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
+    return FORECAST_CLIENT.fetch(latitude, longitude, timezone, daily_vars=daily_vars, hourly_vars=hourly_vars)
+
+def fetch_hourly_frame(latitude, longitude, timezone):
+    return FORECAST_CLIENT.fetch_hourly_frame(latitude, longitude, timezone)
+
+# Hourly forecast as a sorted, time-indexed frame: parsed and converted once, then every
+# lookup is a binary search on the index instead of a strptime/strftime loop
+@instrumented("parse.hourly_frame", rows=len)
+def build_hourly_frame(hourly, timezone=TIMEZONE):
+    times = pd.to_datetime(pd.Series(hourly["time"]), format="%Y-%m-%dT%H:%M")
+    # Same DST handling as pytz's localize(): ambiguous hours are standard time
+    index = pd.DatetimeIndex(times).tz_localize(timezone, ambiguous=np.zeros(len(times), dtype=bool),
+                                                nonexistent="shift_forward")
+    # The converters are plain arithmetic + round(), so they work on whole Series too
+    frame = pd.DataFrame({
+        "temperature": convert_to_fahrenheit(pd.Series(hourly["temperature_2m"], dtype=float)).to_numpy(),
+        "precipitation": pd.Series(hourly["precipitation_probability"]).to_numpy(),
+        "wind_speed": convert_to_mph(pd.Series(hourly["wind_speed_10m"], dtype=float)).to_numpy(),
+    }, index=index)
+    return frame.sort_index()
+
+def forecast_at(frame, when):
+    """Returns {column: value} for the exact hour `when` (tz-aware), or None."""
+    # As a Timestamp: comparing the index with a pytz datetime fails on the repeated fall-back hour
+    when = pd.Timestamp(when)
+    pos = frame.index.searchsorted(when)
+    if pos < len(frame) and frame.index[pos] == when:
+        # Column by column, so integer columns are not upcast to float
+        return {col: frame[col].iat[pos] for col in frame.columns}
+    return None
+
+def forecast_next_hours(frame, start, hours):
+    """Returns up to `hours` rows starting at the first hour >= `start`."""
+    pos = frame.index.searchsorted(start)
+    return frame.iloc[pos:pos + hours]
+
+# Outfit logic
+def suggest_outfit(temperature, precipitation):
+    if temperature < 50:
+        return "Heavy jacket and layers."
+    elif temperature < 70:
+        return "Light jacket or sweater."
+    elif precipitation > 50:
+        return "Bring an umbrella."
     else:
-        print("Failed to fetch data")
-        return None
+        return "T-shirt and comfortable clothes."
 
+@instrumented("forecast.outfit_suggestion")
 def get_weather_outfit_suggestion(date=None, time=None):
     # If no date or time is provided, default to current date and time
     now = datetime.datetime.now(EASTERN).replace(minute=0, second=0, microsecond=0)
@@ -120,52 +302,21 @@ def get_weather_outfit_suggestion(date=None, time=None):
     print(f"Sunrise: {sunrise_time}, Sunset: {sunset_time}")
 
 
-    hourly = data["hourly"]
-    times = [datetime.datetime.strptime(t, "%Y-%m-%dT%H:%M") for t in hourly["time"]]
-    temps = [convert_to_fahrenheit(t) for t in hourly["temperature_2m"]]
-    precips = hourly["precipitation_probability"]
-    winds = [convert_to_mph(w) for w in hourly["wind_speed_10m"]]
-
-    filtered_times = []
-    filtered_temps = []
-    filtered_precips = []
-    filtered_winds = []
-    for i, t in enumerate(times):
-        t_local = EASTERN.localize(t)
-        if t_local.strftime("%m/%d/%y %I:%M %p") == f"{date} {time}":
-            filtered_times.append(t_local.strftime("%I %p"))
-            filtered_temps.append(temps[i])
-            filtered_precips.append(precips[i])
-            filtered_winds.append(winds[i])
-
-    if filtered_temps:
-        print(f"Temperature: {filtered_temps[0]}°F, Precipitation: {filtered_precips[0]}%, Wind Speed: {filtered_winds[0]} mph")
-
-        # Outfit logic
-        if filtered_temps[0] < 50:
-            print("Suggested Outfit: Heavy jacket and layers.")
-        elif filtered_temps[0] < 70:
-            print("Suggested Outfit: Light jacket or sweater.")
-        elif filtered_precips[0] > 50:
-            print("Suggested Outfit: Bring an umbrella.")
-        else:
-            print("Suggested Outfit: T-shirt and comfortable clothes.")
+    hourly = fetch_hourly_frame(LATITUDE, LONGITUDE, TIMEZONE)
+    target = EASTERN.localize(datetime.datetime.strptime(f"{date} {time}", "%m/%d/%y %I:%M %p"))
+    row = forecast_at(hourly, target)
+
+    if row is not None:
+        print(f"Temperature: {row['temperature']}°F, Precipitation: {row['precipitation']}%, Wind Speed: {row['wind_speed']} mph")
+
+        print(f"Suggested Outfit: {suggest_outfit(row['temperature'], row['precipitation'])}")
     else:
         print("No weather data found for the specified time.")
 
 
 # 7-Day Forecast Plotting with consistent formatting (UPDATED to use precipitation probability)
-def plot_seven_day_weather_forecast():
-    data = fetch_weather_data(
-        LATITUDE,
-        LONGITUDE,
-        TIMEZONE,
-        daily_vars=["temperature_2m_min", "temperature_2m_max", "precipitation_probability_max", "wind_speed_10m_max"]
-    )
-    if not data:
-        return
-
-    daily = data["daily"]
+@instrumented("plot.seven_day_forecast")
+def draw_seven_day_forecast(fig, daily, location=LOCATION):
     dates = daily["time"]
     tmin = [convert_to_fahrenheit(t) for t in daily["temperature_2m_min"]]
     tmax = [convert_to_fahrenheit(t) for t in daily["temperature_2m_max"]]
@@ -175,7 +326,7 @@ def plot_seven_day_weather_forecast():
     days = [datetime.datetime.strptime(d, "%Y-%m-%d").strftime("%a") for d in dates]
 
     # Setting up the plot
-    fig, ax1 = plt.subplots(figsize=CHART_SIZE)
+    ax1 = fig.add_subplot()
 
     # Plot temperature and wind on primary Y-axis
     ax1.plot(days, tmin, label="Min Temp (°F)", marker="o", color="cornflowerblue")
@@ -199,45 +350,33 @@ def plot_seven_day_weather_forecast():
     ax1.legend(lines + lines2, labels + labels2, loc="lower center", bbox_to_anchor=(0.5, -0.3), ncol=3)
 
     # Title and layout
-    plt.title(f"7-Day Weather Forecast for {LOCATION}")
-    plt.tight_layout()
-    plt.show()
-
+    ax2.set_title(f"7-Day Weather Forecast for {location}")
+    fig.tight_layout()
 
-# 6-Hour Forecast Plotting with consistent formatting
-def plot_weather_forecast_next_6_hours():
+def plot_seven_day_weather_forecast():
     data = fetch_weather_data(
         LATITUDE,
         LONGITUDE,
         TIMEZONE,
-        hourly_vars=["temperature_2m", "precipitation_probability", "wind_speed_10m"]
+        daily_vars=["temperature_2m_min", "temperature_2m_max", "precipitation_probability_max", "wind_speed_10m_max"]
     )
     if not data:
         return
 
-    now = datetime.datetime.now(EASTERN).replace(minute=0, second=0, microsecond=0)
-    hourly = data["hourly"]
-    times = [datetime.datetime.strptime(t, "%Y-%m-%dT%H:%M") for t in hourly["time"]]
-    temps = [convert_to_fahrenheit(t) for t in hourly["temperature_2m"]]
-    precips = hourly["precipitation_probability"]
-    winds = [convert_to_mph(w) for w in hourly["wind_speed_10m"]]
-
-    filtered_times = []
-    filtered_temps = []
-    filtered_precips = []
-    filtered_winds = []
-    count = 0
-    for i, t in enumerate(times):
-        t_local = EASTERN.localize(t)
-        if t_local >= now and count < HOW_MANY_HRS:
-            filtered_times.append(t_local.strftime("%I %p"))
-            filtered_temps.append(temps[i])
-            filtered_precips.append(precips[i])
-            filtered_winds.append(winds[i])
-            count += 1
+    draw_seven_day_forecast(plt.figure(figsize=CHART_SIZE), data["daily"])
+    plt.show()
+
+
+# 6-Hour Forecast Plotting with consistent formatting
+@instrumented("plot.next_hours_forecast")
+def draw_next_hours_forecast(fig, upcoming, location=LOCATION):
+    filtered_times = list(upcoming.index.strftime("%I %p"))
+    filtered_temps = upcoming["temperature"].tolist()
+    filtered_precips = upcoming["precipitation"].tolist()
+    filtered_winds = upcoming["wind_speed"].tolist()
 
     # Plotting the temperature and precipitation data
-    fig, ax1 = plt.subplots(figsize=CHART_SIZE)
+    ax1 = fig.add_subplot()
 
     # Plot temperature on primary Y-axis (left)
     ax1.plot(filtered_times, filtered_temps, label="Temperature (°F)", marker="o", color="salmon")
@@ -262,13 +401,276 @@ def plot_weather_forecast_next_6_hours():
     ax1.legend(lines + lines2, labels + labels2, loc="lower center", bbox_to_anchor=(0.5, -0.3), ncol=3)
 
     # Title in black font
-    plt.title(f"Next 6-Hour Weather Forecast for {LOCATION}", color="black")
+    ax2.set_title(f"Next 6-Hour Weather Forecast for {location}", color="black")
+
+    fig.tight_layout()  # Adjust spacing for better clarity
 
-    plt.tight_layout()  # Adjust spacing for better clarity
+def plot_weather_forecast_next_6_hours():
+    data = fetch_weather_data(
+        LATITUDE,
+        LONGITUDE,
+        TIMEZONE,
+        hourly_vars=["temperature_2m", "precipitation_probability", "wind_speed_10m"]
+    )
+    if not data:
+        return
+
+    now = datetime.datetime.now(EASTERN).replace(minute=0, second=0, microsecond=0)
+    upcoming = forecast_next_hours(fetch_hourly_frame(LATITUDE, LONGITUDE, TIMEZONE), now, HOW_MANY_HRS)
+    draw_next_hours_forecast(plt.figure(figsize=CHART_SIZE), upcoming)
     plt.show()
 
-# Function calls with default parameters if not provided
-get_weather_outfit_suggestion("05/05/25","8:40 PM")  # Using current date and time rounded to the nearest hour
 
-plot_seven_day_weather_forecast()
-plot_weather_forecast_next_6_hours()
+# Headless rendering: Agg canvas through the object-oriented API, no pyplot global state,
+# so nothing blocks, no figures leak, and it runs on servers without a display
+class ChartRenderer:
+    def __init__(self, figsize=CHART_SIZE, dpi=100):
+        # One figure reused for every chart this renderer draws
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.figure)
+
+    def _render(self, draw, args, output=None, fmt="png"):
+        """Draws into the shared figure and saves to `output` (path or file object); returns bytes if output is None."""
+        self.figure.clear()
+        with matplotlib.rc_context(CHART_RC):
+            draw(self.figure, *args)
+            target = io.BytesIO() if output is None else output
+            self.figure.savefig(target, format=fmt)
+        self.figure.clear()
+        return target.getvalue() if output is None else output
+
+    def seven_day_forecast(self, daily, location=LOCATION, output=None, fmt="png"):
+        return self._render(draw_seven_day_forecast, (daily, location), output, fmt)
+
+    def next_hours_forecast(self, upcoming, location=LOCATION, output=None, fmt="png"):
+        return self._render(draw_next_hours_forecast, (upcoming, location), output, fmt)
+
+
+ChartLocation = namedtuple("ChartLocation", ["name", "latitude", "longitude", "timezone"], defaults=[TIMEZONE])
+
+_worker_client = None
+_worker_renderer = None
+
+def _init_chart_worker(base_url, cache_dir):
+    global _worker_client, _worker_renderer
+    _worker_client = ForecastClient(base_url=base_url, cache_dir=cache_dir)
+    _worker_renderer = ChartRenderer()
+
+def _chart_file_stem(name):
+    return re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_").lower() or "location"
+
+def _render_location(location, output_dir, fmt, hours):
+    """Worker: fetches one location's forecast and writes both charts; returns the file paths."""
+    data = _worker_client.fetch(location.latitude, location.longitude, location.timezone)
+    if not data:
+        return location.name, []
+    tz = pytz.timezone(location.timezone)
+    now = datetime.datetime.now(tz).replace(minute=0, second=0, microsecond=0)
+    frame = _worker_client.fetch_hourly_frame(location.latitude, location.longitude, location.timezone)
+
+    stem = os.path.join(output_dir, _chart_file_stem(location.name))
+    paths = [f"{stem}_7day.{fmt}", f"{stem}_next_{hours}h.{fmt}"]
+    _worker_renderer.seven_day_forecast(data["daily"], location.name, paths[0], fmt)
+    _worker_renderer.next_hours_forecast(forecast_next_hours(frame, now, hours), location.name, paths[1], fmt)
+    return location.name, paths
+
+def render_location_charts(locations, output_dir, fmt="png", workers=None, hours=HOW_MANY_HRS,
+                           base_url=FORECAST_URL, cache_dir=FORECAST_CACHE_DIR):
+    """Renders the 7-day and next-hours charts for many locations in a process pool.
+
+    Each worker keeps its own forecast client and a reusable figure. Returns
+    {location name: [chart paths]}; locations whose forecast could not be fetched get [].
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    locations = list(locations)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_chart_worker,
+                             initargs=(base_url, cache_dir)) as pool:
+        results = pool.map(_render_location, locations, [output_dir] * len(locations),
+                           [fmt] * len(locations), [hours] * len(locations),
+                           chunksize=max(1, len(locations) // ((workers or os.cpu_count() or 1) * 4)))
+        return dict(results)
+
+# Batch outfit suggestions for many (location, time) pairs.
+# Requests are grouped by rounded coordinate and forecast window, so each group costs one
+# forecast fetch; fetches run concurrently (bounded) under a client-side rate limit.
+OutfitRequest = namedtuple("OutfitRequest", ["location", "latitude", "longitude", "when", "timezone"],
+                           defaults=[TIMEZONE])
+OutfitSuggestion = namedtuple("OutfitSuggestion", ["request", "forecast_hour", "temperature", "precipitation",
+                                                   "wind_speed", "outfit", "error"])
+MAX_FORECAST_DAYS = 16  # Open-Meteo's forecast horizon
+
+
+class AsyncRateLimiter:
+    """Token bucket: at most `rate` acquisitions per second, with bursts up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _request_hour(request):
+    """The request's time as a tz-aware datetime rounded down to the hour."""
+    tz = pytz.timezone(request.timezone)
+    when = request.when
+    when = tz.localize(when) if when.tzinfo is None else when.astimezone(tz)
+    return when.replace(minute=0, second=0, microsecond=0)
+
+
+def _forecast_days(hours, timezone):
+    today = datetime.datetime.now(pytz.timezone(timezone)).date()
+    days_ahead = max((hour.date() - today).days for hour in hours)
+    return min(max(days_ahead + 1, 1), MAX_FORECAST_DAYS)
+
+
+def _suggestion(request, hour, frame, error=None):
+    row = forecast_at(frame, hour) if frame is not None else None
+    if row is None:
+        return OutfitSuggestion(request, hour, None, None, None, None,
+                                error or "No weather data found for the specified time.")
+    return OutfitSuggestion(request, hour, float(row["temperature"]), float(row["precipitation"]),
+                            float(row["wind_speed"]), suggest_outfit(row["temperature"], row["precipitation"]), None)
+
+
+async def suggest_outfits_async(outfit_requests, client=None, concurrency=16, rate_per_second=10.0,
+                                coordinate_precision=2):
+    """Returns one OutfitSuggestion per OutfitRequest, in input order.
+
+    coordinate_precision=2 rounds to ~1 km, finer than the forecast grid, so nearby stores
+    share a fetch.
+    """
+    outfit_requests = list(outfit_requests)
+    if client is None:
+        client = ForecastClient()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        client.session.mount("https://", adapter)
+        client.session.mount("http://", adapter)
+
+    hours = [_request_hour(r) for r in outfit_requests]
+    groups = defaultdict(list)
+    for i, r in enumerate(outfit_requests):
+        groups[(round(r.latitude, coordinate_precision), round(r.longitude, coordinate_precision), r.timezone)].append(i)
+
+    limiter = AsyncRateLimiter(rate_per_second, burst=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    results = [None] * len(outfit_requests)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        async def run_group(key, indices):
+            latitude, longitude, timezone = key
+            forecast_days = _forecast_days([hours[i] for i in indices], timezone)
+            frame, error = None, None
+            async with semaphore:
+                await limiter.acquire()
+                try:
+                    frame = await loop.run_in_executor(
+                        executor, client.fetch_hourly_frame, latitude, longitude, timezone, forecast_days)
+                    if frame is None:
+                        error = "Failed to fetch data"
+                except requests.RequestException as e:
+                    error = f"Failed to fetch data: {e}"
+            for i in indices:
+                results[i] = _suggestion(outfit_requests[i], hours[i], frame, error)
+
+        await asyncio.gather(*(run_group(key, indices) for key, indices in groups.items()))
+    return results
+
+
+def suggest_outfits(outfit_requests, **kwargs):
+    """Blocking wrapper around suggest_outfits_async."""
+    return asyncio.run(suggest_outfits_async(outfit_requests, **kwargs))
+
+
+# Local stand-in for the Open-Meteo forecast endpoint, for tests and benchmarks
+def _mock_forecast_payload(query):
+    days = int(query.get("forecast_days", ["7"])[0])
+    tz = pytz.timezone(query.get("timezone", [TIMEZONE])[0])
+    start = datetime.datetime.now(tz).replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    hours = [start + datetime.timedelta(hours=h) for h in range(24 * days)]
+    dates = [(start + datetime.timedelta(days=d)).date().isoformat() for d in range(days)]
+    seed = float(query.get("latitude", ["0"])[0]) + float(query.get("longitude", ["0"])[0])
+    return {
+        "hourly": {
+            "time": [h.strftime("%Y-%m-%dT%H:%M") for h in hours],
+            "temperature_2m": [round(12 + 10 * np.sin((h + seed) / 24 * 2 * np.pi), 1) for h in range(len(hours))],
+            "precipitation_probability": [int((h * 7 + seed) % 100) for h in range(len(hours))],
+            "wind_speed_10m": [round(8 + (h + seed) % 15, 1) for h in range(len(hours))],
+        },
+        "daily": {
+            "time": dates,
+            "sunrise": [f"{d}T06:30" for d in dates],
+            "sunset": [f"{d}T19:15" for d in dates],
+            "temperature_2m_min": [8.0] * days,
+            "temperature_2m_max": [21.0] * days,
+            "precipitation_probability_max": [40] * days,
+            "wind_speed_10m_max": [18.0] * days,
+        },
+    }
+
+
+def start_mock_forecast_server(latency=0.0):
+    """Starts a threaded local forecast server; returns (server, forecast_url). Call server.shutdown() when done."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            self.server.request_count += 1
+            body = json.dumps(_mock_forecast_payload(parse_qs(urlparse(self.path).query))).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.request_count = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/v1/forecast"
+
+
+def benchmark_outfit_service(num_requests=10_000, num_locations=2_000, latency=0.05, concurrency=32,
+                             rate_per_second=500.0):
+    """Measures suggestions per second against the mock server with simulated network latency."""
+    server, url = start_mock_forecast_server(latency=latency)
+    try:
+        rng = np.random.default_rng(0)
+        lats = rng.uniform(25, 48, num_locations)
+        lons = rng.uniform(-123, -70, num_locations)
+        now = datetime.datetime.now(EASTERN).replace(tzinfo=None)
+        batch = [OutfitRequest(f"Store {i % num_locations}", lats[i % num_locations], lons[i % num_locations],
+                               now + datetime.timedelta(hours=int(rng.integers(0, 96))))
+                 for i in range(num_requests)]
+        client = ForecastClient(base_url=url, cache_dir=None)
+        start = time.perf_counter()
+        results = suggest_outfits(batch, client=client, concurrency=concurrency, rate_per_second=rate_per_second)
+        elapsed = time.perf_counter() - start
+        failed = sum(r.error is not None for r in results)
+        print(f"{num_requests:,} requests / {num_locations:,} locations: {elapsed:.2f}s, "
+              f"{num_requests / elapsed:,.0f} suggestions/s, {server.request_count} fetches, {failed} without data")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    # Function calls with default parameters if not provided
+    get_weather_outfit_suggestion("05/05/25","8:40 PM")  # Using current date and time rounded to the nearest hour
+
+    plot_seven_day_weather_forecast()
+    plot_weather_forecast_next_6_hours()
@@ -0,0 +1,49 @@
+import pytest
+
+import Benchmark_Suite
+from Benchmark_Suite import compare_runs, load_run, main, run_case, run_suite, save_run
+
+
+def _run(*results):
+    return {"created": "2024-01-01T00:00:00+00:00", "commit": None, "environment": {}, "results": list(results)}
+
+
+def _record(workload, best_s, rss=100.0, size=1_000):
+    return {"workload": workload, "size": size, "best_s": best_s, "peak_rss_mb": rss}
+
+
+def test_compare_runs_flags_time_and_memory_regressions():
+    baseline = _run(_record("slower", 1.0), _record("fatter", 1.0), _record("faster", 1.0),
+                    _record("steady", 1.0), _record("dropped", 1.0),
+                    {"workload": "skipped", "size": 1_000, "skipped": "ImportError: folium"})
+    current = _run(_record("slower", 1.2), _record("fatter", 1.0, rss=130.0), _record("faster", 0.5),
+                   _record("steady", 1.05, rss=115.0), _record("skipped", 1.0), _record("added", 1.0))
+    status = {row["workload"]: row["status"] for row in compare_runs(baseline, current)}
+    assert status == {"slower": "regression", "fatter": "regression", "faster": "faster", "steady": "ok",
+                      "dropped": "missing", "skipped": "skipped", "added": "new"}
+
+
+def test_run_case_save_and_compare_round_trip(tmp_path, capsys):
+    record = run_case("sql_extract", 10_000, repeats=1)
+    assert record["items"] >= 10_000 and record["best_s"] > 0 and record["throughput"] > 0
+
+    path = save_run(_run(record), str(tmp_path / "base.json"))
+    assert load_run(path)["results"] == [record]
+    slower = dict(record, best_s=record["best_s"] * 2)
+    save_run(_run(slower), str(tmp_path / "current.json"))
+
+    assert main(["compare", path, path]) == 0
+    assert main(["compare", path, str(tmp_path / "current.json")]) == 1
+    assert "regression" in capsys.readouterr().out
+
+
+def test_run_writes_results_and_rejects_unknown_workloads(tmp_path, monkeypatch):
+    monkeypatch.setitem(Benchmark_Suite.WORKLOADS, "sql_extract",
+                        Benchmark_Suite.WORKLOADS["sql_extract"]._replace(sizes={"small": (1_000,)}))
+    output = tmp_path / "run.json"
+    assert main(["run", "--only", "sql_extract", "--repeats", "1", "--no-isolate", "--output", str(output)]) == 0
+    [record] = load_run(str(output))["results"]
+    assert (record["workload"], record["size"], record["repeats"]) == ("sql_extract", 1_000, 1)
+
+    with pytest.raises(ValueError, match="nope"):
+        run_suite(["nope"], isolate=False)
@@ -0,0 +1,80 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from EventsAtForestHillsStadium import (enrich_performers, events_frame, ingest_venues, parse_start_time,
+                                        start_mock_wiki_server, upsert_events)
+
+NAMES = ["Phoebe Bridgers", "The National"]
+
+
+@pytest.fixture
+def wiki():
+    server, url = start_mock_wiki_server()
+    yield server, url
+    server.shutdown()
+
+
+def _rows(path):
+    with sqlite3.connect(path) as conn:
+        return {row[0]: row[1:] for row in conn.execute("SELECT name, summary, fetched_at FROM summaries")}
+
+
+def test_summaries_are_cached_revalidated_and_kept_when_the_refetch_fails(wiki, tmp_path):
+    server, url = wiki
+    cache = tmp_path / "wiki.sqlite"
+    first = enrich_performers(NAMES, base_url=url, cache_path=cache)
+    assert first == {n: f"{n} is a performer." for n in NAMES}
+    assert [conditional for _, conditional in server.requests] == [None, None]
+
+    # Fresh entries are served from the cache
+    assert enrich_performers(NAMES, base_url=url, cache_path=cache) == first
+    assert len(server.requests) == 2
+
+    # Expired entries are revalidated with their ETag and answered 304
+    fetched = _rows(cache)
+    assert enrich_performers(NAMES, base_url=url, cache_path=cache, ttl=0) == first
+    assert all(conditional for _, conditional in server.requests[2:])
+    assert all(_rows(cache)[n][1] > fetched[n][1] for n in NAMES)
+
+    # A 503 keeps the stale summary and leaves the cache row alone
+    revalidated = _rows(cache)
+    assert enrich_performers(NAMES, base_url=url, cache_path=cache, ttl=0) == first
+    assert len(server.requests) == 6
+    assert _rows(cache) == revalidated
+
+
+def test_server_errors_are_not_cached(tmp_path):
+    server, url = start_mock_wiki_server(statuses=(503, 200))
+    try:
+        cache = tmp_path / "wiki.sqlite"
+        assert enrich_performers(NAMES[:1], base_url=url, cache_path=cache) == {NAMES[0]: "Not found"}
+        assert _rows(cache) == {}
+        assert enrich_performers(NAMES[:1], base_url=url, cache_path=cache) == {NAMES[0]: f"{NAMES[0]} is a performer."}
+    finally:
+        server.shutdown()
+
+
+def test_start_time_with_a_mismatched_weekday_keeps_the_date(caplog):
+    assert parse_start_time("Sat, May 10, 2025, 07:00 PM") == datetime(2025, 5, 10, 19, 0)
+    assert parse_start_time("Fri, May 10, 2025, 07:30 PM") == datetime(2025, 5, 10, 19, 30)
+    assert "does not match" in caplog.text
+    assert parse_start_time("Xyz, May 10, 2025, 07:00 PM") is None
+
+
+def test_reparsed_calendar_replaces_the_venues_stored_events(tmp_path):
+    store = str(tmp_path / "events.parquet")
+    upsert_events(events_frame("Stadium", ["A", "B"], ["Sat, May 10, 2025, 07:00 PM", "Sun, May 11, 2025, 07:00 PM"]), store)
+    upsert_events(events_frame("Club", ["C"], ["Sat, May 10, 2025, 09:00 PM"]), store)
+
+    # B was dropped from the calendar and A moved to a later date
+    events, new = upsert_events(events_frame("Stadium", ["A"], ["Sat, May 17, 2025, 07:00 PM"]), store,
+                                replace_venues=["Stadium"])
+    assert sorted(zip(events["Event Name"], events["Event Date"])) == [("A", "2025-05-17"), ("C", "2025-05-10")]
+    assert new["Event Date"].tolist() == ["2025-05-17"]
+
+
+def test_ingest_with_no_calendars_and_no_store_is_empty(tmp_path):
+    events, new = ingest_venues({}, store_path=str(tmp_path / "events.parquet"), pdf_dir=str(tmp_path / "pdfs"))
+    assert events.empty and new.empty
@@ -0,0 +1,76 @@
+import json
+import threading
+import time
+
+import pytest
+
+import Instrumentation
+from Instrumentation import SamplingProfiler, add_bytes, instrumented, span
+
+
+@pytest.fixture
+def recorder():
+    recorder = Instrumentation.enable(trace=True)
+    yield recorder
+    Instrumentation.disable()
+
+
+@instrumented("transform.rows", rows=len)
+def _make_rows(n):
+    return list(range(n))
+
+
+def test_spans_record_calls_bytes_rows_and_errors(recorder):
+    _make_rows(3)
+    _make_rows(4)
+    with span("http.outer"):
+        with span("http.inner"):
+            add_bytes(100)  # goes to the innermost span only
+    with pytest.raises(ValueError):
+        with span("parse.bad"):
+            raise ValueError
+
+    stats = Instrumentation.stats()
+    assert (stats["transform.rows"]["calls"], stats["transform.rows"]["rows"]) == (2, 7)
+    assert (stats["http.inner"]["bytes"], stats["http.outer"]["bytes"]) == (100, 0)
+    assert stats["parse.bad"]["errors"] == 1
+    assert stats["http.outer"]["seconds"] >= stats["http.inner"]["seconds"]
+
+
+def test_disabled_spans_record_nothing():
+    Instrumentation.disable()
+    assert span("http.anything") is Instrumentation.NULL_SPAN
+    before = Instrumentation.stats()
+    _make_rows(5)
+    assert Instrumentation.stats() == before
+
+
+def test_exports(recorder, tmp_path):
+    with span('io.write "quoted"'):
+        add_bytes(10)
+    text = Instrumentation.prometheus_text(labels={"script": "demo"})
+    assert 'analytics_span_bytes_total{span="io.write \\"quoted\\"",script="demo"} 10' in text
+    assert "# TYPE analytics_span_calls_total counter" in text
+
+    trace = json.loads(open(Instrumentation.write_chrome_trace(str(tmp_path / "trace.json"))).read())
+    [event] = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert (event["name"], event["cat"], event["args"]) == ('io.write "quoted"', "io", {"bytes": 10})
+
+
+def test_sampling_profiler_sees_busy_threads():
+    stop = threading.Event()
+
+    def busy_loop():
+        while not stop.is_set():
+            sum(range(1_000))
+
+    worker = threading.Thread(target=busy_loop)
+    worker.start()
+    try:
+        with SamplingProfiler(interval=0.001) as profiler:
+            time.sleep(0.1)
+    finally:
+        stop.set()
+        worker.join()
+    assert profiler.samples > 0
+    assert "busy_loop (test_instrumentation.py" in profiler.folded()
@@ -0,0 +1,50 @@
+import pytest
+import requests
+
+from OpenWeatherMap_Collector import collect_weather, fetch_with_retry, start_mock_weather_server, synthetic_places
+
+FAST = dict(api_key="test", rate_per_second=1_000.0, burst=10, workers=4, backoff=0.01, by_coordinates=False)
+
+
+@pytest.fixture
+def places():
+    places = synthetic_places(6)
+    places.loc[4, "City_name"] = places.loc[3, "City_name"]  # same query twice
+    places.loc[5, "City_name"] = "Nowhere"
+    return places
+
+
+def test_collect_retries_throttling_and_serves_repeats_from_cache(places, tmp_path):
+    server, url = start_mock_weather_server(throttle_every=3)
+    try:
+        first = collect_weather(places, base_url=url, cache_dir=str(tmp_path), **FAST)
+        requests_made = server.request_count
+        second = collect_weather(places, base_url=url, cache_dir=str(tmp_path), **FAST)
+    finally:
+        server.shutdown()
+
+    assert first["Status"].tolist() == [200, 200, 200, 200, 200, 404]
+    assert first.loc[3].equals(first.loc[4])
+    # Five distinct queries, plus one retry for every third request answered 429
+    assert requests_made == 7
+    assert server.request_count == requests_made
+    assert second.equals(first)
+
+
+class _BrokenSession:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        raise requests.exceptions.ChunkedEncodingError("connection broken")
+
+
+def test_failed_requests_are_retried_then_reported_as_status_zero(places):
+    session = _BrokenSession()
+    assert fetch_with_retry(session, "http://127.0.0.1:9/", {}, retries=2, backoff=0.001) == (0, None)
+    assert session.calls == 3
+
+    weather = collect_weather(places, base_url="http://127.0.0.1:9/", cache_dir=None, session=_BrokenSession(),
+                              retries=1, **FAST)
+    assert (weather["Status"] == 0).all()
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+
+from Python_Data_Transformation import DataCleaner
+
+
+def _people():
+    return pd.DataFrame({
+        'Age': [29, None, 22, None],
+        'Name X': ['John', None, 'Mary', None],
+    })
+
+
+def _eager_and_lazy(chain):
+    eager = chain(DataCleaner(_people())).get_dataframe()
+    lazy = chain(DataCleaner(_people(), lazy=True)).get_dataframe()
+    return eager, lazy
+
+
+def test_dict_fill_before_rename_matches_eager():
+    eager, lazy = _eager_and_lazy(lambda c: c.fill_missing_values({'Age': 0}).clean_column_names())
+    assert not eager['age'].isna().any()
+    tm.assert_frame_equal(lazy, eager)
+
+
+def test_back_to_back_dict_fills_match_eager():
+    eager, lazy = _eager_and_lazy(lambda c: c.fill_missing_values({'Age': 0}).fill_missing_values({'Name X': 'z'}))
+    assert (eager['Name X'] == ['John', 'z', 'Mary', 'z']).all()
+    tm.assert_frame_equal(lazy, eager)
+
+
+def test_vectorized_text_cleaning_matches_eager_on_string_dtype():
+    df = pd.DataFrame({'Name': pd.array([' John ', None, 'Mary!'], dtype='string')})
+    for step in ('apply_text_cleaning', 'apply_special_character_removal'):
+        eager = getattr(DataCleaner(df.copy()), step)('Name').get_dataframe()
+        vectorized = getattr(DataCleaner(df.copy(), vectorized=True), step)('Name').get_dataframe()
+        tm.assert_frame_equal(vectorized, eager)
+    eager = DataCleaner(df.copy()).clean_all_text_columns().get_dataframe()
+    vectorized = DataCleaner(df.copy(), vectorized=True).clean_all_text_columns().get_dataframe()
+    tm.assert_frame_equal(vectorized, eager)
+
+
+def _large_ids():
+    big = 2 ** 53
+    return pd.DataFrame({'id': [big, big + 1, big + 1, 5], 'name': ['a', 'a', 'a', 'b']})
+
+
+def test_parallel_drop_duplicates_keeps_large_ints_apart():
+    eager = DataCleaner(_large_ids()).drop_duplicates().get_dataframe()
+    parallel = DataCleaner(_large_ids(), workers=2).drop_duplicates().get_dataframe()
+    assert eager['id'].tolist() == [2 ** 53, 2 ** 53 + 1, 5]
+    assert parallel['id'].tolist() == eager['id'].tolist()
+
+
+def test_row_digests_match_across_int_and_float_chunks():
+    from Python_Data_Transformation import row_digests
+    as_int = row_digests(pd.DataFrame({'id': [5, 2 ** 53]}))
+    as_float = row_digests(pd.DataFrame({'id': [5.0, float(2 ** 53)]}))
+    assert (as_int == as_float).all()
+
+
+def test_streaming_drop_duplicates_keeps_large_ints_apart(tmp_path):
+    from Python_Data_Transformation import StreamingDataCleaner
+    path = tmp_path / 'ids.csv'
+    _large_ids().to_csv(path, index=False)
+    eager = DataCleaner(pd.read_csv(path)).drop_duplicates().get_dataframe()
+    # One row per chunk, so the duplicate is only caught by the cross-chunk digest set
+    streamed = StreamingDataCleaner(path, chunksize=1).drop_duplicates().get_dataframe()
+    assert streamed['id'].tolist() == eager['id'].tolist() == [2 ** 53, 2 ** 53 + 1, 5]
+
+
+def test_streaming_outputs_keep_their_columns_when_no_rows_survive(tmp_path):
+    from Python_Data_Transformation import StreamingDataCleaner
+    path = tmp_path / 'people.csv'
+    path.write_text('Age,Name X\n')
+    cleaner = StreamingDataCleaner(path).clean_column_names()
+    assert cleaner.to_csv(tmp_path / 'out.csv') == 0
+    assert cleaner.to_parquet(tmp_path / 'out.parquet') == 0
+    assert list(pd.read_csv(tmp_path / 'out.csv').columns) == ['age', 'name_x']
+    assert list(pd.read_parquet(tmp_path / 'out.parquet').columns) == ['age', 'name_x']
@@ -0,0 +1,19 @@
+from Retail_Sales_Analytics import IncrementalCSVAggregator
+
+
+def test_refresh_leaves_partial_last_line_for_later(tmp_path):
+    path = tmp_path / "sales.csv"
+    path.write_bytes(b"Year,Month,Net Sales\n2017,January,100.5\n2017,Feb")
+    aggregator = IncrementalCSVAggregator(path, ["Year"], ["Net Sales"], {"Year": "int64"})
+    assert aggregator.refresh() == 1
+
+    # The writer finishes the row; it is read whole, not from where the last read stopped
+    with open(path, "ab") as f:
+        f.write(b"ruary,200.25\n")
+    assert aggregator.refresh() == 1
+    assert aggregator.aggregator.rollup(["Year"]).summary()[("Net Sales", "sum")].tolist() == [300.75]
+
+    with open(path, "ab") as f:
+        f.write(b"2018,March,7")
+    assert aggregator.refresh() == 0
+    assert aggregator.refresh(complete=True) == 1
@@ -0,0 +1,15 @@
+import pandas as pd
+
+from Review_Text_Analytics import cont_to_exp, expand_contractions
+
+
+def test_adjacent_shorthand_expands_like_the_loop():
+    texts = pd.Series(["love u n miss it", "u know", "so comfortable n flattering", None])
+    expanded = expand_contractions(texts)
+    assert expanded.tolist()[:3] == ["love you and miss it", "u know", "so comfortable and flattering"]
+    assert expanded.tolist()[:3] == [cont_to_exp(t) for t in texts[:3]]
+    assert pd.isna(expanded[3])
+
+
+def test_compound_contractions_expand_fully():
+    assert expand_contractions(pd.Series(["i can't've asked for more"]))[0] == "i cannot have asked for more"
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from Spark_vs_Pandas import ChunkedEngine, PandasEngine, estimate_footprint, generate_fake_sap_data, to_pandas
+
+
+def test_footprint_counts_each_vocabulary_once():
+    rng = np.random.default_rng(0)
+    vocabulary = [f"CUST{i:06d}" for i in range(20_000)]
+    frame = pd.DataFrame({
+        "KUNNR": pd.Categorical.from_codes(rng.integers(0, len(vocabulary), 100_000), vocabulary),
+        "NETWR": rng.random(100_000),
+    })
+    actual = frame.memory_usage(index=False, deep=True).sum()
+    rows, estimated = estimate_footprint(frame)
+    assert rows == len(frame)
+    assert abs(estimated - actual) <= 0.05 * actual
+
+
+def test_arrow_footprint_is_measured_as_loaded_into_pandas():
+    rng = np.random.default_rng(0)
+    table = generate_fake_sap_data(100_000, seed=0).append_column(
+        "NOTE", pa.array([f"order note {i}" for i in rng.integers(0, 10**9, 100_000)]))
+    actual = to_pandas(table).memory_usage(index=False, deep=True).sum()
+    rows, estimated = estimate_footprint(table)
+    assert rows == table.num_rows
+    assert abs(estimated - actual) <= 0.05 * actual
+
+
+def test_chunked_aggregate_of_no_rows_is_empty_like_pandas():
+    data = generate_fake_sap_data(10, seed=0).slice(0, 0)
+    chunked = ChunkedEngine().load(data)
+    try:
+        result = chunked.aggregate("VKORG", "NETWR")
+    finally:
+        chunked.close()
+    expected = PandasEngine().load(data).aggregate("VKORG", "NETWR")
+    assert result.empty and list(result.columns) == list(expected.columns)
@@ -0,0 +1,53 @@
+import pytest
+
+from SQL_Parser import (extract_columns, extract_columns_cached, extract_columns_many, extract_select_columns,
+                        query_fingerprint)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("WITH recent AS (SELECT id, total FROM orders WHERE total > 10) "
+     "SELECT r.id, SUM(r.total) AS revenue FROM recent r GROUP BY r.id", ["id", "revenue"]),
+    ("SELECT a, b FROM t1 UNION SELECT c, d FROM t2", ["a", "b"]),
+    ('SELECT "Order Id", `user name` AS uname, [Ship Date] FROM t', ["Order Id", "uname", "Ship Date"]),
+    ("SELECT a, -- b,\n /* c, */ d FROM t", ["a", "d"]),
+    ("SELECT DISTINCT customer_id, CASE WHEN x > 1 THEN 'a,b' ELSE 'c' END status, "
+     "(SELECT MAX(y) FROM u) max_y, COUNT(*) FROM t", ["customer_id", "status", "max_y"]),
+    ("SELECT a, a FROM t;", ["a"]),
+    ("", []),
+])
+def test_extract_select_columns(query, expected):
+    assert extract_select_columns(query) == expected
+
+
+def test_extract_columns_prints_only_when_asked(capsys):
+    assert extract_columns("SELECT a FROM t", debug=False) == ["a"]
+    assert capsys.readouterr().out == ""
+    extract_columns("SELECT a FROM t", debug=True)
+    assert "Extracted Columns: ['a']" in capsys.readouterr().out
+
+
+def test_unterminated_input_does_not_hang():
+    assert extract_select_columns("SELECT a, 'unterminated" + " x" * 10_000) == ["a"]
+
+
+def test_fingerprint_ignores_literals_comments_and_spacing():
+    assert query_fingerprint("SELECT a FROM t WHERE id = 42 -- note\nAND name = 'x'") == \
+        query_fingerprint("SELECT a  FROM t WHERE id = 7 AND name = 'yy'")
+    assert query_fingerprint('SELECT "a 1" FROM t') != query_fingerprint('SELECT "a 2" FROM t')
+
+
+def test_extract_columns_many_keeps_order_across_workers(tmp_path):
+    queries = [f"SELECT c{i}, d{i % 3} AS alias FROM t WHERE x = {i}" for i in range(50)]
+    expected = [extract_select_columns(q) for q in queries]
+    assert list(extract_columns_many(queries)) == expected
+    assert list(extract_columns_many(queries, workers=2, chunk_size=7)) == expected
+
+    log = tmp_path / "queries.sql"
+    log.write_text("SELECT a,\n  b FROM t;\nSELECT c FROM u;\nSELECT d FROM v")
+    assert list(extract_columns_many(str(log))) == [["a", "b"], ["c"], ["d"]]
+
+
+def test_cached_results_cannot_be_mutated_by_callers():
+    first = extract_columns_cached("SELECT a, b FROM t WHERE id = 1")
+    first.append("oops")
+    assert extract_columns_cached("SELECT a, b FROM t WHERE id = 2") == ["a", "b"]
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from SuperfundSiteFinderNY import SiteIndex, SiteSnapshot, brute_force_nearest, build_site_map, load_sites
+
+
+def _points(n, seed):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(40.5, 45.0, n), rng.uniform(-79.8, -71.8, n)
+
+
+def test_site_index_matches_brute_force():
+    site_lat, site_lon = _points(300, 0)
+    query_lat, query_lon = _points(50, 1)
+    index = SiteIndex(site_lat, site_lon)
+    distances, indices = index.nearest(query_lat, query_lon, k=3)
+    brute_d, brute_i = brute_force_nearest(site_lat, site_lon, query_lat, query_lon, 3)
+    np.testing.assert_allclose(distances, brute_d, atol=1e-6)
+    assert (indices == brute_i).all()
+    assert (index.count_within(query_lat, query_lon, 25.0) == [len(i) for i in index.within(query_lat, query_lon, 25.0)[1]]).all()
+
+
+def test_empty_site_index_answers_every_query_with_no_sites():
+    index = SiteIndex.from_frame(pd.DataFrame({"Latitude": [], "Longitude": []}))
+    distances, indices = index.nearest([40.7, 42.0], [-74.0, -75.0], k=1)
+    assert distances.shape == indices.shape == (2, 0)
+    assert index.count_within([40.7], [-74.0], 5.0).tolist() == [0]
+    assert [len(i) for i in index.within([40.7], [-74.0], 5.0)[1]] == [0]
+    assert not index.is_near([40.7, 42.0], [-74.0, -75.0], 5.0).any()
+
+
+def test_map_with_no_sites_still_renders():
+    empty = pd.DataFrame(columns=["Latitude", "Longitude", "Superfund Status", "Site Name", "County"])
+    assert "<html>" in build_site_map(empty).get_root().render()
+
+
+def _export(path, rows):
+    pd.DataFrame(rows, columns=["EPA ID", "Site Name", "County", "LAT", "LON", "NPL Status"]).to_csv(path, index=False)
+
+
+def test_load_sites_normalizes_and_snapshot_reloads(tmp_path):
+    export = tmp_path / "export.csv"
+    _export(export, [
+        ["NY1", "Old Bridge", "Kings", "40.70", "-73.99", "Final NPL"],
+        ["NY2", "Swapped", "Anchorage", "-149.9", "61.2", "Deleted NPL"],  # lon in the lat column
+        ["NY3", "No Coordinates", "Erie", "", "", "Final NPL"],
+        ["NY1", "Old Bridge (revised)", "Kings", "40.70", "-73.99", "Final NPL"],
+    ])
+    snapshot, added, rejected = load_sites(str(export), snapshot_dir=str(tmp_path / "snap"))
+    assert (added, rejected) == (2, 1)
+    sites = snapshot.sites.set_index("Site ID")
+    assert sites.loc["NY1", "Site Name"] == "Old Bridge (revised)"
+    assert (sites.loc["NY2", "Latitude"], sites.loc["NY2", "Longitude"]) == (61.2, -149.9)
+    assert sites["Superfund Status"].to_dict() == {"NY1": "Yes", "NY2": "No"}
+
+    # Reloading reads the stored parts and indexes; known Site IDs are not added twice
+    _export(export, [["NY1", "Old Bridge", "Kings", "40.70", "-73.99", "Final NPL"],
+                     ["NY4", "New Site", "Queens", "40.75", "-73.85", "Final NPL"]])
+    snapshot, added, _ = load_sites(str(export), snapshot_dir=str(tmp_path / "snap"))
+    assert added == 1
+    reloaded = SiteSnapshot(str(tmp_path / "snap"))
+    assert len(reloaded) == 3
+    _, indices = reloaded.index.nearest(40.75, -73.85)
+    assert reloaded.sites.iloc[indices[0, 0]]["Site ID"] == "NY4"
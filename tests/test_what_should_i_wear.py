@@ -0,0 +1,97 @@
+import datetime
+import json
+import os
+import time
+
+import pytest
+import pytz
+
+from WhatShouldIWear import (ForecastClient, OutfitRequest, build_hourly_frame, forecast_at, forecast_next_hours,
+                             start_mock_forecast_server, suggest_outfits)
+
+
+@pytest.fixture
+def forecast_url():
+    server, url = start_mock_forecast_server()
+    yield url
+    server.shutdown()
+
+
+def _age(client, path, seconds):
+    with open(path) as f:
+        entry = json.load(f)
+    entry["fetched_at"] -= seconds
+    with open(path, "w") as f:
+        json.dump(entry, f)
+    os.utime(path, (time.time() - seconds, time.time() - seconds))
+    client.memory_cache.clear()
+
+
+def test_expired_disk_entries_are_swept_on_write(forecast_url, tmp_path):
+    client = ForecastClient(base_url=forecast_url, ttl=60, cache_dir=str(tmp_path))
+    client.fetch(40.7, -74.0, "America/New_York")
+    [stale] = os.listdir(tmp_path)
+    _age(client, tmp_path / stale, 120)
+    client._last_eviction -= 120
+
+    client.fetch(34.1, -118.2, "America/Los_Angeles")
+    assert stale not in os.listdir(tmp_path)
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_stale_disk_entry_is_replaced_on_read(forecast_url, tmp_path):
+    client = ForecastClient(base_url=forecast_url, ttl=60, cache_dir=str(tmp_path))
+    client.fetch(40.7, -74.0, "America/New_York")
+    [path] = os.listdir(tmp_path)
+    _age(client, tmp_path / path, 120)
+
+    assert client.fetch(40.7, -74.0, "America/New_York") is not None
+    assert client.network_calls == 2
+    with open(tmp_path / path) as f:
+        assert time.time() - json.load(f)["fetched_at"] < 60
+
+
+def _hourly(times):
+    return {"time": times, "temperature_2m": [10.0 + i for i in range(len(times))],
+            "precipitation_probability": [i * 10 for i in range(len(times))],
+            "wind_speed_10m": [5.0] * len(times)}
+
+
+def test_hourly_frame_lookups():
+    eastern = pytz.timezone("America/New_York")
+    frame = build_hourly_frame(_hourly(["2025-06-01T02:00", "2025-06-01T00:00", "2025-06-01T01:00"]))
+    assert frame.index.is_monotonic_increasing
+
+    row = forecast_at(frame, eastern.localize(datetime.datetime(2025, 6, 1, 1)))
+    assert row == {"temperature": 53.6, "precipitation": 20, "wind_speed": 3.1}
+    assert forecast_at(frame, eastern.localize(datetime.datetime(2025, 6, 1, 5))) is None
+
+    upcoming = forecast_next_hours(frame, eastern.localize(datetime.datetime(2025, 6, 1, 0, 30)), 5)
+    assert [t.hour for t in upcoming.index] == [1, 2]
+
+
+def test_ambiguous_fall_back_hour_is_standard_time():
+    eastern = pytz.timezone("America/New_York")
+    frame = build_hourly_frame(_hourly(["2025-11-02T00:00", "2025-11-02T01:00", "2025-11-02T02:00"]))
+    assert forecast_at(frame, eastern.localize(datetime.datetime(2025, 11, 2, 1), is_dst=False)) is not None
+
+
+def test_batch_suggestions_share_fetches_and_keep_order():
+    server, url = start_mock_forecast_server()
+    try:
+        now = datetime.datetime.now(pytz.timezone("America/New_York")).replace(tzinfo=None)
+        batch = [
+            OutfitRequest("Store A", 40.7128, -74.0060, now + datetime.timedelta(hours=3)),
+            OutfitRequest("Store B", 34.0522, -118.2437, now + datetime.timedelta(days=2), "America/Los_Angeles"),
+            OutfitRequest("Store A next door", 40.7131, -74.0058, now + datetime.timedelta(days=1)),
+            OutfitRequest("Store A, too late", 40.7128, -74.0060, now + datetime.timedelta(days=40)),
+        ]
+        results = suggest_outfits(batch, client=ForecastClient(base_url=url, cache_dir=None), rate_per_second=100.0)
+    finally:
+        server.shutdown()
+
+    assert [r.request for r in results] == batch
+    assert all(r.error is None and r.outfit for r in results[:3])
+    assert results[3].outfit is None and results[3].error
+    # Store A and its neighbour round to the same coordinates, so they share one fetch
+    assert server.request_count == 2